@@ -1,9 +1,11 @@
 from pathlib import Path
 from glob import glob
-from random import randint
+from random import Random
 from dataclasses import dataclass
-from typing import List
-from os.path import basename, splitext
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Union
+from os.path import basename, splitext, join, exists
+import argparse
 import json
 
 
@@ -14,41 +16,95 @@ class Instance:
     n_periods: int
     ship_length: List[int]
     ship_arrival: List[int]
-    ship_handling: List[int]
+    ship_handling: Union[List[int], List[List[int]]]
 
     def to_dict(self) -> dict:
         return vars(self)
 
 
-def read_lr_instance(file: str) -> Instance:
+def read_lr_instance(file: str, rnd: Random, berth_dependent: bool = True, ship_length: Optional[List[int]] = None) -> Instance:
     with open(file) as f:
         n_ships = int(f.readline().strip())
         n_berths = int(f.readline().strip())
         n_periods = 600
-        ship_length = [randint(1, 3) for _ in range(n_ships)]
+
+        if ship_length is None:
+            ship_length = [rnd.randint(1, 3) for _ in range(n_ships)]
+
         ship_arrival = [int(x.strip()) - 1 for x in f.readline().strip().split(' ')]
         ship_handling = list()
 
         for _ in range(n_ships):
-            ht = map(int, f.readline().strip().split(' '))
-            ht = [h for h in ht if h < 1000] # There are some 99999 values in the files
+            ht = [int(h) for h in f.readline().strip().split(' ')]
 
-            if len(ht) > 0:
-                ship_handling.append(ht[0])
+            if berth_dependent:
+                # One entry per berth. Values such as 99999 mark berths where the ship
+                # cannot moor: they exceed the time horizon, so no solver will use them.
+                ship_handling.append(ht)
             else:
-                ship_handling.append(36)
+                ht = [h for h in ht if h < 1000] # There are some 99999 values in the files
+
+                if len(ht) > 0:
+                    ship_handling.append(ht[0])
+                else:
+                    ship_handling.append(36)
 
         return Instance(n_ships=n_ships, n_berths=n_berths, n_periods=n_periods,
                         ship_length=ship_length, ship_arrival=ship_arrival, ship_handling=ship_handling)
 
 
+def convert(inst: str, output_folder: str, seed: int, berth_dependent: bool, lengths_from: Optional[str]) -> str:
+    name = splitext(basename(inst))[0]
+    new_name = join(output_folder, f"{name}.json")
+
+    # Seeding by instance name makes the output independent of the order in which
+    # the worker processes pick up the files.
+    rnd = Random(f"{seed}-{name}")
+    ship_length = None
+
+    if lengths_from is not None and exists(join(lengths_from, f"{name}.json")):
+        with open(join(lengths_from, f"{name}.json")) as f:
+            ship_length = json.load(f)['ship_length']
+
+    inst = read_lr_instance(file=inst, rnd=rnd, berth_dependent=berth_dependent, ship_length=ship_length)
+
+    with open(new_name, mode='w') as f:
+        json.dump(inst.to_dict(), f, indent=2)
+
+    return new_name
+
+
 if __name__ == '__main__':
-    Path('./Santini').mkdir(exist_ok=True)
+    parser = argparse.ArgumentParser(
+        prog='converter',
+        description='Converts the Lalla-Ruiz instances to the Json format'
+    )
+
+    parser.add_argument(
+        '-s', '--seed', action='store', type=int, required=True,
+        help='Seed for the random ship lengths')
+    parser.add_argument(
+        '-o', '--output-folder', action='store', type=str, default='Santini_Berth_Handling',
+        help='Output folder')
+    parser.add_argument(
+        '-l', '--lengths-from', action='store', type=str,
+        help='Folder with converted instances whose ship lengths are reused (e.g. Santini)')
+    parser.add_argument(
+        '-f', '--fixed-handling', action='store_true',
+        help='If the flag is given, keep only one handling time per ship as in the Santini instances')
+    parser.add_argument(
+        '-w', '--workers', action='store', type=int,
+        help='Number of worker processes (default: number of CPUs)')
+
+    args = parser.parse_args()
 
-    for inst in glob('Lalla_Ruiz_Original/*.txt'):
-        name = splitext(basename(inst))[0]
-        new_name = f"Santini/{name}.json"
-        inst = read_lr_instance(file=inst)
+    Path(args.output_folder).mkdir(exist_ok=True)
+    files = sorted(glob('Lalla_Ruiz_Original/*.txt'))
 
-        with open(new_name, mode='w') as f:
-            json.dump(inst.to_dict(), f, indent=2)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for new_name in pool.map(convert, files,
+                                 [args.output_folder] * len(files),
+                                 [args.seed] * len(files),
+                                 [not args.fixed_handling] * len(files),
+                                 [args.lengths_from] * len(files)):
+            print(new_name)
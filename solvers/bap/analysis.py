@@ -0,0 +1,189 @@
+from .results import load_runs
+from .selector import solved
+from typing import List, Dict, Optional, Tuple
+from matplotlib.figure import Figure
+import numpy as np
+
+
+# Comparison of formulations over the runs of one or more results stores, on columnar
+# arrays: one row per instance (an instance name and number of ships) and one column per
+# model. An instance is solved by a model if the run proves optimality; runs repeated on
+# the same instance and model are averaged. Only instances run with every model compared
+# count.
+# - Performance profiles (Dolan and Moré): the fraction of instances on which a model is
+#   within a factor tau of the best model. Unsolved instances never count on solve time.
+#   Gaps are in percent and shifted by 1, so that ratios of zero gaps are defined.
+# - Shifted geometric means of the solve time per instance family (f30x3, ..., f60x7):
+#   unsolved instances count with their solve time, usually the time limit.
+# - Win/loss tables: a model wins on an instance if it solves it and the other does not,
+#   or both solve it and it is faster by more than the tie tolerance, or neither solves it
+#   and its gap is smaller.
+
+GAP_SHIFT = 1.0
+
+
+def load(stores: List[str]) -> Dict[str, np.ndarray]:
+    # The runs of all stores, concatenated.
+    parts = [load_runs(store) for store in stores]
+
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+
+def family(name: str) -> str:
+    # The family of an instance is its name without the final number, e.g. f30x3 for f30x3-01.
+    return name.rsplit('-', 1)[0]
+
+
+class Comparison:
+    models: List[str]
+    names: np.ndarray
+    n_ships: np.ndarray
+    families: np.ndarray
+    time: np.ndarray
+    gap: np.ndarray
+    solved: np.ndarray
+
+    def __init__(self, runs: Dict[str, np.ndarray], models: Optional[List[str]] = None):
+        if models is None:
+            models = sorted(set(runs['model'].tolist()))
+
+        self.models = list(models)
+        selected = np.isin(runs['model'], self.models)
+        names = runs['name'][selected].astype(str)
+        n_ships = runs['n_ships'][selected].copy()
+        index = {model: k for k, model in enumerate(self.models)}
+        model = np.array([index[m] for m in runs['model'][selected]], dtype=np.int64)
+
+        # Results files without a solution do not record the number of ships: they take the
+        # one of the other runs on the same instance, which a results folder only has once.
+        unique_names, name_index = np.unique(names, return_inverse=True)
+        known = np.full(len(unique_names), -1)
+        np.maximum.at(known, name_index, n_ships)
+        n_ships[n_ships < 0] = known[name_index[n_ships < 0]]
+
+        keys, key_index = np.unique(np.char.add(np.char.add(names, '/'), n_ships.astype(str)), return_inverse=True)
+        is_solved = np.vectorize(solved, otypes=[bool])(runs['makespan'][selected], runs['dual_bound'][selected])
+        makespan = runs['makespan'][selected]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            gap = np.where(is_solved, 0.0, 100.0 * (makespan - runs['dual_bound'][selected]) / makespan)
+
+        gap[~np.isfinite(gap)] = np.inf
+
+        shape = (len(keys), len(self.models))
+        count = np.zeros(shape)
+        time = np.zeros(shape)
+        gaps = np.zeros(shape)
+        np.add.at(count, (key_index, model), 1)
+        np.add.at(time, (key_index, model), runs['solve_time'][selected])
+        np.add.at(gaps, (key_index, model), gap)
+
+        complete = np.all(count > 0, axis=1)
+        count = count[complete]
+        self.time = time[complete] / count
+        self.gap = gaps[complete] / count
+        self.solved = self.gap == 0.0
+        self.names = np.array([key.rsplit('/', 1)[0] for key in keys[complete]])
+        self.n_ships = np.array([int(key.rsplit('/', 1)[1]) for key in keys[complete]], dtype=np.int64)
+        self.families = np.array([family(name) for name in self.names])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def time_ratios(self) -> np.ndarray:
+        # Ratios of the solve time to the best one on each instance, inf if unsolved.
+        time = np.where(self.solved, np.maximum(self.time, 1e-6), np.inf)
+        best = time.min(axis=1, keepdims=True)
+
+        with np.errstate(invalid='ignore'):
+            return np.where(np.isfinite(time), time / best, np.inf)
+
+    def gap_ratios(self) -> np.ndarray:
+        gap = self.gap + GAP_SHIFT
+        best = gap.min(axis=1, keepdims=True)
+
+        with np.errstate(invalid='ignore'):
+            return np.where(np.isfinite(gap), gap / best, np.inf)
+
+    def shifted_geometric_means(self, shift: float = 10.0) -> Tuple[List[str], np.ndarray]:
+        # Families, and the shifted geometric mean of the solve time of each family and model.
+        families = sorted(set(self.families.tolist()), key=_family_order)
+        means = np.array([
+            np.exp(np.mean(np.log(self.time[self.families == f] + shift), axis=0)) - shift
+            for f in families
+        ]).reshape(len(families), len(self.models))
+
+        return families, means
+
+    def wins(self, tie: float = 0.1) -> np.ndarray:
+        # wins[a, b] is the number of instances on which model a beats model b.
+        m = len(self.models)
+        wins = np.zeros((m, m), dtype=np.int64)
+
+        for a in range(m):
+            for b in range(m):
+                sa, sb = self.solved[:, a], self.solved[:, b]
+                faster = self.time[:, a] * (1 + tie) < self.time[:, b]
+                smaller_gap = self.gap[:, a] < self.gap[:, b]
+                wins[a, b] = np.sum((sa & ~sb) | (sa & sb & faster) | (~sa & ~sb & smaller_gap))
+
+        return wins
+
+
+def profile(ratios: np.ndarray, taus: np.ndarray) -> np.ndarray:
+    # Fraction of the instances with a ratio of at most tau, for each tau and model.
+    return np.column_stack([
+        np.searchsorted(np.sort(ratios[:, k]), taus, side='right') / len(ratios)
+        for k in range(ratios.shape[1])
+    ])
+
+
+def profile_figure(ratios: np.ndarray, models: List[str], xlabel: str, dpi: int = 96) -> Figure:
+    # The profiles are step functions, which change at the ratios of each model.
+    finite = ratios[np.isfinite(ratios)]
+    largest = 1.1 * max(2.0, float(finite.max()) if len(finite) > 0 else 2.0)
+    fig = Figure(figsize=(7, 4.5), dpi=dpi)
+    ax = fig.add_subplot()
+
+    for k, model in enumerate(models):
+        taus = np.concatenate([[1.0], np.sort(ratios[:, k][np.isfinite(ratios[:, k])]), [largest]])
+        ax.step(taus, profile(ratios[:, [k]], taus)[:, 0], where='post', label=model)
+
+    ax.set_xscale('log', base=2)
+    ax.set_xlim(1, largest)
+    ax.set_ylim(0, 1.02)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('Fraction of instances')
+    ax.grid(True, which='both', alpha=0.3)
+    ax.legend(loc='lower right')
+    fig.tight_layout()
+
+    return fig
+
+
+def means_figure(families: List[str], means: np.ndarray, models: List[str], shift: float, dpi: int = 96) -> Figure:
+    fig = Figure(figsize=(max(6, len(families) * 0.9), 4.5), dpi=dpi)
+    ax = fig.add_subplot()
+    width = 0.8 / len(models)
+    x = np.arange(len(families))
+
+    for k, model in enumerate(models):
+        ax.bar(x + (k - (len(models) - 1) / 2) * width, means[:, k], width=width, label=model)
+
+    ax.set_xticks(x)
+    ax.set_xticklabels(families)
+    ax.set_yscale('log')
+    ax.set_ylabel(f"Shifted geometric mean of the solve time (s, shift {shift:g})")
+    ax.legend()
+    fig.tight_layout()
+
+    return fig
+
+
+def _family_order(name: str) -> Tuple:
+    # Families such as f30x3 sort by number of ships, then of berths.
+    try:
+        ships, berths = name[1:].split('x')
+        return 0, int(ships), int(berths), name
+    except ValueError:
+        return 1, 0, 0, name
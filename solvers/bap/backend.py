@@ -0,0 +1,114 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Variable types and solution statuses shared by all backends.
+BINARY, INTEGER, CONTINUOUS = 'B', 'I', 'C'
+OPTIMAL, INFEASIBLE, TIME_LIMIT, OTHER = 'optimal', 'infeasible', 'time_limit', 'other'
+INFINITY = float('inf')
+
+BACKENDS = ('gurobi', 'highs')
+
+# Variables and linear expressions are the solver library's own objects, combined with
+# its arithmetic operators, so that no wrapper sits in the hot path of model building.
+# Dictionaries of variables support tupledict-style sums with '*' wildcards, e.g.
+# x.sum('*', j, t).
+Var = Any
+Expr = Any
+VarDict = Dict[Any, Var]
+
+
+class Backend:
+    # Interface of a MIP solver library, as used by the formulations. Constraints are
+    # added in bulk, from a generator of expressions, and solution values are extracted
+    # in bulk, one dictionary of variables at a time.
+
+    def var_dict(self, variables: Optional[Dict[Any, Var]] = None) -> VarDict:
+        raise NotImplementedError
+
+    def add_var(self, vtype: str, lb: float = 0.0, ub: float = INFINITY, obj: float = 0.0, name: str = '') -> Var:
+        raise NotImplementedError
+
+    def add_vars(self, *indices: Iterable, vtype: str, lb=0.0, ub=INFINITY, name: str = '') -> VarDict:
+        # Bounds are either numbers or dictionaries with one entry per index. With more than
+        # one list of indices, variables are indexed by their Cartesian product.
+        raise NotImplementedError
+
+    def add_constrs(self, constrs: Iterable, name: str) -> None:
+        raise NotImplementedError
+
+    def set_bounds(self, var: Var, lb: float, ub: float) -> None:
+        raise NotImplementedError
+
+    def set_obj(self, var: Var, coefficient: float) -> None:
+        raise NotImplementedError
+
+    def set_start(self, values: List[Tuple[Var, float]]) -> None:
+        raise NotImplementedError
+
+    def set_time_limit(self, seconds: float) -> None:
+        raise NotImplementedError
+
+    def set_threads(self, n_threads: int) -> None:
+        raise NotImplementedError
+
+    def set_output(self, enabled: bool) -> None:
+        raise NotImplementedError
+
+    def set_log_file(self, log_file: str) -> None:
+        raise NotImplementedError
+
+    def optimize(self, callback: Optional[Callable] = None, on_incumbent: Optional[Callable] = None) -> None:
+        # on_incumbent, if given, is called with each new incumbent found during the run, as
+        # a function with the signature of values().
+        raise NotImplementedError
+
+    def values(self, variables: VarDict) -> Dict[Any, float]:
+        raise NotImplementedError
+
+    @property
+    def status(self) -> str:
+        raise NotImplementedError
+
+    @property
+    def sol_count(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def obj_val(self) -> float:
+        raise NotImplementedError
+
+    @property
+    def obj_bound(self) -> float:
+        raise NotImplementedError
+
+    @property
+    def runtime(self) -> float:
+        raise NotImplementedError
+
+    def compute_iis(self, model_file: str, iis_file: str) -> None:
+        raise NotImplementedError
+
+    def relax(self) -> None:
+        # Makes all integer and binary variables continuous, in place and keeping their
+        # bounds, so that optimize() solves the LP relaxation.
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        # Number of variables, binary variables, constraints and non-zeros.
+        raise NotImplementedError
+
+    def dispose(self) -> None:
+        raise NotImplementedError
+
+
+def make_backend(name: str = 'gurobi', env=None) -> Backend:
+    # Solver libraries are imported on demand: a machine only needs the one it uses.
+    # The environment, if given, is a Gurobi environment shared between models.
+    if name == 'gurobi':
+        from .gurobi_backend import GurobiBackend
+        return GurobiBackend(env=env)
+    elif name == 'highs':
+        from .highs_backend import HighsBackend
+        return HighsBackend()
+    else:
+        raise ValueError(f"Backend {name} not recognised: use one of {', '.join(BACKENDS)}")
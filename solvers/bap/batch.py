@@ -0,0 +1,122 @@
+from __future__ import annotations
+from .instance import Instance
+from .pa_solver import PASolver
+from .rp_solver import RPSolver
+from .s_solver import SSolver
+from .ti_solver import TISolver
+from .local_search import LSSolver
+from .lns import LNSSolver
+from .cp_solver import CPSolver
+from .bundle import InstanceBundle
+from typing import List, Dict, Iterator, Optional, TYPE_CHECKING
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from time import perf_counter
+from os import path, getpid
+import atexit
+
+if TYPE_CHECKING:
+    from gurobipy import Env
+
+
+SOLVERS = dict(pa=PASolver, rp=RPSolver, s=SSolver, ti=TISolver, ls=LSSolver, lns=LNSSolver, cp=CPSolver)
+MIP_MODELS = ('pa', 'rp', 's', 'ti', 'lns')
+LOGGED_MODELS = MIP_MODELS + ('cp',)
+
+# Gurobi environment of the current worker process. It is created once, with the first
+# job using Gurobi, and shared by the models of all jobs the worker runs: licence checkout
+# and environment setup are paid once per worker rather than once per job. Workers which
+# only run other backends never import Gurobi.
+_env: Optional[Env] = None
+
+# Instance bundles opened by the current worker process, by file name. Each is opened and
+# mapped once, with the first job reading an instance from it.
+_bundles: Dict[str, InstanceBundle] = dict()
+
+
+def make_env(log_to_console: bool = False) -> Env:
+    from gurobipy import Env, GRB
+
+    env = Env(empty=True)
+    env.setParam(GRB.Param.LogToConsole, int(log_to_console))
+    env.start()
+
+    return env
+
+
+def _init_worker() -> None:
+    global _env
+
+    _env = make_env()
+    atexit.register(_env.dispose)
+
+
+def job(instance: str, model: str, output_folder: str, truncate: Optional[int] = None, bundle: Optional[str] = None, **kwargs) -> dict:
+    # A job is a plain dictionary, so that it can be sent to the worker processes.
+    # With a bundle, the instance is the name of an instance in the bundle rather than a
+    # file. Keyword arguments are passed to the solver.
+    return dict(instance=instance, model=model, output_folder=output_folder, truncate=truncate, bundle=bundle, kwargs=kwargs)
+
+
+def read_instance(job: dict) -> Instance:
+    if job.get('bundle') is None:
+        return Instance(instance_file=job['instance'])
+
+    if job['bundle'] not in _bundles:
+        _bundles[job['bundle']] = InstanceBundle(job['bundle'])
+
+    return Instance.from_bundle(_bundles[job['bundle']], job['instance'])
+
+
+def run_job(job: dict) -> dict:
+    instance = read_instance(job)
+
+    if job['truncate'] is not None:
+        instance.truncate(n_ships=min(job['truncate'], instance.n_ships))
+
+    name = path.splitext(path.basename(instance.instance_file))[0]
+    kwargs = dict(job['kwargs'])
+
+    if job['model'] in MIP_MODELS and kwargs.get('backend', 'gurobi') == 'gurobi':
+        if _env is None:
+            _init_worker()
+
+        kwargs['env'] = _env
+
+    if job['model'] in LOGGED_MODELS:
+        # No console output: each run logs to its own file.
+        kwargs['log_file'] = path.join(job['output_folder'], f"log-{name}-{instance.n_ships}-{job['model']}solver.log")
+
+    build_ti = perf_counter()
+    solver = SOLVERS[job['model']](instance=instance, output_folder=job['output_folder'], **kwargs)
+    build_time = perf_counter() - build_ti
+
+    results = solver.solve()
+
+    if job['model'] in ('pa', 'rp', 's', 'ti'):
+        # Free the model now rather than when the next job replaces it.
+        solver.m.dispose()
+
+    return dict(
+        instance=name,
+        model=job['model'],
+        n_ships=instance.n_ships,
+        feasible=results['feasible'],
+        makespan=results['makespan'],
+        dual_bound=results['dual_bound'],
+        build_time=build_time,
+        solve_time=results['solve_time'],
+        total_time=results['total_time'],
+        worker=getpid()
+    )
+
+
+def run_batch(jobs: List[dict], n_workers: int = 1) -> Iterator[dict]:
+    # Yields the summary of each job, in the order of the jobs. With one worker, jobs run
+    # in the current process, which also reuses a single environment.
+    if n_workers == 1:
+        for j in jobs:
+            yield run_job(j)
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=get_context('spawn')) as pool:
+            yield from pool.map(run_job, jobs)
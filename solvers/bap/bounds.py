@@ -0,0 +1,76 @@
+from .instance import Instance
+from typing import Dict, Tuple
+import numpy as np
+
+
+# All bounds are on the makespan as defined by the models, i.e., the last
+# period in which some ship is still being handled: a ship mooring at time t
+# completes at t + handling time - 1. With berth-dependent handling times, each
+# ship is given its shortest handling time over the berths where it can moor.
+
+def _arrays(instance: Instance) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    a = np.fromiter((instance.arrival_time[i] for i in instance.ships), dtype=np.int64, count=instance.n_ships)
+    p = np.fromiter((instance.min_processing_time(i) for i in instance.ships), dtype=np.int64, count=instance.n_ships)
+    w = np.fromiter((instance.ship_length_in_n_berths(i) for i in instance.ships), dtype=np.int64, count=instance.n_ships)
+
+    return a, p, w
+
+
+def _ceil_div(x: np.ndarray, y: int) -> np.ndarray:
+    return -(-x // y)
+
+
+def release_bound(instance: Instance) -> int:
+    a, p, _ = _arrays(instance)
+
+    return int(np.max(a + p - 1))
+
+
+def energy_bound(instance: Instance) -> int:
+    # Ships arriving at or after r need sum(p * w) berth-periods from r onwards.
+    a, p, w = _arrays(instance)
+    order = np.argsort(-a, kind='stable')
+    energy = np.cumsum((p * w)[order])
+
+    return int(np.max(a[order] + _ceil_div(energy, instance.n_berths) - 1))
+
+
+def preemptive_bound(instance: Instance) -> int:
+    # Preemptive relaxation: a ship can be interrupted, so by period r it can have
+    # been handled for at most r - arrival periods. Its remaining berth-periods must
+    # fit after r. We sweep r over all periods in which some ship can be handled.
+    a, p, w = _arrays(instance)
+    r = np.arange(a.min(), (a + p).max())[:, np.newaxis]
+    remaining = np.clip(p - np.clip(r - a, 0, None), 0, None)
+    energy = (remaining * w).sum(axis=1)
+
+    return int(np.max(r[:, 0] + _ceil_div(energy, instance.n_berths) - 1))
+
+
+def wide_ships_bound(instance: Instance) -> int:
+    # Ships longer than half of the quay cannot be handled side by side, so they form a
+    # single-machine problem with release dates, solved exactly by a sweep in arrival order.
+    a, p, w = _arrays(instance)
+    wide = 2 * w > instance.n_berths
+
+    if not wide.any():
+        return 0
+
+    completion = -1
+
+    for arrival, handling in sorted(zip(a[wide].tolist(), p[wide].tolist())):
+        completion = max(completion + 1, arrival) + handling - 1
+
+    return completion
+
+
+def lower_bounds(instance: Instance) -> Dict[str, int]:
+    bounds = dict(
+        release=release_bound(instance),
+        energy=energy_bound(instance),
+        preemptive=preemptive_bound(instance),
+        wide_ships=wide_ships_bound(instance)
+    )
+    bounds['best'] = max(bounds.values())
+
+    return bounds
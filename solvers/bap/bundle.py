@@ -0,0 +1,128 @@
+from typing import List, Dict
+from os import path
+import numpy as np
+import json
+
+
+# A bundle packs many instances in the JSON format into one file, so that a batch job opens
+# a single file and maps it into memory rather than parsing one JSON file per instance.
+# Layout: the magic string, the length of the header as a little-endian uint64, the header
+# (a JSON index with the sizes of each instance and the offsets of its arrays), padding to
+# a multiple of ALIGNMENT bytes, and one int64 array with the data of all instances.
+
+MAGIC = b'BAPBNDL1'
+ALIGNMENT = 64
+
+
+class InstanceBundle:
+    bundle_file: str
+    index: Dict[str, dict]
+    data: np.ndarray
+
+    def __init__(self, bundle_file: str):
+        if not path.exists(bundle_file):
+            raise FileNotFoundError(f"Bundle file not found: {bundle_file}")
+
+        with open(bundle_file, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise RuntimeError(f"Not an instance bundle: {bundle_file}")
+
+            header_length = int.from_bytes(f.read(8), 'little')
+            self.index = json.loads(f.read(header_length))
+
+        self.bundle_file = bundle_file
+        self.data = np.memmap(bundle_file, dtype='<i8', mode='r', offset=_data_offset(header_length))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def names(self) -> List[str]:
+        return list(self.index.keys())
+
+    def arrays(self, name: str) -> dict:
+        # Instance data as in the JSON format, with read-only views of the mapped file
+        # in place of the lists.
+        if name not in self.index:
+            raise KeyError(f"Instance {name} not found in bundle {self.bundle_file}")
+
+        entry = self.index[name]
+        n_ships = entry['n_ships']
+
+        def view(key: str, size: int) -> np.ndarray:
+            return self.data[entry[key]:entry[key] + size]
+
+        if entry['berth_dependent']:
+            handling = view('ship_handling', n_ships * entry['n_berths']).reshape(n_ships, entry['n_berths'])
+        else:
+            handling = view('ship_handling', n_ships)
+
+        return dict(
+            n_ships=n_ships,
+            n_berths=entry['n_berths'],
+            n_periods=entry['n_periods'],
+            ship_length=view('ship_length', n_ships),
+            ship_arrival=view('ship_arrival', n_ships),
+            ship_handling=handling
+        )
+
+
+def _data_offset(header_length: int) -> int:
+    offset = len(MAGIC) + 8 + header_length
+
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def pack(instance_files: List[str], bundle_file: str) -> int:
+    # Instances are named after their file, without the extension. Returns the number of
+    # instances packed.
+    if len(instance_files) == 0:
+        raise ValueError('No instances to pack')
+
+    index = dict()
+    chunks = list()
+    offset = 0
+
+    for instance_file in instance_files:
+        name = path.splitext(path.basename(instance_file))[0]
+
+        if path.splitext(instance_file)[-1] != '.json':
+            raise RuntimeError(f"Only instances in the JSON format can be packed: {instance_file}")
+        if name in index:
+            raise ValueError(f"Two instances named {name}")
+
+        with open(instance_file) as f:
+            data = json.load(f)
+
+        handling = np.asarray(data['ship_handling'], dtype=np.int64)
+        entry = dict(n_ships=data['n_ships'], n_berths=data['n_berths'], n_periods=data['n_periods'],
+                     berth_dependent=handling.ndim == 2)
+
+        for key, values in (('ship_length', data['ship_length']), ('ship_arrival', data['ship_arrival']),
+                            ('ship_handling', handling.ravel())):
+            array = np.asarray(values, dtype=np.int64)
+
+            if not np.array_equal(array, values):
+                raise ValueError(f"Non-integer {key} in {instance_file}")
+
+            entry[key] = offset
+            chunks.append(array)
+            offset += len(array)
+
+        index[name] = entry
+
+    header = json.dumps(index).encode()
+
+    with open(bundle_file, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+        f.write(b'\0' * (_data_offset(len(header)) - f.tell()))
+
+        for chunk in chunks:
+            f.write(chunk.astype('<i8').tobytes())
+
+    return len(index)
+
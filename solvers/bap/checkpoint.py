@@ -0,0 +1,116 @@
+from .instance import Instance
+from .schedule import write_json_atomic
+from typing import Callable, List, Optional
+from time import monotonic
+from os import path, remove
+import json
+
+
+class Checkpoint:
+    # Periodic checkpoints of a long MIP solve (pa, rp, s and ti models, Gurobi backend).
+    # The checkpoint file has the same fields as a results file, plus the time limit and the
+    # solver time used so far, and is replaced atomically: at any moment it is a valid partial
+    # results file. A run killed before the end can be resumed from it, with the incumbent
+    # as a MIP start and what is left of the time limit.
+    checkpoint_file: str
+    time_limit: float
+    interval: float
+    elapsed: float  # Solver time of the previous runs
+    makespan: Optional[float]
+    dual_bound: Optional[float]
+    ships: Optional[List[dict]]
+
+    def __init__(self, instance: Instance, model: str, output_folder: str, time_limit: float, interval: float = 60.0):
+        basename = path.splitext(path.basename(instance.instance_file))[0]
+
+        self.checkpoint_file = path.join(output_folder, f"checkpoint-{basename}-{model}solver.json")
+        self.time_limit = time_limit
+        self.interval = interval
+        self.elapsed = 0.0
+        self.makespan = None
+        self.dual_bound = None
+        self.ships = None
+
+    def load(self) -> bool:
+        # Reads the state of a previous run, if there is one. The time limit of that run
+        # is kept, so that resuming several times never exceeds it.
+        if not path.exists(self.checkpoint_file):
+            return False
+
+        with open(self.checkpoint_file) as f:
+            data = json.load(f)
+
+        self.time_limit = data['time_limit']
+        self.elapsed = data['elapsed']
+        self.makespan = data['makespan']
+        self.dual_bound = data['dual_bound']
+        self.ships = data['ships']
+
+        return True
+
+    def remaining_time(self) -> float:
+        return max(0.0, self.time_limit - self.elapsed)
+
+    def callback(self, solver) -> Callable:
+        from gurobipy import GRB
+
+        last_write = monotonic()
+        changed = False
+
+        def callback(m, where):
+            nonlocal last_write, changed
+
+            if where == GRB.Callback.MIPSOL:
+                obj = m.cbGet(GRB.Callback.MIPSOL_OBJ)
+
+                if self.makespan is None or obj < self.makespan - 0.5:
+                    self.makespan = obj
+                    self.ships = solver.schedule(m.cbGetSolution)
+                    changed = True
+            elif where == GRB.Callback.MIP:
+                bound = m.cbGet(GRB.Callback.MIP_OBJBND)
+
+                if bound > -GRB.INFINITY and (self.dual_bound is None or bound > self.dual_bound):
+                    self.dual_bound = bound
+                    changed = True
+
+                if changed and monotonic() - last_write >= self.interval:
+                    self.write(elapsed=self.elapsed + m.cbGet(GRB.Callback.RUNTIME))
+                    last_write = monotonic()
+                    changed = False
+
+        return callback
+
+    def write(self, elapsed: float) -> None:
+        # Elapsed is the solver time of all runs so far, including the current one.
+        write_json_atomic(self.checkpoint_file, dict(
+            feasible=True,
+            makespan=self.makespan,
+            dual_bound=self.dual_bound,
+            solve_time=elapsed,
+            ships=self.ships,
+            time_limit=self.time_limit,
+            elapsed=elapsed,
+            partial=True
+        ), indent=2)
+
+    def finish(self, results: dict) -> dict:
+        # Merges the results of the last run with the state of the previous ones, and
+        # removes the checkpoint: the run is complete.
+        if self.elapsed > 0:
+            results['solve_time'] += self.elapsed
+            results['total_time'] += self.elapsed
+            results['resumed_after'] = self.elapsed
+
+        if results['feasible']:
+            if self.makespan is not None and (results['makespan'] is None or self.makespan < results['makespan'] - 0.5):
+                results['makespan'] = self.makespan
+                results['ships'] = self.ships
+
+            if self.dual_bound is not None and (results['dual_bound'] is None or self.dual_bound > results['dual_bound']):
+                results['dual_bound'] = self.dual_bound
+
+        if path.exists(self.checkpoint_file):
+            remove(self.checkpoint_file)
+
+        return results
@@ -0,0 +1,187 @@
+from __future__ import annotations
+from .instance import Instance
+from .schedule import ship_record, read_ships
+from .bounds import lower_bounds
+from .results import ResultsSink, JsonFileSink
+from typing import Union, List, Dict, Optional, TYPE_CHECKING
+from datetime import datetime
+
+if TYPE_CHECKING:
+    from ortools.sat.python import cp_model
+
+
+class CPSolver:
+    # Constraint programming model solved with OR-Tools CP-SAT. Each ship is a rectangle
+    # with a time interval [u, u + p) and a space interval [v, v + w) on the quay, and
+    # rectangles must not overlap. There are no big-M constants and no time-indexed
+    # variables, so the model size is linear in the number of ships.
+    # OR-Tools is imported on demand: it bundles its own build of HiGHS, which clashes
+    # with highspy when both are loaded in the same process.
+    instance: Instance
+    output_folder: str
+    sink: ResultsSink
+    timelimit: float
+    n_workers: int
+    log_file: Optional[str]
+    use_lower_bound: bool
+    combinatorial_bounds: Dict[str, int]
+
+    m: cp_model.CpModel
+    u: Dict[int, cp_model.IntVar]
+    v: Dict[int, cp_model.IntVar]
+    p: Dict[int, Union[int, cp_model.IntVar]]
+    makespan: cp_model.IntVar
+    cp: cp_model.CpSolver
+
+    start_ti: datetime
+
+    def __init__(self, instance: Union[str, Instance], output_folder: str, **kwargs):
+        if type(instance) is Instance:
+            self.instance = instance
+        elif type(instance) is str:
+            self.instance = Instance(instance_file=instance)
+        else:
+            raise TypeError(f"Type not supported for instance: {type(instance)}")
+
+        self.output_folder = output_folder
+        self.sink = kwargs.get('sink', JsonFileSink(output_folder))
+
+        self.start_ti = datetime.now()
+        self.timelimit = kwargs.get('timelimit', 3600.0)
+        self.n_workers = kwargs.get('n_workers', 1)
+        self.log_file = kwargs.get('log_file')
+        self.combinatorial_bounds = lower_bounds(self.instance)
+        self.__build_model()
+
+        self.use_lower_bound = kwargs.get('use_lower_bound', False)
+
+        if self.use_lower_bound:
+            self.m.Add(self.makespan >= self.combinatorial_bounds['best'])
+
+    def __build_model(self) -> None:
+        from ortools.sat.python import cp_model
+
+        T = self.instance.n_periods
+        self.m = cp_model.CpModel()
+        self.u, self.v, self.p = dict(), dict(), dict()
+        self.makespan = self.m.NewIntVar(0, T - 1, 'makespan')
+
+        time_intervals, berth_intervals, widths = list(), list(), list()
+
+        for i in self.instance.ships:
+            w = self.instance.ship_length_in_n_berths(i)
+            times = self.instance.handling_times(i)
+
+            if len(times) == 0:
+                raise ValueError(f"Ship {i} cannot moor at any berth within the time horizon")
+
+            # A ship which cannot complete within the horizon still gets variables, for which the
+            # bound on the makespan leaves no value.
+            a, p_min = self.instance.arrival_time[i], min(times.values())
+            self.u[i] = self.m.NewIntVar(a, max(a, T - p_min), f"u[{i}]")
+            self.v[i] = self.m.NewIntVar(0, self.instance.n_berths - w, f"v[{i}]")
+
+            # Ships whose handling time depends on the berth get a handling time variable,
+            # linked to the berth by a table of the admissible (berth, handling time) pairs.
+            if self.instance.berth_dependent(i):
+                self.p[i] = self.m.NewIntVar(min(times.values()), max(times.values()), f"p[{i}]")
+                self.m.AddAllowedAssignments([self.v[i], self.p[i]], list(times.items()))
+            else:
+                self.p[i] = self.instance.processing_time[i]
+
+            end = self.m.NewIntVar(a + p_min, max(a + p_min, T), f"end[{i}]")
+            time_intervals.append(self.m.NewIntervalVar(self.u[i], self.p[i], end, f"x[{i}]"))
+            berth_intervals.append(self.m.NewFixedSizeIntervalVar(self.v[i], w, f"y[{i}]"))
+            widths.append(w)
+
+            self.m.Add(self.makespan >= end - 1)
+
+        self.m.AddNoOverlap2D(time_intervals, berth_intervals)
+
+        # Redundant: at any time, moored ships occupy at most the whole quay. This
+        # strengthens propagation and the bound on the makespan.
+        self.m.AddCumulative(time_intervals, widths, self.instance.n_berths)
+
+        self.m.Minimize(self.makespan)
+
+    def load_schedule(self, ships: List[dict], fix: bool = False) -> None:
+        for data in ships:
+            i = data['data_ship_id']
+
+            if fix:
+                self.m.Add(self.u[i] == data['mooring_time'])
+                self.m.Add(self.v[i] == data['mooring_berth'])
+            else:
+                self.m.AddHint(self.u[i], data['mooring_time'])
+                self.m.AddHint(self.v[i], data['mooring_berth'])
+
+    def load_initial(self, initial_file: str, fix: bool = False) -> None:
+        self.load_schedule(read_ships(initial_file), fix=fix)
+
+    def schedule(self) -> List[dict]:
+        return [
+            ship_record(self.instance, i, mooring_time=self.cp.Value(self.u[i]), mooring_berth=self.cp.Value(self.v[i]))
+            for i in self.instance.ships
+        ]
+
+    def solve(self, write_results: bool = True) -> dict:
+        from ortools.sat.python import cp_model
+
+        self.cp = cp_model.CpSolver()
+        self.cp.parameters.max_time_in_seconds = self.timelimit
+        self.cp.parameters.num_workers = self.n_workers
+
+        # The search is only logged to a log file: on stdout, it would flood the output of
+        # the batch runner, the replay and the portfolio.
+        if self.log_file is not None:
+            log = open(self.log_file, mode='w')
+            self.cp.parameters.log_search_progress = True
+            self.cp.parameters.log_to_stdout = False
+            self.cp.log_callback = lambda line: print(line, file=log)
+        else:
+            log = None
+            self.cp.parameters.log_search_progress = False
+
+        status = self.cp.Solve(self.m)
+
+        if log is not None:
+            log.close()
+
+        elapsed_time = (datetime.now() - self.start_ti).total_seconds()
+
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            results = dict(
+                feasible=True,
+                makespan=self.cp.ObjectiveValue(),
+                dual_bound=self.cp.BestObjectiveBound(),
+                solve_time=self.cp.WallTime(),
+                total_time=elapsed_time,
+                ships=self.schedule()
+            )
+        elif status != cp_model.INFEASIBLE:
+            results = dict(
+                feasible=True,
+                makespan=None,
+                dual_bound=None,
+                solve_time=self.cp.WallTime(),
+                total_time=elapsed_time,
+                ships=None
+            )
+        else:
+            print('Infeasible model (CP)')
+
+            results = dict(
+                feasible=False,
+                makespan=None,
+                dual_bound=None,
+                solve_time=self.cp.WallTime(),
+                total_time=elapsed_time,
+                ships=None
+            )
+
+        results['lower_bounds'] = self.combinatorial_bounds
+
+        if write_results:
+            self.sink.write(self.instance, 'cp', results)
+
+        return results
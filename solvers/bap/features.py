@@ -0,0 +1,55 @@
+from .instance import Instance
+from .bounds import _arrays, lower_bounds
+from typing import Dict
+import numpy as np
+
+
+# Features of an instance which drive the size and the difficulty of the formulations: the
+# time-indexed models (PA, TI) grow with the horizon, the pairwise models (RP, S) with the
+# number of ships. The combinatorial lower bound on the makespan measures the part of the
+# horizon which the schedules actually use. The time windows of the ships are the periods
+# in which each ship is handled if it moors on arrival; two windows overlap when those
+# periods intersect.
+
+FEATURES = (
+    'n_ships', 'n_berths', 'n_periods', 'makespan_bound', 'utilisation', 'arrival_density',
+    'mean_width', 'wide_fraction', 'overlapping_pairs', 'overlap_fraction'
+)
+
+
+def features(instance: Instance) -> Dict[str, float]:
+    a, p, w = _arrays(instance)
+    n = instance.n_ships
+
+    # Berth-periods needed by the ships, over those available between the first arrival
+    # and the latest release.
+    span = int(np.max(a + p) - np.min(a))
+    utilisation = float(np.sum(p * w)) / (instance.n_berths * span)
+
+    arrival_density = n / (int(np.max(a) - np.min(a)) + 1)
+
+    overlap = (a[:, np.newaxis] < (a + p)[np.newaxis, :]) & (a[np.newaxis, :] < (a + p)[:, np.newaxis])
+    overlapping_pairs = int(np.triu(overlap, k=1).sum())
+
+    return dict(
+        n_ships=n,
+        n_berths=instance.n_berths,
+        n_periods=instance.n_periods,
+        makespan_bound=lower_bounds(instance)['best'],
+        utilisation=utilisation,
+        arrival_density=arrival_density,
+        mean_width=float(np.mean(w)) / instance.n_berths,
+        wide_fraction=float(np.mean(2 * w > instance.n_berths)),
+        overlapping_pairs=overlapping_pairs,
+        overlap_fraction=overlapping_pairs / max(1, n * (n - 1) // 2)
+    )
+
+
+def feature_vector(instance: Instance) -> np.ndarray:
+    # Features in the order of FEATURES, with counts on a log scale.
+    f = features(instance)
+
+    for key in ('n_ships', 'n_berths', 'n_periods', 'makespan_bound', 'overlapping_pairs'):
+        f[key] = np.log1p(f[key])
+
+    return np.array([f[key] for key in FEATURES], dtype=np.float64)
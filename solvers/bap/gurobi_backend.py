@@ -0,0 +1,113 @@
+from .backend import Backend, Var, VarDict, OPTIMAL, INFEASIBLE, TIME_LIMIT, OTHER
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from gurobipy import Model, Env, tupledict, GRB
+
+
+class GurobiBackend(Backend):
+    # Thin layer over gurobipy: variables are Gurobi variables, dictionaries of variables
+    # are tupledicts and constraints go straight to Model.addConstrs.
+    model: Model
+
+    STATUS = {GRB.OPTIMAL: OPTIMAL, GRB.INFEASIBLE: INFEASIBLE, GRB.TIME_LIMIT: TIME_LIMIT}
+
+    def __init__(self, env: Optional[Env] = None):
+        self.model = Model(env=env)
+
+    def var_dict(self, variables: Optional[Dict[Any, Var]] = None) -> VarDict:
+        return tupledict(variables or dict())
+
+    def add_var(self, vtype: str, lb: float = 0.0, ub: float = GRB.INFINITY, obj: float = 0.0, name: str = '') -> Var:
+        return self.model.addVar(vtype=vtype, lb=lb, ub=ub, obj=obj, name=name)
+
+    def add_vars(self, *indices: Iterable, vtype: str, lb=0.0, ub=GRB.INFINITY, name: str = '') -> VarDict:
+        return self.model.addVars(*indices, vtype=vtype, lb=lb, ub=ub, name=name)
+
+    def add_constrs(self, constrs: Iterable, name: str) -> None:
+        self.model.addConstrs(constrs, name=name)
+
+    def set_bounds(self, var: Var, lb: float, ub: float) -> None:
+        var.LB, var.UB = lb, ub
+
+    def set_obj(self, var: Var, coefficient: float) -> None:
+        var.Obj = coefficient
+
+    def set_start(self, values: List[Tuple[Var, float]]) -> None:
+        for var, value in values:
+            var.Start = value
+
+    def set_time_limit(self, seconds: float) -> None:
+        self.model.setParam(GRB.Param.TimeLimit, seconds)
+
+    def set_threads(self, n_threads: int) -> None:
+        self.model.setParam(GRB.Param.Threads, n_threads)
+
+    def set_output(self, enabled: bool) -> None:
+        self.model.setParam(GRB.Param.OutputFlag, int(enabled))
+
+    def set_log_file(self, log_file: str) -> None:
+        self.model.setParam(GRB.Param.LogFile, log_file)
+
+    def optimize(self, callback: Optional[Callable] = None, on_incumbent: Optional[Callable] = None) -> None:
+        # The callback receives the Gurobi model, as with Model.optimize.
+        if on_incumbent is None:
+            self.model.optimize(callback)
+            return
+
+        def wrapper(model: Model, where: int) -> None:
+            if where == GRB.Callback.MIPSOL:
+                on_incumbent(model.cbGetSolution)
+
+            if callback is not None:
+                callback(model, where)
+
+        self.model.optimize(wrapper)
+
+    def values(self, variables: VarDict) -> Dict[Any, float]:
+        return self.model.getAttr(GRB.Attr.X, variables)
+
+    @property
+    def status(self) -> str:
+        return self.STATUS.get(self.model.Status, OTHER)
+
+    @property
+    def sol_count(self) -> int:
+        return self.model.SolCount
+
+    @property
+    def obj_val(self) -> float:
+        return self.model.ObjVal
+
+    @property
+    def obj_bound(self) -> float:
+        return self.model.ObjBound
+
+    @property
+    def runtime(self) -> float:
+        return self.model.Runtime
+
+    def compute_iis(self, model_file: str, iis_file: str) -> None:
+        self.model.computeIIS()
+        self.model.write(model_file)
+        self.model.write(iis_file)
+
+    def relax(self) -> None:
+        self.model.update()
+        variables = self.model.getVars()
+        binary = [var for var, vtype in zip(variables, self.model.getAttr(GRB.Attr.VType, variables)) if vtype == GRB.BINARY]
+
+        self.model.setAttr(GRB.Attr.LB, binary, [max(0.0, lb) for lb in self.model.getAttr(GRB.Attr.LB, binary)])
+        self.model.setAttr(GRB.Attr.UB, binary, [min(1.0, ub) for ub in self.model.getAttr(GRB.Attr.UB, binary)])
+        self.model.setAttr(GRB.Attr.VType, variables, [GRB.CONTINUOUS] * len(variables))
+
+    def stats(self) -> Dict[str, int]:
+        self.model.update()
+
+        return dict(
+            n_vars=self.model.NumVars,
+            n_bin_vars=self.model.NumBinVars,
+            n_constrs=self.model.NumConstrs,
+            n_nzs=self.model.NumNZs
+        )
+
+    def dispose(self) -> None:
+        self.model.dispose()
@@ -0,0 +1,193 @@
+from .backend import Backend, Var, VarDict, BINARY, INTEGER, OPTIMAL, INFEASIBLE, TIME_LIMIT, OTHER, INFINITY
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from collections import defaultdict
+from highspy import Highs, HighsVarType, HighsModelStatus
+import numpy as np
+
+
+class TupleDict(dict):
+    # Dictionary of HiGHS variables with the sums of Gurobi's tupledict, e.g. x.sum('*', j, t).
+    # The variables matching a pattern are grouped once per set of fixed positions, so the
+    # dictionary must not change after the first sum.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__groups = dict()
+
+    def sum(self, *pattern) -> Any:
+        fixed = tuple(k for k, p in enumerate(pattern) if p != '*')
+
+        if fixed not in self.__groups:
+            groups = defaultdict(list)
+
+            for key, var in self.items():
+                key = key if isinstance(key, tuple) else (key,)
+                groups[tuple(key[k] for k in fixed)].append(var)
+
+            self.__groups[fixed] = groups
+
+        return Highs.qsum(self.__groups[fixed].get(tuple(pattern[k] for k in fixed), ()))
+
+
+class HighsBackend(Backend):
+    # HiGHS via highspy. Variables are added in bulk and constraints are built with highspy
+    # expressions. Starting values are collected and passed to the solver before each run.
+    model: Highs
+    start: Dict[int, float]
+    solution: Optional[np.ndarray]
+    last_runtime: float
+
+    STATUS = {
+        HighsModelStatus.kOptimal: OPTIMAL,
+        HighsModelStatus.kInfeasible: INFEASIBLE,
+        HighsModelStatus.kTimeLimit: TIME_LIMIT
+    }
+
+    def __init__(self):
+        self.model = Highs()
+        self.start = dict()
+        self.solution = None
+        self.last_runtime = 0.0
+
+    @staticmethod
+    def __bounds(vtype: str, lb, ub) -> Tuple[Any, Any, HighsVarType]:
+        if vtype == BINARY:
+            return 0, 1, HighsVarType.kInteger
+        elif vtype == INTEGER:
+            return lb, ub, HighsVarType.kInteger
+        else:
+            return lb, ub, HighsVarType.kContinuous
+
+    def var_dict(self, variables: Optional[Dict[Any, Var]] = None) -> VarDict:
+        return TupleDict(variables or dict())
+
+    def add_var(self, vtype: str, lb: float = 0.0, ub: float = INFINITY, obj: float = 0.0, name: str = '') -> Var:
+        lb, ub, var_type = self.__bounds(vtype, lb, ub)
+
+        return self.model.addVariable(lb=lb, ub=ub, obj=obj, type=var_type, name=name or None)
+
+    def add_vars(self, *indices: Iterable, vtype: str, lb=0.0, ub=INFINITY, name: str = '') -> VarDict:
+        indices = [list(index) for index in indices]
+
+        if any(len(index) == 0 for index in indices):
+            return TupleDict()
+
+        lb, ub, var_type = self.__bounds(vtype, lb, ub)
+
+        return TupleDict(self.model.addVariables(*indices, lb=lb, ub=ub, type=var_type, name_prefix=name, out_array=False))
+
+    def add_constrs(self, constrs: Iterable, name: str) -> None:
+        # A comparison between constants, e.g. an empty sum == 0, is a bool rather than an
+        # expression. Gurobi skips those which hold; highspy rejects them.
+        def rows():
+            for constr in constrs:
+                if constr is True:
+                    continue
+                elif constr is False:
+                    raise ValueError(f"Constraint {name} cannot be satisfied")
+
+                yield constr
+
+        self.model.addConstrs(rows(), name_prefix=name)
+
+    def set_bounds(self, var: Var, lb: float, ub: float) -> None:
+        self.model.changeColBounds(var.index, lb, ub)
+
+    def set_obj(self, var: Var, coefficient: float) -> None:
+        self.model.changeColCost(var.index, coefficient)
+
+    def set_start(self, values: List[Tuple[Var, float]]) -> None:
+        for var, value in values:
+            self.start[var.index] = value
+
+    def set_time_limit(self, seconds: float) -> None:
+        self.model.setOptionValue('time_limit', float(seconds))
+
+    def set_threads(self, n_threads: int) -> None:
+        self.model.setOptionValue('threads', n_threads)
+
+    def set_output(self, enabled: bool) -> None:
+        self.model.setOptionValue('output_flag', enabled)
+
+    def set_log_file(self, log_file: str) -> None:
+        self.model.setOptionValue('log_file', log_file)
+        self.model.setOptionValue('log_to_console', False)
+
+    @staticmethod
+    def __column_values(solution: np.ndarray, variables: VarDict) -> Dict[Any, float]:
+        columns = np.fromiter((var.index for var in variables.values()), dtype=np.int64, count=len(variables))
+
+        return dict(zip(variables.keys(), solution[columns].tolist()))
+
+    def optimize(self, callback: Optional[Callable] = None, on_incumbent: Optional[Callable] = None) -> None:
+        if callback is not None:
+            raise NotImplementedError('Solver callbacks are only supported by the Gurobi backend')
+
+        if len(self.start) > 0:
+            self.model.setSolution(len(self.start), np.fromiter(self.start.keys(), dtype=np.int32), np.fromiter(self.start.values(), dtype=np.float64))
+
+        def improving(event) -> None:
+            solution = np.asarray(event.data_out.mip_solution)
+            on_incumbent(lambda variables: self.__column_values(solution, variables))
+
+        if on_incumbent is not None:
+            self.model.cbMipImprovingSolution.subscribe(improving)
+
+        # The HiGHS run clock accumulates over runs: keep the time of this one.
+        clock = self.model.getRunTime()
+
+        try:
+            self.model.run()
+        finally:
+            if on_incumbent is not None:
+                self.model.cbMipImprovingSolution.unsubscribe(improving)
+
+        self.last_runtime = self.model.getRunTime() - clock
+        self.solution = np.asarray(self.model.getSolution().col_value) if self.sol_count > 0 else None
+
+    def values(self, variables: VarDict) -> Dict[Any, float]:
+        return self.__column_values(self.solution, variables)
+
+    @property
+    def status(self) -> str:
+        return self.STATUS.get(self.model.getModelStatus(), OTHER)
+
+    @property
+    def sol_count(self) -> int:
+        # HiGHS only keeps the best solution.
+        return int(self.model.getInfo().primal_solution_status == 2)
+
+    @property
+    def obj_val(self) -> float:
+        return self.model.getInfo().objective_function_value
+
+    @property
+    def obj_bound(self) -> float:
+        return self.model.getInfo().mip_dual_bound
+
+    @property
+    def runtime(self) -> float:
+        return self.last_runtime
+
+    def compute_iis(self, model_file: str, iis_file: str) -> None:
+        self.model.writeModel(model_file)
+        self.model.writeIisModel(iis_file)
+
+    def relax(self) -> None:
+        n = self.model.getNumCol()
+        self.model.changeColsIntegrality(n, np.arange(n, dtype=np.int32), np.full(n, HighsVarType.kContinuous, dtype=np.uint8))
+
+    def stats(self) -> Dict[str, int]:
+        lp = self.model.getLp()
+        integral = np.asarray(lp.integrality_, dtype=np.uint8) if len(lp.integrality_) > 0 else np.zeros(lp.num_col_, dtype=np.uint8)
+        binary = (integral == int(HighsVarType.kInteger)) & (np.asarray(lp.col_lower_) == 0) & (np.asarray(lp.col_upper_) == 1)
+
+        return dict(
+            n_vars=self.model.getNumCol(),
+            n_bin_vars=int(binary.sum()),
+            n_constrs=self.model.getNumRow(),
+            n_nzs=self.model.getNumNz()
+        )
+
+    def dispose(self) -> None:
+        self.model.clear()
@@ -1,8 +1,10 @@
 from __future__ import annotations
 from os import path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Union
 from math import ceil, floor
+import numpy as np
 import json
+from .bundle import InstanceBundle
 
 
 class Instance:
@@ -15,6 +17,7 @@ class Instance:
     arrival_time: Dict[int, int]
     ship_length: Dict[int, float]
     processing_time: Dict[int, int]
+    berth_processing_time: Optional[np.ndarray]
     berth_length: Dict[int, float]
     quay_lenght: int
     time_horizon: List[int]
@@ -43,10 +46,50 @@ class Instance:
         else:
             raise RuntimeError(f"File format not recognised for {self.instance_file}")
         
+    @classmethod
+    def from_json_data(cls, data: dict, instance_file: str) -> Instance:
+        # Instance in the JSON format, already parsed, e.g., received over a socket. The
+        # instance file only names the instance in results and logs.
+        instance = cls(instance_file=None)
+        instance.instance_file = instance_file
+        instance.__parse_json(data)
+
+        return instance
+
+    @classmethod
+    def from_bundle(cls, bundle: Union[str, InstanceBundle], name: str) -> Instance:
+        # Instance packed in a bundle, by name (the name of its JSON file, without the
+        # extension). The handling times are a read-only view of the mapped bundle file.
+        if isinstance(bundle, str):
+            bundle = InstanceBundle(bundle)
+
+        data = bundle.arrays(name)
+        data['ship_length'] = data['ship_length'].tolist()
+        data['ship_arrival'] = data['ship_arrival'].tolist()
+
+        instance = cls(instance_file=None)
+        instance.instance_file = path.join(bundle.bundle_file, f"{name}.json")
+        instance.__parse_json(data)
+
+        return instance
+
+    @classmethod
+    def iter_bundle(cls, bundle: Union[str, InstanceBundle]) -> Iterator[Instance]:
+        # All the instances of a bundle, in the order in which they were packed, opening
+        # the bundle file only once.
+        if isinstance(bundle, str):
+            bundle = InstanceBundle(bundle)
+
+        for name in bundle.names():
+            yield cls.from_bundle(bundle, name)
+
     def __read_json_instance(self) -> None:
         with open(self.instance_file) as f:
             data = json.load(f)
 
+        self.__parse_json(data)
+
+    def __parse_json(self, data: dict) -> None:
         self.n_ships = data['n_ships']
         self.n_berths = data['n_berths']
         self.n_periods = data['n_periods']
@@ -55,8 +98,21 @@ class Instance:
         self.berths = list(range(self.n_berths))
         self.arrival_time = {i: t for i, t in enumerate(data['ship_arrival'])}
         self.ship_length = {i: l for i, l in enumerate(data['ship_length'])}
-        self.processing_time = {i: t for i, t in enumerate(data['ship_handling'])}
         self.berth_length = {i: 1 for i in self.berths}
+
+        handling = np.asarray(data['ship_handling'], dtype=np.int64)
+
+        if handling.ndim == 2:
+            # Handling times indexed by ship and by the leftmost berth occupied by the ship.
+            # Berths where the ship cannot moor have a handling time beyond the time horizon.
+            # The berth-independent handling time is the one at the first admissible berth.
+            self.berth_processing_time = handling
+            first = np.argmax(handling < self.n_periods, axis=1)
+            handling = handling[np.arange(self.n_ships), first]
+        else:
+            self.berth_processing_time = None
+
+        self.processing_time = dict(enumerate(handling.tolist()))
         self.quay_length = self.n_berths
         self.time_horizon = list(range(self.n_periods))
         
@@ -86,6 +142,7 @@ class Instance:
             self.ship_length = list_to_dict(ship_length)
             self.arrival_time = list_to_dict(arrival_time)
             self.berth_length = list_to_dict(berth_length)
+            self.berth_processing_time = None
 
             max_ah = max([a + h for a, h in zip(self.arrival_time, self.processing_time)])
             self.n_periods = self.__csv_instance_n_periods()
@@ -136,7 +193,38 @@ class Instance:
             f"To measure a ship length in terms of the number of berths it occupies, all berths must be of the same length."
         
         return int(ceil(self.ship_length[ship] / self.berth_length[0]))
-    
+
+    def handling_time(self, ship: int, berth: int) -> int:
+        # Handling time when the leftmost end of the ship is at the given berth.
+        if self.berth_processing_time is None:
+            return self.processing_time[ship]
+
+        return int(self.berth_processing_time[ship, berth])
+
+    def handling_times(self, ship: int) -> Dict[int, int]:
+        # Handling time at each berth where the ship can moor. With berth-dependent
+        # handling, a berth is excluded if the ship cannot finish within the time horizon.
+        berths = range(self.n_berths - self.ship_length_in_n_berths(ship) + 1)
+        times = {j: self.handling_time(ship, j) for j in berths}
+
+        if self.berth_processing_time is None:
+            return times
+
+        return {j: p for j, p in times.items() if self.arrival_time[ship] + p <= self.n_periods}
+
+    def min_processing_time(self, ship: int) -> int:
+        return min(self.handling_times(ship).values(), default=self.processing_time[ship])
+
+    def berth_dependent(self, ship: int) -> bool:
+        # True if the ship's handling time, or the set of berths where it can moor,
+        # depends on the berth. Models only need a berth choice for such ships.
+        if self.berth_processing_time is None:
+            return False
+
+        times = self.handling_times(ship)
+
+        return len(set(times.values())) > 1 or len(times) < self.n_berths - self.ship_length_in_n_berths(ship) + 1
+
     def print(self) -> None:
         print(f"Number of ships: {self.n_ships}")
         print(f"Number of berths: {self.n_berths}")
@@ -150,6 +238,9 @@ class Instance:
             print(f"\tLength = {self.ship_length[i]} ({self.ship_length_in_n_berths(i)} berths)")
             print(f"\tHandling time = {self.processing_time[i]}")
 
+            if self.berth_processing_time is not None:
+                print(f"\tHandling time by berth = {self.berth_processing_time[i].tolist()}")
+
     def discretise_time_conservative(self, granularity: int) -> Instance:
         new = Instance(instance_file=None)
         new.n_ships = self.n_ships
@@ -160,6 +251,8 @@ class Instance:
         new.arrival_time = {i: int(ceil(arr / granularity)) for i, arr in self.arrival_time.items()}
         new.ship_length = self.ship_length.copy()
         new.processing_time = {i: int(ceil(pro / granularity)) for i, pro in self.processing_time.items()}
+        new.berth_processing_time = None if self.berth_processing_time is None else \
+            np.ceil(self.berth_processing_time / granularity).astype(np.int64)
         new.berth_length = self.berth_length.copy()
         new.quay_lenght = self.quay_lenght
         new.time_horizon = list(range(new.n_periods))
@@ -177,6 +270,8 @@ class Instance:
         new.arrival_time = {i: int(floor(arr / granularity)) for i, arr in self.arrival_time.items()}
         new.ship_length = self.ship_length.copy()
         new.processing_time = {i: int(floor(pro / granularity)) for i, pro in self.processing_time.items()}
+        new.berth_processing_time = None if self.berth_processing_time is None else \
+            np.floor(self.berth_processing_time / granularity).astype(np.int64)
         new.berth_length = self.berth_length.copy()
         new.quay_lenght = self.quay_lenght
         new.time_horizon = list(range(new.n_periods))
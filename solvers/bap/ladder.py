@@ -0,0 +1,123 @@
+from .instance import Instance
+from .schedule import extend_schedule, makespan
+from .results import ResultsSink, JsonFileSink
+from .batch import SOLVERS
+from typing import Union, List, Optional
+from copy import deepcopy
+from datetime import datetime
+from time import perf_counter
+from os import path
+import csv
+
+
+class Ladder:
+    # Solves the truncations of an instance to its first k, 2k, 3k, ... ships, up to the
+    # whole instance, in one process. Each step starts from the previous step's schedule,
+    # extended by a greedy placement of the new ships. Models which support it (the RP
+    # model) are extended with the new ships rather than built again.
+    instance: Instance
+    output_folder: str
+    sink: ResultsSink
+    base_model: str
+    step: int
+    solver_kwargs: dict
+    steps: List[dict]
+
+    start_ti: datetime
+
+    COLUMNS = (
+        'n_ships', 'incremental', 'build_time', 'solve_time', 'start_makespan', 'makespan', 'dual_bound', 'gap'
+    )
+
+    def __init__(self, instance: Union[str, Instance], output_folder: str, base_model: str, step: int, **kwargs):
+        if type(instance) is Instance:
+            self.instance = instance
+        elif type(instance) is str:
+            self.instance = Instance(instance_file=instance)
+        else:
+            raise TypeError(f"Type not supported for instance: {type(instance)}")
+
+        if step < 1:
+            raise ValueError('The ladder step must be a positive number of ships')
+
+        self.output_folder = output_folder
+        self.sink = kwargs.pop('sink', JsonFileSink(output_folder))
+        self.start_ti = datetime.now()
+        self.base_model = base_model
+        self.step = step
+        self.solver_kwargs = kwargs
+        self.steps = list()
+
+    def sizes(self) -> List[int]:
+        n = self.instance.n_ships
+        return list(range(self.step, n, self.step)) + [n]
+
+    def solve(self, write_results: bool = True) -> dict:
+        solver = None
+        previous: Optional[List[dict]] = None
+        results = dict()
+
+        for n in self.sizes():
+            instance = deepcopy(self.instance)
+            instance.truncate(n_ships=n)
+
+            build_ti = perf_counter()
+            incremental = solver is not None and hasattr(solver, 'add_ships')
+
+            if incremental:
+                solver.add_ships(instance)
+            else:
+                solver = SOLVERS[self.base_model](instance=instance, output_folder=self.output_folder, **self.solver_kwargs)
+
+            build_time = perf_counter() - build_ti
+            start = None
+
+            if previous is not None:
+                start = extend_schedule(instance, previous)
+                solver.load_schedule(start, fix=False)
+
+            results = solver.solve(write_results=False)
+
+            if results['ships'] is not None:
+                previous = results['ships']
+
+            gap = None
+
+            if results['makespan'] is not None and results['dual_bound'] is not None and results['makespan'] > 0:
+                gap = (results['makespan'] - results['dual_bound']) / results['makespan']
+
+            row = dict(
+                n_ships=n,
+                incremental=incremental,
+                build_time=build_time,
+                solve_time=results['solve_time'],
+                start_makespan=None if start is None else makespan(start),
+                makespan=results['makespan'],
+                dual_bound=results['dual_bound'],
+                gap=gap
+            )
+            self.steps.append(row)
+
+            print(f"Ladder {self.base_model}, {n} ships: build {build_time:.2f}s, solve {results['solve_time']:.2f}s, "
+                  f"start {row['start_makespan']}, makespan {results['makespan']}, bound {results['dual_bound']}.")
+
+        results = dict(results)
+        results['total_time'] = (datetime.now() - self.start_ti).total_seconds()
+        results['ladder'] = self.steps
+
+        if write_results:
+            self.sink.write(self.instance, self.base_model + 'ladder', results)
+            self.write_table()
+
+        return results
+
+    def write_table(self) -> str:
+        basename = path.splitext(path.basename(self.instance.instance_file))[0]
+        table_file = path.join(self.output_folder, f"ladder-{basename}-{self.base_model}solver.csv")
+
+        with open(table_file, mode='w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.steps)
+
+        return table_file
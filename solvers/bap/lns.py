@@ -0,0 +1,192 @@
+from .instance import Instance
+from .rp_solver import RPSolver
+from .s_solver import SSolver
+from .local_search import LSSolver
+from .schedule import read_ships, makespan
+from .bounds import lower_bounds
+from .results import ResultsSink, JsonFileSink
+from typing import Union, List, Dict, Optional
+from datetime import datetime
+from time import perf_counter
+from .backend import OPTIMAL, TIME_LIMIT
+import random
+
+
+class LNSSolver:
+    instance: Instance
+    output_folder: str
+    sink: ResultsSink
+    model: str
+    timelimit: float
+    sub_timelimit: float
+    neighbourhood_size: int
+    seed: int
+    log_file: Optional[str]
+    combinatorial_bounds: Dict[str, int]
+
+    solver: Union[RPSolver, SSolver]
+    incumbent: Optional[List[dict]]
+    history: List[dict]
+
+    start_ti: datetime
+
+    NEIGHBOURHOODS = ('time_window', 'berth_segment', 'random')
+
+    def __init__(self, instance: Union[str, Instance], output_folder: str, **kwargs):
+        if type(instance) is Instance:
+            self.instance = instance
+        elif type(instance) is str:
+            self.instance = Instance(instance_file=instance)
+        else:
+            raise TypeError(f"Type not supported for instance: {type(instance)}")
+
+        self.output_folder = output_folder
+        self.sink = kwargs.get('sink', JsonFileSink(output_folder))
+
+        self.start_ti = datetime.now()
+        self.model = kwargs.get('model', 'rp')
+        self.timelimit = kwargs.get('timelimit', 300.0)
+        self.sub_timelimit = kwargs.get('sub_timelimit', 5.0)
+        self.neighbourhood_size = kwargs.get('neighbourhood_size', 8)
+        self.seed = kwargs.get('seed', 0)
+        self.log_file = kwargs.get('log_file')
+        self.combinatorial_bounds = lower_bounds(self.instance)
+        self.incumbent = None
+        self.history = list()
+
+        # The model is built once: each iteration only changes variable bounds and starts.
+        # The valid inequalities of the S model order ships independently of the incumbent,
+        # which the fixed ships would then violate: the sub-problems go without them.
+        if self.model == 'rp':
+            self.solver = RPSolver(instance=self.instance, output_folder=output_folder, use_lower_bound=True, env=kwargs.get('env'), backend=kwargs.get('backend', 'gurobi'))
+        elif self.model == 's':
+            self.solver = SSolver(instance=self.instance, output_folder=output_folder, use_lower_bound=True, valid_inequalities=False, env=kwargs.get('env'), backend=kwargs.get('backend', 'gurobi'))
+        else:
+            raise ValueError(f"The LNS only supports models rp and s, not {self.model}")
+
+        # Among schedules with the same makespan, prefer those with a smaller total completion
+        # time: otherwise no move is improving when the ship determining the makespan is fixed.
+        eps = 1.0 / (self.instance.n_ships * self.instance.n_periods)
+        for i in self.instance.ships:
+            self.solver.m.set_obj(self.solver.c[i], eps)
+
+        self.solver.m.set_output(False)
+        self.solver.m.set_threads(1)
+
+    def load_schedule(self, ships: List[dict], fix: bool = False) -> None:
+        if fix:
+            raise ValueError('The LNS cannot fix a starting solution')
+
+        self.incumbent = ships
+
+    def load_initial(self, initial_file: str, fix: bool = False) -> None:
+        self.load_schedule(read_ships(initial_file), fix=fix)
+
+    def __neighbourhood(self, kind: str, rnd: random.Random, size: int) -> List[int]:
+        ships = self.incumbent
+
+        if kind == 'random':
+            return [s['data_ship_id'] for s in rnd.sample(ships, size)]
+
+        anchor = rnd.randint(0, makespan(ships))
+
+        if kind == 'berth_segment':
+            first = rnd.randint(0, self.instance.n_berths - 1)
+            last = first + max(1, self.instance.n_berths // 2)
+            ships = [
+                s for s in ships
+                if s['mooring_berth'] < last and s['mooring_berth'] + s['data_ship_length_in_berths'] > first
+            ] or ships
+
+        # Ships whose handling interval is closest to the anchor time.
+        def distance(s: dict) -> int:
+            return max(0, s['mooring_time'] - anchor, anchor - s['completion_time'])
+
+        return [s['data_ship_id'] for s in sorted(ships, key=distance)[:size]]
+
+    def __cost(self, ships: List[dict]) -> tuple:
+        return makespan(ships), sum(s['completion_time'] for s in ships)
+
+    def solve(self, write_results: bool = True) -> dict:
+        rnd = random.Random(self.seed)
+        target = self.combinatorial_bounds['best']
+        solve_ti = perf_counter()
+
+        if self.incumbent is None:
+            ls = LSSolver(instance=self.instance, output_folder=self.output_folder, timelimit=min(10.0, self.timelimit / 10), seed=self.seed)
+            self.incumbent = ls.solve(write_results=False)['ships']
+
+        # A starting schedule past the horizon cannot be fixed in the model, whose variables
+        # end with the horizon: it is returned as it is, infeasible.
+        feasible = makespan(self.incumbent) < self.instance.n_periods
+        size = min(self.neighbourhood_size, self.instance.n_ships)
+        iteration = 0
+        m = self.solver.m
+        log = None if self.log_file is None else open(self.log_file, mode='w')
+
+        while feasible and makespan(self.incumbent) > target:
+            remaining = self.timelimit - (perf_counter() - solve_ti)
+
+            if remaining <= 0:
+                break
+
+            kind = self.NEIGHBOURHOODS[iteration % len(self.NEIGHBOURHOODS)]
+            free = set(self.__neighbourhood(kind, rnd, size))
+
+            self.solver.unfix(list(free))
+            self.solver.load_schedule([s for s in self.incumbent if s['data_ship_id'] not in free], fix=True)
+            self.solver.load_schedule(self.incumbent, fix=False)
+
+            m.set_time_limit(min(self.sub_timelimit, remaining))
+            m.optimize()
+
+            improved = False
+
+            if m.sol_count > 0:
+                candidate = self.solver.schedule(m.values)
+
+                if self.__cost(candidate) < self.__cost(self.incumbent):
+                    improved = makespan(candidate) < makespan(self.incumbent)
+                    self.incumbent = candidate
+
+            self.history.append(dict(
+                iteration=iteration,
+                neighbourhood=kind,
+                size=size,
+                status=m.status,
+                runtime=m.runtime,
+                makespan=makespan(self.incumbent)
+            ))
+
+            if improved:
+                print(f"LNS iteration {iteration} ({kind}, {size} ships): makespan {makespan(self.incumbent)}.", file=log)
+
+            # Grow the neighbourhood while sub-problems are easy, shrink it when they time out.
+            if m.status == OPTIMAL and size < self.instance.n_ships:
+                size += 1
+            elif m.status == TIME_LIMIT and size > 2:
+                size -= 1
+
+            self.solver.unfix(self.instance.ships)
+            iteration += 1
+
+        if log is not None:
+            log.close()
+
+        results = dict(
+            feasible=feasible,
+            makespan=makespan(self.incumbent),
+            dual_bound=target,
+            solve_time=perf_counter() - solve_ti,
+            total_time=(datetime.now() - self.start_ti).total_seconds(),
+            model=self.model,
+            iterations=iteration,
+            history=self.history,
+            ships=sorted(self.incumbent, key=lambda s: s['data_ship_id']),
+            lower_bounds=self.combinatorial_bounds
+        )
+
+        if write_results:
+            self.sink.write(self.instance, 'lns', results)
+
+        return results
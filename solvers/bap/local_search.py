@@ -0,0 +1,273 @@
+from .instance import Instance
+from .schedule import ship_record, read_ships
+from .bounds import lower_bounds
+from .results import ResultsSink, JsonFileSink
+from .occupancy import OccupancyGrid
+from typing import Union, List, Dict, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from math import log
+from time import perf_counter
+import random
+
+
+class _Annealer:
+    a: List[int]
+    w: List[int]
+    options: List[Tuple[Tuple[int, int], ...]]
+    n: int
+    horizon: int
+    grid: OccupancyGrid
+
+    order: List[int]
+    position: List[int]
+    start: List[int]
+    berth: List[int]
+    handling: List[int]
+    pmax: List[int]
+    psum: List[int]
+
+    def __init__(self, a: List[int], w: List[int], options: List[Tuple[Tuple[int, int], ...]], n_berths: int, horizon: int):
+        self.a, self.w, self.options = a, w, options
+        self.n = len(a)
+        self.horizon = horizon
+        self.grid = OccupancyGrid(n_berths)
+
+    def cost(self, makespan: int, total_completion: int) -> float:
+        # Ties on the makespan are broken by the total completion time, which is scaled
+        # to stay below one period: this gives the search a gradient on plateaus.
+        return makespan + total_completion / (self.n * self.horizon)
+
+    def current_cost(self) -> float:
+        return self.cost(self.pmax[self.n], self.psum[self.n])
+
+    def decode(self, order: List[int]) -> None:
+        self.grid = OccupancyGrid(self.grid.n_berths)
+        self.order = list(order)
+        self.position = [0] * self.n
+        self.start = [0] * self.n
+        self.berth = [0] * self.n
+        self.handling = [0] * self.n
+        self.pmax = [-1] * (self.n + 1)
+        self.psum = [0] * (self.n + 1)
+
+        for pos, i in enumerate(self.order):
+            t, j, p = self.grid.best_fit(self.a[i], self.w[i], self.options[i])
+            self.grid.insert(t, j, self.w[i], p)
+            self.position[i] = pos
+            self.start[pos], self.berth[pos], self.handling[pos] = t, j, p
+            self.pmax[pos + 1] = max(self.pmax[pos], t + p - 1)
+            self.psum[pos + 1] = self.psum[pos] + t + p - 1
+
+    def try_move(self, new_order: List[int], k1: int, k2: int, threshold: float) -> bool:
+        # Incremental evaluation of an order which differs from the current one only in
+        # positions k1, ..., k2. Only the suffix starting at k1 is placed again, and the
+        # placement stops as soon as the partial makespan exceeds the threshold.
+        a, w, options, grid = self.a, self.w, self.options, self.grid
+        n, order, position = self.n, self.order, self.position
+
+        for pos in range(k1, n):
+            grid.remove(self.start[pos], self.berth[pos], w[order[pos]], self.handling[pos])
+
+        start, berth, handling = self.start[:], self.berth[:], self.handling[:]
+        pmax, psum = self.pmax[:], self.psum[:]
+        moved = 0
+        placed = n
+
+        for pos in range(k1, n):
+            i = new_order[pos]
+            t, j, p = grid.best_fit(a[i], w[i], options[i])
+            grid.insert(t, j, w[i], p)
+            start[pos], berth[pos], handling[pos] = t, j, p
+            completion = t + p - 1
+            pmax[pos + 1] = max(pmax[pos], completion)
+            psum[pos + 1] = psum[pos] + completion
+
+            if pmax[pos + 1] > threshold:
+                placed = pos + 1
+                break
+
+            if t != self.start[position[i]] or j != self.berth[position[i]]:
+                moved += 1
+
+            if pos >= k2 and moved == 0:
+                # The same ships as before occupy the same rectangles: the rest of the
+                # schedule would be decoded exactly as in the current solution.
+                for q in range(pos + 1, n):
+                    grid.insert(self.start[q], self.berth[q], w[order[q]], self.handling[q])
+
+                start[pos + 1:], berth[pos + 1:] = self.start[pos + 1:], self.berth[pos + 1:]
+                handling[pos + 1:] = self.handling[pos + 1:]
+                pmax[pos + 1:], psum[pos + 1:] = self.pmax[pos + 1:], self.psum[pos + 1:]
+                break
+
+        if placed == n and self.cost(pmax[n], psum[n]) < threshold:
+            for pos in range(k1, k2 + 1):
+                position[new_order[pos]] = pos
+
+            self.order, self.start, self.berth, self.handling = new_order, start, berth, handling
+            self.pmax, self.psum = pmax, psum
+            return True
+
+        for pos in range(k1, placed):
+            grid.remove(start[pos], berth[pos], w[new_order[pos]], handling[pos])
+
+        for pos in range(k1, n):
+            grid.insert(self.start[pos], self.berth[pos], w[order[pos]], self.handling[pos])
+
+        return False
+
+
+def _anneal(instance: Instance, order: List[int], seed: int, timelimit: float, target: int,
+            temperature: float) -> Tuple[float, List[int], List[int], List[int], int]:
+    rnd = random.Random(seed)
+    ships = instance.ships
+    ann = _Annealer(
+        a=[instance.arrival_time[i] for i in ships],
+        w=[instance.ship_length_in_n_berths(i) for i in ships],
+        options=[tuple(instance.handling_times(i).items()) for i in ships],
+        n_berths=instance.n_berths,
+        horizon=instance.n_periods)
+    ann.decode(order)
+
+    best = (ann.current_cost(), ann.order[:], ann.start[:], ann.berth[:])
+    n, moves = ann.n, 0
+    start_ti = perf_counter()
+    temp = t0 = temperature
+    t_end = 0.01
+
+    while n > 1 and ann.pmax[n] > target:
+        if moves % 100 == 0:
+            elapsed = perf_counter() - start_ti
+            if elapsed >= timelimit:
+                break
+            temp = t0 * (t_end / t0) ** (elapsed / timelimit)
+
+        moves += 1
+        k1, k2 = sorted(rnd.sample(range(n), 2))
+        new_order = ann.order[:]
+
+        if rnd.random() < 0.5:
+            new_order[k1], new_order[k2] = new_order[k2], new_order[k1]
+        elif rnd.random() < 0.5:
+            new_order.insert(k1, new_order.pop(k2))
+        else:
+            new_order.insert(k2, new_order.pop(k1))
+
+        # Metropolis criterion, turned into a threshold so that the decoder can stop early.
+        threshold = ann.current_cost() - temp * log(1.0 - rnd.random())
+
+        if ann.try_move(new_order, k1, k2, threshold) and ann.current_cost() < best[0]:
+            best = (ann.current_cost(), ann.order[:], ann.start[:], ann.berth[:])
+
+    return best + (moves,)
+
+
+class LSSolver:
+    instance: Instance
+    output_folder: str
+    sink: ResultsSink
+    timelimit: float
+    n_restarts: int
+    n_workers: int
+    seed: int
+    combinatorial_bounds: Dict[str, int]
+
+    initial_order: List[int]
+    moves: int
+
+    start_ti: datetime
+
+    def __init__(self, instance: Union[str, Instance], output_folder: str, **kwargs):
+        if type(instance) is Instance:
+            self.instance = instance
+        elif type(instance) is str:
+            self.instance = Instance(instance_file=instance)
+        else:
+            raise TypeError(f"Type not supported for instance: {type(instance)}")
+
+        self.output_folder = output_folder
+        self.sink = kwargs.get('sink', JsonFileSink(output_folder))
+
+        self.start_ti = datetime.now()
+        self.timelimit = kwargs.get('timelimit', 60.0)
+        self.n_restarts = kwargs.get('n_restarts', 1)
+        self.n_workers = kwargs.get('n_workers', 1)
+        self.seed = kwargs.get('seed', 0)
+        self.combinatorial_bounds = lower_bounds(self.instance)
+
+        for i in self.instance.ships:
+            if len(self.instance.handling_times(i)) == 0:
+                raise ValueError(f"Ship {i} cannot moor at any berth within the time horizon")
+
+        # First come, first served.
+        self.initial_order = sorted(range(self.instance.n_ships), key=lambda k: self.instance.arrival_time[self.instance.ships[k]])
+        self.moves = 0
+
+    def load_schedule(self, ships: List[dict], fix: bool = False) -> None:
+        if fix:
+            raise ValueError('The local search cannot fix a starting solution')
+
+        position = {i: k for k, i in enumerate(self.instance.ships)}
+        by_time = sorted(ships, key=lambda s: (s['mooring_time'], s['mooring_berth']))
+        self.initial_order = [position[s['data_ship_id']] for s in by_time]
+
+    def load_initial(self, initial_file: str, fix: bool = False) -> None:
+        self.load_schedule(read_ships(initial_file), fix=fix)
+
+    def __restart_orders(self) -> List[List[int]]:
+        # The first restart starts from the initial order, the others from a perturbation of it.
+        orders = [self.initial_order]
+        rnd = random.Random(self.seed)
+
+        for _ in range(self.n_restarts - 1):
+            order = self.initial_order[:]
+            for _ in range(max(1, len(order) // 5)):
+                k1, k2 = rnd.sample(range(len(order)), 2) if len(order) > 1 else (0, 0)
+                order[k1], order[k2] = order[k2], order[k1]
+            orders.append(order)
+
+        return orders
+
+    def solve(self, write_results: bool = True) -> dict:
+        target = self.combinatorial_bounds['best']
+        temperature = max(1.0, 0.01 * sum(self.instance.processing_time.values()) / self.instance.n_berths)
+        args = [
+            (self.instance, order, self.seed + k, self.timelimit, target, temperature)
+            for k, order in enumerate(self.__restart_orders())
+        ]
+
+        solve_ti = perf_counter()
+
+        if self.n_workers > 1 and len(args) > 1:
+            with ProcessPoolExecutor(max_workers=self.n_workers) as pool:
+                runs = list(pool.map(_anneal, *zip(*args)))
+        else:
+            runs = [_anneal(*arg) for arg in args]
+
+        solve_time = perf_counter() - solve_ti
+        _, order, start, berth, _ = min(runs, key=lambda run: run[0])
+        self.moves = sum(run[4] for run in runs)
+
+        ships = sorted((
+            ship_record(self.instance, self.instance.ships[i], mooring_time=start[pos], mooring_berth=berth[pos])
+            for pos, i in enumerate(order)
+        ), key=lambda s: s['data_ship_id'])
+        makespan = max(s['completion_time'] for s in ships)
+
+        results = dict(
+            feasible=makespan < self.instance.n_periods,
+            makespan=makespan,
+            dual_bound=target,
+            solve_time=solve_time,
+            total_time=(datetime.now() - self.start_ti).total_seconds(),
+            moves=self.moves,
+            restarts=len(runs),
+            ships=ships,
+            lower_bounds=self.combinatorial_bounds
+        )
+
+        if write_results:
+            self.sink.write(self.instance, 'ls', results)
+
+        return results
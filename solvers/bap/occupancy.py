@@ -0,0 +1,106 @@
+from __future__ import annotations
+from .instance import Instance
+from typing import List, Tuple, Iterable, Optional
+from functools import lru_cache
+
+
+class OccupancyGrid:
+    # Berth x time occupancy. Each berth is a bitset (a Python int) whose bit t is set
+    # when the berth is occupied at period t. A query on a span of w berths combines
+    # the w bitsets and then finds runs of p free periods with O(log p) shifts, so that
+    # all periods are tested at once rather than one by one.
+    # Ships are rectangles (t, j, w, p): mooring time t, leftmost berth j, w berths and
+    # handling time p. Rectangles must not overlap: remove clears the bits of the
+    # rectangle, whichever ship set them.
+    n_berths: int
+    occ: List[int]
+
+    def __init__(self, n_berths: int):
+        self.n_berths = n_berths
+        self.occ = [0] * n_berths
+
+    @classmethod
+    def from_schedule(cls, instance: Instance, ships: List[dict]) -> OccupancyGrid:
+        grid = cls(instance.n_berths)
+
+        for s in ships:
+            grid.insert(s['mooring_time'], s['mooring_berth'], s['data_ship_length_in_berths'], s['data_handling_time'])
+
+        return grid
+
+    def copy(self) -> OccupancyGrid:
+        grid = OccupancyGrid(self.n_berths)
+        grid.occ = self.occ[:]
+
+        return grid
+
+    def insert(self, t: int, j: int, w: int, p: int) -> None:
+        mask = ((1 << p) - 1) << t
+        for k in range(j, j + w):
+            self.occ[k] |= mask
+
+    def remove(self, t: int, j: int, w: int, p: int) -> None:
+        mask = ~(((1 << p) - 1) << t)
+        for k in range(j, j + w):
+            self.occ[k] &= mask
+
+    def is_free(self, t: int, j: int, w: int, p: int) -> bool:
+        mask = ((1 << p) - 1) << t
+        return all(self.occ[k] & mask == 0 for k in range(j, j + w))
+
+    def occupied_until(self) -> int:
+        # First period after the last occupied one.
+        return max(occ.bit_length() for occ in self.occ)
+
+    def earliest_start(self, a: int, j: int, w: int, p: int) -> int:
+        # Earliest t >= a such that berths j, ..., j + w - 1 are free from t to t + p - 1.
+        used = self.occ[j]
+        for k in range(j + 1, j + w):
+            used |= self.occ[k]
+
+        # Bit t of free is set iff periods a + t, ..., a + t + p - 1 are all free.
+        free = ~(used >> a)
+        for step in _shift_steps(p):
+            free &= free >> step
+
+        return a + (free & -free).bit_length() - 1
+
+    def earliest_fit(self, a: int, w: int, p: int, berths: Optional[Iterable[int]] = None) -> Tuple[int, int]:
+        # Earliest start among the given leftmost berths (by default, all berths where
+        # the ship fits). Ties are broken in favour of the berth listed first.
+        if berths is None:
+            berths = range(self.n_berths - w + 1)
+
+        t, j, _ = self.best_fit(a, w, tuple((j, p) for j in berths))
+        return t, j
+
+    def best_fit(self, a: int, w: int, options: Tuple[Tuple[int, int], ...]) -> Tuple[int, int, int]:
+        # Placement with the earliest completion time, among the given (berth, handling time)
+        # options. Ties are broken in favour of the option listed first.
+        best_t, best_j, best_p = None, None, None
+        earliest = a + min(p for _, p in options)
+
+        for j, p in options:
+            t = self.earliest_start(a, j, w, p)
+
+            if best_t is None or t + p < best_t + best_p:
+                best_t, best_j, best_p = t, j, p
+
+                if t + p == earliest:
+                    break
+
+        return best_t, best_j, best_p
+
+
+@lru_cache(maxsize=None)
+def _shift_steps(p: int) -> Tuple[int, ...]:
+    # Shifts which turn the runs of free periods of length 1 into runs of length p,
+    # doubling the run length at each step.
+    steps, length = list(), 1
+
+    while length < p:
+        step = min(length, p - length)
+        steps.append(step)
+        length += step
+
+    return tuple(steps)
@@ -1,26 +1,33 @@
 from .instance import Instance
-from typing import Union, List, Dict, Tuple
-from gurobipy import Model, tupledict, Var, GRB
+from .schedule import ship_record, read_ships
+from .bounds import lower_bounds
+from .results import ResultsSink, JsonFileSink
+from .plotting import schedule_figure
+from typing import Union, List, Dict, Tuple, Callable, Optional
+from .backend import Backend, Var, VarDict, make_backend, BINARY, CONTINUOUS, INFINITY, INFEASIBLE
 from os import path
 from datetime import datetime
-from matplotlib.patches import Rectangle
-import matplotlib.pyplot as plt
-import json
+import numpy as np
 
 
 class PASolver:
     instance: Instance
     output_folder: str
+    sink: ResultsSink
     grb_timelimit: float
+    n_threads: int
+    backend: str
+    combinatorial_bounds: Dict[str, int]
 
     time: List[int]
-    m: Model
-    x: tupledict
-    y: tupledict
-    c: tupledict
+    m: Backend
+    x: VarDict
+    y: VarDict
+    c: VarDict
     makespan: Var
 
     c_lb: Dict[int, int]
+    handling: Dict[int, Dict[int, int]]
     x_ijt: List[Tuple[int, int, int]]
     y_ijt: List[Tuple[int, int, int]]
 
@@ -35,20 +42,32 @@ class PASolver:
             raise TypeError(f"Type not supported for instance: {type(instance)}")
         
         self.output_folder = output_folder
+        self.sink = kwargs.get('sink', JsonFileSink(output_folder))
         
+        self.backend = kwargs.get('backend', 'gurobi')
         self.start_ti = datetime.now()
         self.__compute_bounds()
-        self.__build_model()
+        self.__build_model(env=kwargs.get('env'))
+
+        if kwargs.get('log_file') is not None:
+            self.m.set_log_file(kwargs['log_file'])
 
         self.grb_timelimit = kwargs.get('grb_timelimit', 3600.0)
+        self.n_threads = kwargs.get('n_threads', 1)
+        self.combinatorial_bounds = lower_bounds(self.instance)
+
+        if kwargs.get('use_lower_bound', False):
+            self.m.set_bounds(self.makespan, self.combinatorial_bounds['best'], INFINITY)
 
     def __compute_bounds(self) -> None:
         self.c_lb = dict()
+        self.handling = dict()
 
         for i in self.instance.ships:
-            self.c_lb[i] = self.instance.arrival_time[i] + self.instance.processing_time[i] - 1
+            self.c_lb[i] = self.instance.arrival_time[i] + self.instance.min_processing_time(i) - 1
+            self.handling[i] = self.instance.handling_times(i)
 
-    def __build_model(self) -> None:
+    def __build_model(self, env=None) -> None:
         if self.instance.n_periods is not None:
             T = self.instance.n_periods            
         else:
@@ -67,126 +86,123 @@ class PASolver:
         self.y_ijt = [
             (i, j, t)
             for i in self.instance.ships
-            for j in self.instance.berths if self.instance.berth_start(j) + self.instance.ship_length[i] <= self.instance.quay_length
-            for t in self.time if t >= self.instance.arrival_time[i] and t <= T - self.instance.processing_time[i] + 1
+            for j in self.instance.berths if self.instance.berth_start(j) + self.instance.ship_length[i] <= self.instance.quay_length and j in self.handling[i]
+            for t in self.time if t >= self.instance.arrival_time[i] and t <= T - self.handling[i][j]
         ]
 
-        self.m = Model()
-        self.x = self.m.addVars(self.x_ijt, vtype=GRB.BINARY, name='x')
-        self.y = self.m.addVars(self.y_ijt, vtype=GRB.BINARY, name='y')
-        self.c = self.m.addVars(self.instance.ships, vtype=GRB.CONTINUOUS, lb=self.c_lb, ub=GRB.INFINITY, name='c')
-        self.makespan = self.m.addVar(vtype=GRB.CONTINUOUS, lb=0, ub=GRB.INFINITY, obj=1, name='makespan')
+        self.m = make_backend(self.backend, env=env)
+        self.x = self.m.add_vars(self.x_ijt, vtype=BINARY, name='x')
+        self.y = self.m.add_vars(self.y_ijt, vtype=BINARY, name='y')
+        self.c = self.m.add_vars(self.instance.ships, vtype=CONTINUOUS, lb=self.c_lb, ub=INFINITY, name='c')
+        self.makespan = self.m.add_var(vtype=CONTINUOUS, lb=0, ub=INFINITY, obj=1, name='makespan')
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             self.makespan >= self.c[i] for i in self.instance.ships
         ), name='set_makespan')
         
-        self.m.addConstrs((
-            self.c[i] == self.instance.processing_time[i] + \
-            sum(
+        self.m.add_constrs((
+            self.c[i] == sum(
                 sum(
-                    t * self.y[i,j,t]
-                    for t in range(self.instance.arrival_time[i], T - self.instance.processing_time[i] + 2)
-                    if (i, j, t) in self.y_ijt
+                    (t + self.handling[i][j] - 1) * self.y[i,j,t]
+                    for t in range(self.instance.arrival_time[i], T - self.handling[i][j] + 1)
+                    if (i, j, t) in self.y
                 )
                 for j in self.instance.berths
-                if self.instance.berth_start(j) + self.instance.ship_length[i] <= self.instance.quay_length
-            ) - 1
+                if self.instance.berth_start(j) + self.instance.ship_length[i] <= self.instance.quay_length and j in self.handling[i]
+            )
             for i in self.instance.ships
         ), name='set_c')
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             self.y.sum(i, '*', '*') == 1
             for i in self.instance.ships
         ), name='each_ship_one_berth')
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             sum(
                 sum(
                     self.x[i,m,n]
                     for n in range(t, T)
-                    if n < t + self.instance.processing_time[i] and (i,m,n) in self.x_ijt
+                    if n < t + self.handling[i][j] and (i,m,n) in self.x
                 )
                 for m in range(j, self.instance.n_berths)
                 if m < j + self.instance.ship_length_in_n_berths(i)
             ) >=
-            self.instance.processing_time[i] * self.instance.ship_length_in_n_berths(i) + \
+            self.handling[i][j] * self.instance.ship_length_in_n_berths(i) + \
             (self.y[i,j,t] - 1) * M
             for i in self.instance.ships
             for j in self.instance.berths
             for t in self.time if t >= self.instance.arrival_time[i]
-            if (i,j,t) in self.y_ijt
+            if (i,j,t) in self.y
         ), name='link_x_y')
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             self.x.sum('*', j, t) <= 1
             for j in self.instance.berths
             for t in self.time
         ), name='no_overlap')
 
-    def load_initial(self, initial_file: str, fix: bool = False) -> None:
-        with open(initial_file) as f:
-            init = json.load(f)
+    def start_values(self, ships: List[dict]) -> List[Tuple[Var, float]]:
+        values = list()
 
-        for data in init['ships']:
+        for data in ships:
             i = data['data_ship_id']
-            j = self.instance.rightmost_berth_containing_position(data['mooring_position'])
+            j = data['mooring_berth']
             t = data['mooring_time']
 
-            if (i,j,t) in self.y_ijt:
-                if fix:
-                    self.y[i,j,t].LB = self.y[i,j,t].UB = 1
-                else:
-                    self.y[i,j,t].Start = 1
+            if (i,j,t) in self.y:
+                values.append((self.y[i,j,t], 1))
+
+        return values
+
+    def load_schedule(self, ships: List[dict], fix: bool = False) -> None:
+        if fix:
+            for var, value in self.start_values(ships):
+                self.m.set_bounds(var, value, value)
+        else:
+            self.m.set_start(self.start_values(ships))
+
+    def unfix(self, ships: List[int]) -> None:
+        for i, j, t in self.y_ijt:
+            if i in ships:
+                self.m.set_bounds(self.y[i,j,t], 0, 1)
 
-    def solve(self, compute_iis: bool = False) -> None:
+    def load_initial(self, initial_file: str, fix: bool = False) -> None:
+        self.load_schedule(read_ships(initial_file), fix=fix)
+
+    def schedule(self, values: Callable[[VarDict], Dict]) -> List[dict]:
+        y = values(self.y)
+
+        return [
+            ship_record(self.instance, i, mooring_time=t, mooring_berth=j)
+            for (i, j, t), val in sorted(y.items())
+            if val > 0.5
+        ]
+
+    def solve(self, compute_iis: bool = False, callback: Optional[Callable] = None, write_results: bool = True) -> dict:
         basename = path.splitext(path.basename(self.instance.instance_file))[0]
-        self.m.setParam(GRB.Param.TimeLimit, self.grb_timelimit)
-        self.m.setParam(GRB.Param.Threads, 1)
-        self.m.optimize()
+        self.m.set_time_limit(self.grb_timelimit)
+        self.m.set_threads(self.n_threads)
+        self.m.optimize(callback)
 
         end_ti = datetime.now()
         elapsed_time = (end_ti - self.start_ti).total_seconds()
 
-        if self.m.SolCount > 0:
+        if self.m.sol_count > 0:
             results = dict(
                 feasible=True,
-                makespan=self.m.ObjVal,
-                dual_bound=self.m.ObjBound,
-                solve_time=self.m.Runtime,
+                makespan=self.m.obj_val,
+                dual_bound=self.m.obj_bound,
+                solve_time=self.m.runtime,
                 total_time=elapsed_time,
-                ships=list()
+                ships=self.schedule(self.m.values)
             )
-
-            for i in self.instance.ships:
-                for j in self.instance.berths:
-                    found = False
-                    for t in self.time:
-                        if (i,j,t) not in self.y_ijt:
-                            continue
-
-                        if self.y[i,j,t].X > 0.5:
-                            results['ships'].append(dict(
-                                data_ship_id=i,
-                                data_arrival_time=self.instance.arrival_time[i],
-                                data_handling_time=self.instance.processing_time[i],
-                                data_ship_length=self.instance.ship_length[i],
-                                data_ship_length_in_berths=self.instance.ship_length_in_n_berths(i),
-                                mooring_time=t,
-                                completion_time=t + self.instance.processing_time[i] - 1,
-                                mooring_position=self.instance.berth_start(j),
-                                mooring_berth=j
-                            ))
-                            found = True
-                            break
-                    if found:
-                        break
-        elif self.m.Status != GRB.INFEASIBLE:
+        elif self.m.status != INFEASIBLE:
             results = dict(
                 feasible=True,
                 makespan=None,
-                dual_bound=self.m.ObjBound,
-                solve_time=self.m.Runtime,
+                dual_bound=self.m.obj_bound,
+                solve_time=self.m.runtime,
                 total_time=elapsed_time,
                 ships=None
             )
@@ -195,12 +211,10 @@ class PASolver:
             self.instance.print()
 
             if compute_iis:
-                self.m.computeIIS()
                 model_file = 'infeas-' + basename + '-pamodel.lp'
                 ilp_file = 'infeas-' + basename + '-paiis.ilp'
 
-                self.m.write(model_file)
-                self.m.write(ilp_file)
+                self.m.compute_iis(model_file, ilp_file)
 
                 print(f"Infeasible model. Model written to {model_file}. IIS written to {ilp_file}.")
             
@@ -208,57 +222,28 @@ class PASolver:
                 feasible=False,
                 makespan=None,
                 dual_bound=None,
-                solve_time=self.m.Runtime,
+                solve_time=self.m.runtime,
                 total_time=elapsed_time,
                 ships=None
             )
 
-        results_file = self.output_folder + '/results-' + basename + '-pasolver.json'
+        results['lower_bounds'] = self.combinatorial_bounds
+
+        if write_results:
+            self.sink.write(self.instance, 'pa', results)
 
-        with open(results_file, 'w') as f:
-            json.dump(results, f, indent=2)
+        return results
 
     def print_variables(self) -> None:
-        fig, ax = plt.subplots(figsize=(10,10))
-
-        min_y, max_y = 9999, 0
-
-        for idx, i in enumerate(self.instance.ships):
-            x_xs, x_ys = list(), list()
-            y_xs, y_ys = list(), list()
-
-            for j in self.instance.berths:
-                for t in self.instance.time_horizon:
-                    if (i,j,t) in self.x_ijt:
-                        if self.x[i,j,t].X > 0.5:
-                            x_xs.append(j)
-                            x_ys.append(t)
-
-                            if t < min_y:
-                                min_y = t
-                            if t > max_y:
-                                max_y = t
-                    if (i,j,t) in self.y_ijt:
-                        if self.y[i,j,t].X > 0.5:
-                            y_xs.append(j)
-                            y_ys.append(t)
-
-                            if t < min_y:
-                                min_y = t
-                            if t > max_y:
-                                max_y = t
-            
-            ax.scatter(x_xs, x_ys, label=f"Ship {i}. Variables x.", color=f"C{idx}")
-            ax.scatter(y_xs, y_ys, label=f"Ship {i}. Variables y.", color=f"C{idx}", s=100, edgecolor='red')
-            ax.add_patch(Rectangle(xy=(y_xs[0], y_ys[0]), width=self.instance.ship_length_in_n_berths(i), height=self.instance.processing_time[i], facecolor='none', edgecolor=f"C{idx}"))
-            ax.axhline(y=self.instance.arrival_time[i], color=f"C{idx}", linestyle=':', alpha=0.75, label=f"Ship {i}. Arrival time.")
-        
-        ax.legend(loc='upper right', bbox_to_anchor=(1.275,1))
-        ax.set_xticks(self.instance.berths)
-        ax.set_yticks(range(min_y, max_y + 2))
-        ax.xaxis.grid(which='major', color='black', linestyle='--', alpha=0.05)
-        ax.yaxis.grid(which='major', color='black', linestyle='--', alpha=0.05)
-        ax.set_axisbelow(True)
+        # Ship rectangles given by variables y, and the periods occupied according to
+        # variables x as one point per berth and period.
+        fig, ax = schedule_figure(
+            ships=self.schedule(self.m.values),
+            n_berths=self.instance.n_berths,
+            title='Variables x (points) and y (rectangles).')
+
+        x = np.array([key for key, val in self.m.values(self.x).items() if val > 0.5]).reshape(-1, 3)
+        ax.scatter(x[:,1] + 0.5, x[:,2] + 0.5, c=x[:,0] % 20, cmap='tab20', vmin=0, vmax=19, s=4, edgecolors='none')
 
         basename = path.splitext(path.basename(self.instance.instance_file))[0]
         fig.savefig(self.output_folder + '/variables-' + basename + '-pasolver.png', bbox_inches='tight', dpi=96)
@@ -0,0 +1,57 @@
+from .instance import Instance
+from .bounds import _arrays
+from typing import List, Set, Tuple
+import numpy as np
+
+
+# Classification of the pairs of ships for the models with precedence variables x and
+# side-by-side variables I (S and TI). With every ship completing by period latest, ship i1
+# can precede ship i2 only if i2, mooring after both its arrival and the earliest
+# completion of i1, still completes by then. Ships can be side by side only if their
+# lengths fit in the quay together. A pair with a single possible relation is forced and
+# needs no variables; a pair with more than one is free.
+
+class PairClassification:
+    x_ij: List[Tuple[int, int]]
+    I_ij: List[Tuple[int, int]]
+    x_forced: Set[Tuple[int, int]]
+    I_forced: Set[Tuple[int, int]]
+    n_free: int
+    n_forced: int
+
+    def __init__(self, instance: Instance, latest: int):
+        before, beside = possible_relations(instance, latest)
+        n_relations = before.astype(np.int64) + before.T + beside + beside.T
+
+        if np.any(n_relations[np.triu_indices(instance.n_ships, k=1)] == 0):
+            raise ValueError(f"Some pairs of ships cannot be scheduled by period {latest}")
+
+        free = n_relations >= 2
+        forced = n_relations == 1
+        ships = np.asarray(instance.ships)
+
+        def pairs(mask: np.ndarray) -> List[Tuple[int, int]]:
+            k1, k2 = np.nonzero(mask)
+
+            return list(zip(ships[k1].tolist(), ships[k2].tolist()))
+
+        self.x_ij = pairs(before & free)
+        self.I_ij = pairs(beside & free)
+        self.x_forced = set(pairs(before & forced))
+        self.I_forced = set(pairs(beside & forced))
+        self.n_free = int(free.sum()) // 2
+        self.n_forced = int(forced.sum()) // 2
+
+
+def possible_relations(instance: Instance, latest: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Matrices over positions in instance.ships: before[k1, k2] if the ship in position k1
+    # can complete before the one in position k2 moors, and beside[k1, k2] if the first
+    # can be moored on berths below the second.
+    a, p, w = _arrays(instance)
+
+    before = np.maximum((a + p)[:, np.newaxis], a[np.newaxis, :]) + p[np.newaxis, :] - 1 <= latest
+    beside = w[:, np.newaxis] + w[np.newaxis, :] <= instance.n_berths
+    np.fill_diagonal(before, False)
+    np.fill_diagonal(beside, False)
+
+    return before, beside
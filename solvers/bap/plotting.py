@@ -0,0 +1,139 @@
+from .instance import Instance
+from typing import List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+from os import path
+from matplotlib.figure import Figure
+from matplotlib.axes import Axes
+from matplotlib.collections import PolyCollection, LineCollection
+from matplotlib.ticker import MaxNLocator
+import numpy as np
+import json
+
+
+# Schedules are drawn on a berth (x) by time (y) plane, as the solvers' print_variables
+# used to do. All ships are drawn with one collection per element (rectangles, waiting
+# times), so the cost of rendering hardly depends on the number of ships.
+# Figures are created without pyplot: no display backend is needed and figures are
+# not kept alive by a global figure manager, which matters when rendering in batch.
+
+def schedule_arrays(ships: List[dict]) -> Tuple[np.ndarray, ...]:
+    ship_id = np.array([s['data_ship_id'] for s in ships], dtype=np.int64)
+    berth = np.array([s['mooring_berth'] for s in ships], dtype=np.float64)
+    width = np.array([s['data_ship_length_in_berths'] for s in ships], dtype=np.float64)
+    start = np.array([s['mooring_time'] for s in ships], dtype=np.float64)
+    handling = np.array([s['completion_time'] - s['mooring_time'] + 1 for s in ships], dtype=np.float64)
+    arrival = np.array([s['data_arrival_time'] for s in ships], dtype=np.float64)
+
+    return ship_id, berth, width, start, handling, arrival
+
+
+def draw_schedule(ax: Axes, ships: List[dict], n_berths: Optional[int] = None, max_ticks: int = 20,
+                  cmap: str = 'tab20', labels: Optional[bool] = None) -> None:
+    # Ships must be a non-empty list of ship records, as in the results files.
+    ship_id, berth, width, start, handling, arrival = schedule_arrays(ships)
+
+    if n_berths is None:
+        n_berths = int(np.max(berth + width))
+
+    # One rectangle per ship, as an (n, 4, 2) array of vertices.
+    left, right = berth, berth + width
+    bottom, top = start, start + handling
+    verts = np.stack([
+        np.stack([left, bottom], axis=1),
+        np.stack([right, bottom], axis=1),
+        np.stack([right, top], axis=1),
+        np.stack([left, top], axis=1)
+    ], axis=1)
+
+    rectangles = PolyCollection(verts, cmap=cmap, edgecolors='black', linewidths=0.3, alpha=0.8)
+    rectangles.set_array(ship_id % 20)
+    rectangles.set_clim(0, 19)
+    ax.add_collection(rectangles)
+
+    # Waiting time, from arrival to mooring, on the centre line of the ship.
+    centre = berth + width / 2
+    waiting = start > arrival
+    segments = np.stack([
+        np.stack([centre[waiting], arrival[waiting]], axis=1),
+        np.stack([centre[waiting], start[waiting]], axis=1)
+    ], axis=1)
+    ax.add_collection(LineCollection(segments, colors='grey', linestyles=':', linewidths=0.8, zorder=1))
+    ax.scatter(centre[waiting], arrival[waiting], marker='_', color='grey', s=20, linewidths=0.8, zorder=1)
+
+    # Ship ids are only readable when there are few ships.
+    if labels is None:
+        labels = len(ships) <= 60
+
+    if labels:
+        for i, x, y in zip(ship_id.tolist(), centre.tolist(), ((bottom + top) / 2).tolist()):
+            ax.text(x, y, str(i), ha='center', va='center', fontsize=6)
+
+    ax.set_xlim(0, n_berths)
+    ax.set_ylim(min(arrival.min(), start.min()) - 1, top.max() + 1)
+    ax.xaxis.set_major_locator(MaxNLocator(nbins=min(n_berths, max_ticks), integer=True))
+    ax.yaxis.set_major_locator(MaxNLocator(nbins=max_ticks, integer=True))
+    ax.xaxis.grid(which='major', color='black', linestyle='--', alpha=0.05)
+    ax.yaxis.grid(which='major', color='black', linestyle='--', alpha=0.05)
+    ax.set_axisbelow(True)
+    ax.set_xlabel('Berth')
+    ax.set_ylabel('Time')
+
+
+def schedule_figure(ships: List[dict], n_berths: Optional[int] = None, title: Optional[str] = None, **kwargs) -> Tuple[Figure, Axes]:
+    # Taller figures for longer schedules, within reasonable limits.
+    span = max(s['completion_time'] for s in ships) - min(s['data_arrival_time'] for s in ships)
+    fig = Figure(figsize=(10, min(30, max(6, span / 40))))
+    ax = fig.add_subplot()
+    draw_schedule(ax, ships, n_berths=n_berths, **kwargs)
+
+    if title is not None:
+        ax.set_title(title)
+
+    return fig, ax
+
+
+def plot_schedule(ships: List[dict], output_file: str, n_berths: Optional[int] = None, title: Optional[str] = None,
+                  dpi: int = 96, **kwargs) -> str:
+    fig, _ = schedule_figure(ships, n_berths=n_berths, title=title, **kwargs)
+    fig.savefig(output_file, bbox_inches='tight', dpi=dpi)
+
+    return output_file
+
+
+def plot_results(results_file: str, output_file: Optional[str] = None, instance: Optional[Instance] = None,
+                 dpi: int = 96) -> Optional[str]:
+    # Plots the schedule in a results-<basename>-<model>solver.json file, by default
+    # to schedule-<basename>-<model>solver.png in the same folder. Returns None if the
+    # results contain no schedule.
+    with open(results_file) as f:
+        results = json.load(f)
+
+    if not results.get('ships'):
+        return None
+
+    name = path.splitext(path.basename(results_file))[0]
+
+    if output_file is None:
+        output_file = path.join(path.dirname(results_file), name.replace('results-', 'schedule-', 1) + '.png')
+
+    n_berths = instance.n_berths if instance is not None else None
+    title = f"{name.replace('results-', '', 1)}. Makespan: {results['makespan']}."
+
+    return plot_schedule(results['ships'], output_file, n_berths=n_berths, title=title, dpi=dpi)
+
+
+def plot_folder(folder: str, output_folder: Optional[str] = None, n_workers: Optional[int] = None,
+                pattern: str = 'results-*solver.json', dpi: int = 96) -> List[str]:
+    # Renders all results files in a folder, in parallel.
+    results_files = sorted(glob(path.join(folder, pattern)))
+    output_files = [
+        None if output_folder is None else
+        path.join(output_folder, path.splitext(path.basename(f))[0].replace('results-', 'schedule-', 1) + '.png')
+        for f in results_files
+    ]
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        rendered = pool.map(plot_results, results_files, output_files, [None] * len(results_files), [dpi] * len(results_files))
+
+        return [f for f in rendered if f is not None]
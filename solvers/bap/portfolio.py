@@ -0,0 +1,213 @@
+from .instance import Instance
+from .pa_solver import PASolver
+from .rp_solver import RPSolver
+from .s_solver import SSolver
+from .ti_solver import TISolver
+from .schedule import read_ships, write_json_atomic, makespan
+from .bounds import lower_bounds
+from .results import ResultsSink, JsonFileSink
+from typing import Union, List, Dict, Optional, Iterable
+from multiprocessing import get_context
+from queue import Empty
+from datetime import datetime
+from math import ceil, inf
+from os import path, remove
+from .backend import OPTIMAL, INFEASIBLE
+from gurobipy import GRB
+
+
+SOLVERS = dict(pa=PASolver, rp=RPSolver, s=SSolver, ti=TISolver)
+
+
+def gap_closed(best_obj: float, best_bound: float) -> bool:
+    # The makespan is integral, so any bound strictly above best_obj - 1 proves optimality.
+    return ceil(best_bound - 1e-6) >= best_obj - 1e-6
+
+
+def _race(idx: int, model: str, instance: Instance, incumbent_file: str, initial: Optional[List[dict]],
+          solver_kwargs: dict, best_obj, best_model, version, bounds, stop, queue) -> None:
+    try:
+        solver = SOLVERS[model](instance=instance, output_folder=path.dirname(incumbent_file), **solver_kwargs)
+    except Exception as e:
+        queue.put(dict(model=model, error=str(e)))
+        return
+
+    if initial is not None:
+        solver.load_schedule(initial, fix=False)
+
+    seen = 0
+
+    def callback(m, where):
+        nonlocal seen
+
+        if stop.is_set():
+            m.terminate()
+            return
+
+        if where == GRB.Callback.MIPSOL:
+            obj = m.cbGet(GRB.Callback.MIPSOL_OBJ)
+
+            with best_obj.get_lock():
+                if obj < best_obj.value - 0.5:
+                    ships = solver.schedule(m.cbGetSolution)
+                    write_json_atomic(incumbent_file, dict(model=model, makespan=obj, ships=ships))
+                    best_obj.value = obj
+                    best_model.value = idx
+                    version.value += 1
+                    seen = version.value
+        elif where == GRB.Callback.MIP:
+            bounds[idx] = max(bounds[idx], m.cbGet(GRB.Callback.MIP_OBJBND))
+
+            if gap_closed(best_obj.value, max(bounds[:])):
+                stop.set()
+                m.terminate()
+        elif where == GRB.Callback.MIPNODE and m.cbGet(GRB.Callback.MIPNODE_STATUS) == GRB.OPTIMAL:
+            if version.value > seen and best_obj.value < m.cbGet(GRB.Callback.MIPNODE_OBJBST) - 0.5:
+                seen = version.value
+                values = solver.start_values(read_ships(incumbent_file))
+                m.cbSetSolution([var for var, _ in values], [value for _, value in values])
+                m.cbUseSolution()
+
+    try:
+        results = solver.solve(callback=callback, write_results=False)
+        proved_optimal = solver.m.status == OPTIMAL
+
+        if proved_optimal:
+            stop.set()
+
+        if results['dual_bound'] is not None:
+            with best_obj.get_lock():
+                bounds[idx] = max(bounds[idx], results['dual_bound'])
+
+        queue.put(dict(
+            model=model,
+            feasible=solver.m.status != INFEASIBLE,
+            proved_optimal=proved_optimal,
+            makespan=results['makespan'],
+            dual_bound=results['dual_bound'],
+            solve_time=results['solve_time'],
+            total_time=results['total_time']
+        ))
+    except Exception as e:
+        queue.put(dict(model=model, error=str(e)))
+
+
+class Portfolio:
+    instance: Instance
+    output_folder: str
+    sink: ResultsSink
+    models: List[str]
+    grb_timelimit: float
+    use_lower_bound: bool
+    grace_period: float
+    combinatorial_bounds: Dict[str, int]
+    initial: Optional[List[dict]]
+
+    def __init__(self, instance: Union[str, Instance], output_folder: str, models: Iterable[str] = ('pa', 'rp', 's', 'ti'), **kwargs):
+        if type(instance) is Instance:
+            self.instance = instance
+        elif type(instance) is str:
+            self.instance = Instance(instance_file=instance)
+        else:
+            raise TypeError(f"Type not supported for instance: {type(instance)}")
+
+        self.models = list(models)
+
+        if any(model not in SOLVERS for model in self.models):
+            raise ValueError(f"Unknown model in portfolio: {self.models}")
+
+        self.output_folder = output_folder
+        self.sink = kwargs.get('sink', JsonFileSink(output_folder))
+        self.grb_timelimit = kwargs.get('grb_timelimit', 3600.0)
+        self.use_lower_bound = kwargs.get('use_lower_bound', False)
+        self.grace_period = kwargs.get('grace_period', 5.0)
+        self.combinatorial_bounds = lower_bounds(self.instance)
+        self.initial = None
+
+    def load_initial(self, initial_file: str) -> None:
+        self.initial = read_ships(initial_file)
+
+    def solve(self, write_results: bool = True) -> dict:
+        basename = path.splitext(path.basename(self.instance.instance_file))[0]
+        incumbent_file = self.output_folder + '/incumbent-' + basename + '-portfolio.json'
+        start_ti = datetime.now()
+
+        ctx = get_context('spawn')
+        best_obj = ctx.Value('d', inf)
+        best_model = ctx.Value('i', -1)
+        version = ctx.Value('i', 0)
+        # The combinatorial bound is valid for every model, so it seeds the shared dual bound.
+        bounds = ctx.Array('d', [self.combinatorial_bounds['best']] * len(self.models), lock=False)
+        stop = ctx.Event()
+        queue = ctx.Queue()
+
+        if self.initial is not None:
+            write_json_atomic(incumbent_file, dict(model='initial', makespan=makespan(self.initial), ships=self.initial))
+            best_obj.value = makespan(self.initial)
+
+        workers = [
+            ctx.Process(target=_race, args=(
+                idx, model, self.instance, incumbent_file, self.initial,
+                # Workers share incumbents and bounds through Gurobi callbacks.
+                dict(grb_timelimit=self.grb_timelimit, use_lower_bound=self.use_lower_bound, backend='gurobi'),
+                best_obj, best_model, version, bounds, stop, queue))
+            for idx, model in enumerate(self.models)
+        ]
+
+        for w in workers:
+            w.start()
+
+        reports = list()
+        stopped_ti = None
+
+        while len(reports) < len(workers):
+            try:
+                reports.append(queue.get(timeout=1.0))
+            except Empty:
+                # A worker killed, e.g. by running out of memory, never reports.
+                reported = {r['model'] for r in reports}
+                for model, w in zip(self.models, workers):
+                    if model not in reported and not w.is_alive() and queue.empty():
+                        reports.append(dict(model=model, error=f"Exited with code {w.exitcode} before reporting"))
+
+                if stop.is_set() and stopped_ti is None:
+                    stopped_ti = datetime.now()
+
+                # Workers still building their model when the race is decided cannot see the
+                # stop flag until they start optimising: give them a grace period, then kill them.
+                if stopped_ti is not None and (datetime.now() - stopped_ti).total_seconds() > self.grace_period:
+                    reported = {r['model'] for r in reports}
+                    for model, w in zip(self.models, workers):
+                        if model not in reported:
+                            w.terminate()
+                            reports.append(dict(model=model, error='Terminated before reporting'))
+
+        for w in workers:
+            w.join()
+
+        elapsed_time = (datetime.now() - start_ti).total_seconds()
+        reports = {r['model']: r for r in reports}
+        proved_by = [model for model in self.models if reports[model].get('proved_optimal', False)]
+        has_solution = best_obj.value < inf
+
+        results = dict(
+            feasible=has_solution or any(r.get('feasible', False) for r in reports.values()),
+            makespan=best_obj.value if has_solution else None,
+            dual_bound=max(bounds[:]),
+            solve_time=elapsed_time,
+            total_time=elapsed_time,
+            winner=self.models[best_model.value] if best_model.value >= 0 else None,
+            proved_optimal_by=proved_by[0] if len(proved_by) > 0 else None,
+            models=reports,
+            lower_bounds=self.combinatorial_bounds,
+            ships=read_ships(incumbent_file) if has_solution else None
+        )
+
+        # The incumbent file only serves the race.
+        if path.exists(incumbent_file):
+            remove(incumbent_file)
+
+        if write_results:
+            self.sink.write(self.instance, 'portfolio', results)
+
+        return results
@@ -0,0 +1,21 @@
+from .backend import OPTIMAL
+
+
+def lp_relaxation(solver, time_limit: float = 3600.0) -> dict:
+    # Solves only the LP relaxation of the model of a MIP solver (PA, RP, S or TI). The
+    # model is relaxed in place, so the solver cannot solve the MIP afterwards. Returns the
+    # size of the model, the LP bound on the makespan (None if the LP was not solved to
+    # optimality) and the time to solve the LP.
+    sizes = solver.m.stats()
+
+    solver.m.relax()
+    solver.m.set_time_limit(time_limit)
+    solver.m.set_threads(1)
+    solver.m.optimize()
+
+    return dict(
+        **sizes,
+        status=solver.m.status,
+        lp_bound=solver.m.obj_val if solver.m.status == OPTIMAL else None,
+        lp_time=solver.m.runtime
+    )
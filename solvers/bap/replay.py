@@ -0,0 +1,204 @@
+from .instance import Instance
+from .schedule import ship_record, extend_schedule, makespan
+from .batch import SOLVERS
+from typing import List, Dict, Iterator, Optional, Tuple, TYPE_CHECKING
+from time import perf_counter
+from os import devnull
+import numpy as np
+import random
+
+if TYPE_CHECKING:
+    from gurobipy import Env
+
+
+# Replays an instance online, as a stream of events: each ship is announced some periods
+# before it arrives, with an estimated time of arrival (ETA) which is revised while it
+# approaches, and then actually arrives. After each event the plan is recomputed by a
+# re-planning strategy, from what is known at that time. Ships moored before the event
+# keep their berth and mooring time; all other known ships can be moved.
+# Each re-planning only solves the window of the ships still to be handled, with the time
+# of the event as period 0: ships being handled become fixed ships which arrive at 0 with
+# their remaining handling time, and the horizon ends two periods after a greedy plan of
+# the window. The time-indexed models then stay small however late the event.
+
+EVENT_KINDS = ('arrival', 'eta', 'announce')
+STRATEGIES = ('greedy', 'pa', 'rp', 's', 'ti', 'cp')
+MIP_STRATEGIES = ('pa', 'rp', 's', 'ti')
+
+# Handling time marking a berth where a fixed ship is not moored.
+UNAVAILABLE = 99999
+
+
+def events(instance: Instance, lead: int = 48, eta_error: int = 6, n_updates: int = 1, seed: int = 0) -> List[dict]:
+    # Each ship is announced lead periods before its arrival (or at 0), with an ETA off by
+    # up to eta_error periods. Its ETA is then revised n_updates times, at evenly spaced
+    # periods, with a shrinking error. Events at the same period come arrivals first.
+    rnd = random.Random(seed)
+    stream = list()
+
+    for i in instance.ships:
+        arrival = instance.arrival_time[i]
+        announced = max(0, arrival - lead)
+
+        for k in range(n_updates + 1):
+            time = announced + (arrival - announced) * k // (n_updates + 1)
+            error = eta_error * (n_updates + 1 - k) // (n_updates + 1)
+            eta = max(time, arrival + rnd.randint(-error, error))
+            stream.append(dict(time=time, kind='announce' if k == 0 else 'eta', ship=i, eta=eta))
+
+        stream.append(dict(time=arrival, kind='arrival', ship=i, eta=arrival))
+
+    return sorted(stream, key=lambda e: (e['time'], EVENT_KINDS.index(e['kind']), e['ship']))
+
+
+class ReplaySimulator:
+    instance: Instance
+    output_folder: str
+    strategy: str
+    time_limit: float
+    backend: str
+    env: Optional['Env']
+
+    eta: Dict[int, int]
+    arrived: Dict[int, int]
+    plan: Dict[int, dict]
+
+    def __init__(self, instance: Instance, output_folder: str, strategy: str = 'greedy', time_limit: float = 1.0, backend: str = 'gurobi', env: Optional['Env'] = None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown re-planning strategy: {strategy}")
+
+        self.instance = instance
+        self.output_folder = output_folder
+        self.strategy = strategy
+        self.time_limit = time_limit
+        self.backend = backend
+        self.env = env
+
+        self.eta = dict()
+        self.arrived = dict()
+        self.plan = dict()
+
+    def started(self, t: int) -> List[int]:
+        # Ships which moored before period t: they had arrived by their mooring time.
+        return [
+            i for i, s in self.plan.items()
+            if s['mooring_time'] < t and i in self.arrived and self.arrived[i] <= s['mooring_time']
+        ]
+
+    def run(self, stream: List[dict]) -> Iterator[dict]:
+        # Processes the events in order and yields one row per event. The plan after the
+        # last event is the schedule which is carried out.
+        for k, event in enumerate(stream):
+            t, i = event['time'], event['ship']
+
+            if event['kind'] == 'arrival':
+                self.arrived[i] = t
+
+            self.eta[i] = event['eta']
+
+            start = perf_counter()
+            started = set(self.started(t))
+            plan, fallback = self.__replan(t, started)
+            latency = perf_counter() - start
+
+            moved = [
+                j for j in self.plan
+                if j not in started and (plan[j]['mooring_time'], plan[j]['mooring_berth']) != (self.plan[j]['mooring_time'], self.plan[j]['mooring_berth'])
+            ]
+
+            row = dict(
+                event=k, time=t, kind=event['kind'], ship=i, eta=event['eta'],
+                n_known=len(self.eta), n_started=len(started), latency=latency,
+                makespan=makespan(list(plan.values())), fallback=fallback, churn=len(moved),
+                shift=sum(abs(plan[j]['mooring_time'] - self.plan[j]['mooring_time']) for j in moved)
+            )
+
+            self.plan = plan
+
+            yield row
+
+    def schedule(self) -> List[dict]:
+        return sorted(self.plan.values(), key=lambda s: s['data_ship_id'])
+
+    def __earliest(self, i: int, t: int) -> int:
+        # A ship which has not arrived yet arrives after t: otherwise, its arrival would have
+        # come before the other events at t.
+        if i in self.arrived:
+            return max(self.arrived[i], t)
+
+        return max(self.eta[i], t + 1)
+
+    def __window(self, t: int, started: List[int], waiting: List[int]) -> Tuple[Instance, List[dict]]:
+        # The instance of the ships being handled at t or still waiting, from t onwards, and
+        # the fixed records of the ships being handled.
+        window = Instance(instance_file=None)
+        window.instance_file = self.instance.instance_file
+        window.n_berths = self.instance.n_berths
+        window.berths = self.instance.berths.copy()
+        window.berth_length = self.instance.berth_length.copy()
+        window.quay_length = self.instance.quay_length
+        window.n_periods = self.instance.n_periods
+        window.time_horizon = list(range(window.n_periods))
+        window.ships = sorted(started + waiting)
+        window.n_ships = len(window.ships)
+        window.ship_length = {i: self.instance.ship_length[i] for i in window.ships}
+        window.arrival_time = {i: self.__earliest(i, t) - t for i in waiting}
+        window.processing_time = {i: self.instance.processing_time[i] for i in waiting}
+        window.berth_processing_time = None if self.instance.berth_processing_time is None else \
+            np.array(self.instance.berth_processing_time)
+
+        for i in started:
+            remaining = self.plan[i]['completion_time'] - t + 1
+            window.arrival_time[i] = 0
+            window.processing_time[i] = remaining
+
+            if window.berth_processing_time is not None:
+                window.berth_processing_time[i, :] = UNAVAILABLE
+                window.berth_processing_time[i, self.plan[i]['mooring_berth']] = remaining
+
+        fixed = [ship_record(window, i, mooring_time=0, mooring_berth=self.plan[i]['mooring_berth']) for i in started]
+
+        return window, fixed
+
+    def __solve(self, window: Instance, fixed: List[dict], greedy: List[dict]) -> Optional[List[dict]]:
+        if self.strategy in MIP_STRATEGIES:
+            kwargs = dict(grb_timelimit=self.time_limit, backend=self.backend, env=self.env, use_lower_bound=True)
+        else:
+            kwargs = dict(timelimit=self.time_limit, n_workers=1, use_lower_bound=True, log_file=devnull)
+
+        solver = SOLVERS[self.strategy](instance=window, output_folder=self.output_folder, **kwargs)
+
+        if self.strategy in MIP_STRATEGIES:
+            solver.m.set_output(False)
+
+        if len(fixed) > 0:
+            solver.load_schedule(fixed, fix=True)
+
+        solver.load_schedule(greedy)
+        results = solver.solve(write_results=False)
+
+        if self.strategy in MIP_STRATEGIES:
+            solver.m.dispose()
+
+        return results['ships']
+
+    def __replan(self, t: int, started: set) -> Tuple[Dict[int, dict], bool]:
+        # New plan, and whether the strategy fell back on the greedy plan because it found no
+        # schedule within its time limit.
+        plan = {i: s for i, s in self.plan.items() if i in started}
+        ongoing = [i for i in started if self.plan[i]['completion_time'] >= t]
+        waiting = [i for i in self.eta if i not in started]
+
+        window, fixed = self.__window(t, ongoing, waiting)
+        greedy = extend_schedule(window, fixed)
+        window.n_periods = makespan(greedy) + 2
+        window.time_horizon = list(range(window.n_periods))
+
+        ships = greedy if self.strategy == 'greedy' else self.__solve(window, fixed, greedy)
+        fallback = ships is None
+
+        for s in greedy if fallback else ships:
+            if s['data_ship_id'] in waiting:
+                plan[s['data_ship_id']] = ship_record(self.instance, s['data_ship_id'], mooring_time=s['mooring_time'] + t, mooring_berth=s['mooring_berth'])
+
+        return plan, fallback
@@ -0,0 +1,241 @@
+from .instance import Instance
+from typing import Dict, Iterator, Tuple
+from datetime import datetime
+from glob import glob
+from os import path
+from uuid import uuid4
+import numpy as np
+import sqlite3
+import socket
+import fcntl
+import json
+
+
+# Normalised schema: one row per run, one row per ship in the solution of a run.
+# Any other entry of the results dictionary is stored, as JSON, in the 'extra' column.
+RUN_COLUMNS = (
+    'run_id', 'instance', 'name', 'model', 'n_ships', 'n_berths', 'n_periods', 'timestamp', 'host',
+    'feasible', 'makespan', 'dual_bound', 'solve_time', 'total_time', 'extra'
+)
+SHIP_COLUMNS = ('run_id', 'ship', 'mooring_time', 'mooring_berth', 'completion_time')
+METRICS = ('feasible', 'makespan', 'dual_bound', 'solve_time', 'total_time')
+
+
+def normalise(instance: Instance, model: str, results: dict) -> Tuple[dict, Dict[str, list]]:
+    # Older RPSolver results used a misspelt key.
+    if 'feasbile' in results:
+        results = dict(results)
+        results['feasible'] = results.pop('feasbile')
+
+    run = dict(
+        run_id=uuid4().hex,
+        instance=instance.instance_file,
+        name=path.splitext(path.basename(instance.instance_file))[0],
+        model=model,
+        n_ships=instance.n_ships,
+        n_berths=instance.n_berths,
+        n_periods=instance.n_periods,
+        timestamp=datetime.now().isoformat(),
+        host=socket.gethostname()
+    )
+    run.update({key: results.get(key) for key in METRICS})
+    run['extra'] = json.dumps({key: value for key, value in results.items() if key not in METRICS and key != 'ships'})
+
+    ships = results.get('ships') or list()
+    rows = dict(
+        run_id=[run['run_id']] * len(ships),
+        ship=[s['data_ship_id'] for s in ships],
+        mooring_time=[s['mooring_time'] for s in ships],
+        mooring_berth=[s['mooring_berth'] for s in ships],
+        completion_time=[s['completion_time'] for s in ships]
+    )
+
+    return run, rows
+
+
+class ResultsSink:
+    def write(self, instance: Instance, model: str, results: dict) -> None:
+        raise NotImplementedError
+
+
+class JsonFileSink(ResultsSink):
+    # One results-<basename>-<model>solver.json file per run, with a verbose per-ship record.
+    output_folder: str
+
+    def __init__(self, output_folder: str):
+        self.output_folder = output_folder
+
+    def write(self, instance: Instance, model: str, results: dict) -> None:
+        basename = path.splitext(path.basename(instance.instance_file))[0]
+        results_file = self.output_folder + '/results-' + basename + '-' + model + 'solver.json'
+
+        with open(results_file, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+class JsonLinesSink(ResultsSink):
+    # Append-only file with one normalised run per line. An exclusive lock around each
+    # append makes it safe to share the file between processes.
+    results_file: str
+
+    def __init__(self, results_file: str):
+        self.results_file = results_file
+
+    def write(self, instance: Instance, model: str, results: dict) -> None:
+        run, ships = normalise(instance, model, results)
+        line = json.dumps(dict(run=run, ships=ships), separators=(',', ':')) + '\n'
+
+        with open(self.results_file, mode='a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(line)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SQLiteSink(ResultsSink):
+    # SQLite database in WAL mode: concurrent writers wait on each other's transactions.
+    database: str
+    timeout: float
+
+    def __init__(self, database: str, timeout: float = 60.0):
+        self.database = database
+        self.timeout = timeout
+
+        with self.__connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f"CREATE TABLE IF NOT EXISTS runs ({', '.join(RUN_COLUMNS)}, PRIMARY KEY (run_id))")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS ships ({', '.join(SHIP_COLUMNS)})")
+            conn.execute('CREATE INDEX IF NOT EXISTS ships_run_id ON ships (run_id)')
+
+    def __connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.database, timeout=self.timeout)
+
+    def write(self, instance: Instance, model: str, results: dict) -> None:
+        run, ships = normalise(instance, model, results)
+        conn = self.__connect()
+
+        try:
+            with conn:
+                conn.execute(
+                    f"INSERT INTO runs VALUES ({', '.join('?' * len(RUN_COLUMNS))})",
+                    [run[c] for c in RUN_COLUMNS])
+                conn.executemany(
+                    f"INSERT INTO ships VALUES ({', '.join('?' * len(SHIP_COLUMNS))})",
+                    zip(*(ships[c] for c in SHIP_COLUMNS)))
+        finally:
+            conn.close()
+
+
+def open_sink(store: str) -> ResultsSink:
+    ext = path.splitext(store)[-1]
+
+    if ext == '.jsonl':
+        return JsonLinesSink(results_file=store)
+    elif ext in ('.sqlite', '.db'):
+        return SQLiteSink(database=store)
+    elif path.isdir(store):
+        return JsonFileSink(output_folder=store)
+    else:
+        raise ValueError(f"Results store not recognised: {store}")
+
+
+def _columns(rows: Dict[str, list]) -> Dict[str, np.ndarray]:
+    columns = dict()
+
+    for key, values in rows.items():
+        if key in ('makespan', 'dual_bound', 'solve_time', 'total_time'):
+            columns[key] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        elif key == 'feasible':
+            columns[key] = np.array([bool(v) for v in values], dtype=bool)
+        elif key in SHIP_COLUMNS[1:] or key in ('n_ships', 'n_berths', 'n_periods'):
+            columns[key] = np.array(values, dtype=np.int64)
+        else:
+            columns[key] = np.array(values, dtype=object)
+
+    return columns
+
+
+def _read_results(results_file: str, with_ships: bool = True) -> Tuple[dict, int]:
+    # The results in a results file, and the number of ships in the solution (-1 if none).
+    # Without ships, the ship records are dropped once counted.
+    with open(results_file) as f:
+        results = json.load(f)
+
+    n_ships = len(results['ships']) if results.get('ships') else -1
+
+    if not with_ships and results.get('ships') is not None:
+        results['ships'] = []
+
+    return results, n_ships
+
+
+def _legacy_runs(folder: str, with_ships: bool = True) -> Iterator[Tuple[Instance, str, dict]]:
+    # Per-run results files do not store the instance dimensions, so they are recovered
+    # from the solutions where possible. Without ships, the results have an empty list of
+    # ships.
+    for results_file in glob(path.join(folder, 'results-*solver.json')):
+        name, model = path.basename(results_file)[len('results-'):-len('solver.json')].rsplit('-', 1)
+        results, n_ships = _read_results(results_file, with_ships=with_ships)
+
+        instance = Instance(instance_file=None)
+        instance.instance_file = name
+        instance.n_ships = n_ships
+        instance.n_berths = -1
+        instance.n_periods = -1
+
+        yield instance, model, results
+
+
+def consolidate(folder: str, sink: ResultsSink) -> int:
+    # Imports a folder of per-run results files into another sink.
+    n = 0
+
+    for instance, model, results in _legacy_runs(folder):
+        sink.write(instance, model, results)
+        n += 1
+
+    return n
+
+
+def load_runs(store: str, ships: bool = False) -> Dict[str, np.ndarray]:
+    # Loads all runs of a store into columnar arrays. If ships is True, loads the
+    # per-ship rows instead.
+    columns = SHIP_COLUMNS if ships else RUN_COLUMNS
+    rows = {c: list() for c in columns}
+    ext = path.splitext(store)[-1]
+
+    if ext in ('.sqlite', '.db'):
+        conn = sqlite3.connect(store)
+
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {'ships' if ships else 'runs'}")
+            for c, values in zip(columns, zip(*cursor.fetchall())):
+                rows[c] = list(values)
+        finally:
+            conn.close()
+    elif ext == '.jsonl':
+        with open(store) as f:
+            for line in f:
+                record = json.loads(line)
+
+                if ships:
+                    for c in columns:
+                        rows[c].extend(record['ships'][c])
+                else:
+                    for c in columns:
+                        rows[c].append(record['run'][c])
+    elif path.isdir(store):
+        for instance, model, results in _legacy_runs(store, with_ships=ships):
+            run, ship_rows = normalise(instance, model, results)
+
+            for c in columns:
+                if ships:
+                    rows[c].extend(ship_rows[c])
+                else:
+                    rows[c].append(run[c])
+    else:
+        raise ValueError(f"Results store not recognised: {store}")
+
+    return _columns(rows)
@@ -1,24 +1,33 @@
 from .instance import Instance
-from typing import Union, List, Dict, Tuple
-from gurobipy import Model, tupledict, Var, GRB
+from .schedule import ship_record, read_ships, extend_schedule, makespan
+from .bounds import lower_bounds
+from .results import ResultsSink, JsonFileSink
+from .plotting import plot_schedule
+from typing import Union, List, Dict, Tuple, Callable, Optional
+from .backend import Backend, Var, Expr, VarDict, make_backend, BINARY, INTEGER, CONTINUOUS, INFINITY, INFEASIBLE
 from datetime import datetime
+from time import perf_counter
 from os import path
-from matplotlib.patches import Rectangle
-import matplotlib.pyplot as plt
-import json
 
 
 class RPSolver:
     instance: Instance
     output_folder: str
+    sink: ResultsSink
     grb_timelimit: float
-
-    m: Model
-    u: tupledict
-    v: tupledict
-    c: tupledict
-    sigma: tupledict
-    delta: tupledict
+    n_threads: int
+    use_lower_bound: bool
+    lazy_pairs: bool
+    backend: str
+    combinatorial_bounds: Dict[str, int]
+
+    m: Backend
+    u: VarDict
+    v: VarDict
+    c: VarDict
+    sigma: VarDict
+    delta: VarDict
+    z: VarDict
     makespan: Var
 
     u_lb: Dict[int, int]
@@ -29,6 +38,13 @@ class RPSolver:
     start_ti: datetime
 
     ij: List[Tuple[int, int]]
+    z_ij: List[Tuple[int, int]]
+    handling: Dict[int, Union[int, Expr]]
+
+    latest_completion: Dict[int, int]
+    lazy_ij: List[Tuple[int, int]]
+    incumbent: Optional[List[dict]]
+    n_lazy_rounds: int
 
     def __init__(self, instance: Union[str, Instance], output_folder: str, **kwargs):
         if type(instance) is Instance:
@@ -39,12 +55,26 @@ class RPSolver:
             raise TypeError(f"Type not supported for instance: {type(instance)}")
         
         self.output_folder = output_folder
+        self.sink = kwargs.get('sink', JsonFileSink(output_folder))
 
+        self.backend = kwargs.get('backend', 'gurobi')
+        self.lazy_pairs = kwargs.get('lazy_pairs', False)
+        self.incumbent = None
         self.start_ti = datetime.now()
         self.__compute_bounds()
-        self.__build_model()
+        self.__build_model(env=kwargs.get('env'))
+
+        if kwargs.get('log_file') is not None:
+            self.m.set_log_file(kwargs['log_file'])
 
         self.grb_timelimit = kwargs.get('grb_timelimit', 3600.0)
+        self.n_threads = kwargs.get('n_threads', 1)
+        self.combinatorial_bounds = lower_bounds(self.instance)
+
+        self.use_lower_bound = kwargs.get('use_lower_bound', False)
+
+        if self.use_lower_bound:
+            self.m.set_bounds(self.makespan, self.combinatorial_bounds['best'], INFINITY)
 
     def __compute_bounds(self) -> None:
         self.u_lb = dict()
@@ -54,112 +84,292 @@ class RPSolver:
 
         for i in self.instance.ships:
             self.u_lb[i] = self.instance.arrival_time[i]
-            self.u_ub[i] = self.instance.n_periods - self.instance.processing_time[i] + 1
-            self.c_lb[i] = self.instance.arrival_time[i] + self.instance.processing_time[i] - 1
+            self.u_ub[i] = self.instance.n_periods - self.instance.min_processing_time(i)
+            self.c_lb[i] = self.instance.arrival_time[i] + self.instance.min_processing_time(i) - 1
             self.v_ub[i] = self.instance.n_berths - self.instance.ship_length_in_n_berths(i)
 
-    def __build_model(self) -> None:
+        if self.lazy_pairs:
+            self.__compute_windows()
+
+    def __compute_windows(self) -> None:
+        # With lazy pairs, a ship's window runs from its arrival to its completion in the
+        # greedy schedule, which is also the first incumbent. Every ship can finish as late
+        # as the horizon, so the windows only guess which pairs interact: pairs outside them
+        # are added back when a solution of the model overlaps them.
+        self.incumbent = extend_schedule(self.instance, [])
+        self.latest_completion = {s['data_ship_id']: s['completion_time'] for s in self.incumbent}
+
+    def __interacting(self, i: int, j: int) -> bool:
+        return self.instance.arrival_time[i] <= self.latest_completion[j] and \
+            self.instance.arrival_time[j] <= self.latest_completion[i]
+
+    def __build_model(self, env=None) -> None:
+        self.m = make_backend(self.backend, env=env)
+        self.u, self.v, self.c = self.m.var_dict(), self.m.var_dict(), self.m.var_dict()
+        self.sigma, self.delta, self.z = self.m.var_dict(), self.m.var_dict(), self.m.var_dict()
+        self.ij, self.z_ij, self.lazy_ij = list(), list(), list()
+        self.handling = dict()
+        self.n_lazy_rounds = 0
+        self.makespan = self.m.add_var(vtype=CONTINUOUS, lb=0, ub=INFINITY, obj=1, name='makespan')
+
+        self.__add_ships(self.instance.ships)
+
+    def __add_ships(self, ships: List[int]) -> None:
+        # Adds the variables of the given ships, and the constraints involving at least one
+        # of them. All constraints are per ship or per pair of ships, so that a model built
+        # for some ships can be extended with more.
+        new = set(ships)
+        pairs = [(i, j) for i in self.instance.ships for j in self.instance.ships if i < j and (i in new or j in new)]
+
+        # Ships whose handling time depends on the berth choose it via variables z. For all
+        # other ships, the handling time is a constant and v alone gives the berth.
+        z_ij = [
+            (i, j)
+            for i in ships if self.instance.berth_dependent(i)
+            for j in self.instance.handling_times(i)
+        ]
+
+        # Fresh dictionaries: a dictionary of variables caches its index for sum() when first queried.
+        self.u = self.m.var_dict({**self.u, **self.m.add_vars(ships, vtype=INTEGER, lb=self.u_lb, ub=self.u_ub, name='u')})
+        self.v = self.m.var_dict({**self.v, **self.m.add_vars(ships, vtype=INTEGER, lb=0, ub=self.v_ub, name='v')})
+        self.c = self.m.var_dict({**self.c, **self.m.add_vars(ships, vtype=CONTINUOUS, lb=self.c_lb, ub=INFINITY, name='c')})
+        self.z = self.m.var_dict({**self.z, **self.m.add_vars(z_ij, vtype=BINARY, name='z')})
+        self.z_ij += z_ij
+
+        for i in ships:
+            if self.instance.berth_dependent(i):
+                self.handling[i] = sum(p * self.z[i,j] for j, p in self.instance.handling_times(i).items())
+                # Bound u[i] + handling[i] as u_ub does for a fixed handling time.
+                self.m.set_bounds(self.c[i], self.c_lb[i], self.instance.n_periods - 1)
+            else:
+                self.handling[i] = self.instance.processing_time[i]
+
+        self.m.add_constrs((
+            self.z.sum(i, '*') == 1
+            for i in ships if self.instance.berth_dependent(i)
+        ), name='one_z')
+
+        self.m.add_constrs((
+            self.v[i] == sum(j * self.z[i,j] for j in self.instance.handling_times(i))
+            for i in ships if self.instance.berth_dependent(i)
+        ), name='link_v_z')
+
+        self.m.add_constrs((
+            self.makespan >= self.c[i] for i in ships
+        ), name='set_makespan')
+        self.m.add_constrs((
+            self.c[i] == self.u[i] + self.handling[i] - 1 for i in ships
+        ), name='set_c')
+
+        if self.lazy_pairs:
+            self.lazy_ij += [(i, j) for i, j in pairs if not self.__interacting(i, j)]
+            pairs = [(i, j) for i, j in pairs if self.__interacting(i, j)]
+
+        self.__add_pairs(pairs)
+
+    def __add_pairs(self, pairs: List[Tuple[int, int]]) -> None:
+        # Adds the no-overlap variables and constraints of the given pairs of ships, each
+        # pair given once as (i, j) with i < j.
         if self.instance.n_periods is not None:
             M = self.instance.n_periods
         else:
             M = max(self.c_lb.values()) * 1.5
 
-        self.ij = [(i, j) for i in self.instance.ships for j in self.instance.ships if i != j]
-
-        self.m = Model()
-        self.u = self.m.addVars(self.instance.ships, vtype=GRB.INTEGER, lb=self.u_lb, ub=self.u_ub, name='u')
-        self.v = self.m.addVars(self.instance.ships, vtype=GRB.INTEGER, lb=0, ub=self.v_ub, name='v')
-        self.c = self.m.addVars(self.instance.ships, vtype=GRB.CONTINUOUS, lb=self.c_lb, ub=GRB.INFINITY, name='c')
-        self.makespan = self.m.addVar(vtype=GRB.CONTINUOUS, lb=0, ub=GRB.INFINITY, obj=1, name='makespan')
-        self.sigma = self.m.addVars(self.ij, vtype=GRB.BINARY, name='sigma')
-        self.delta = self.m.addVars(self.ij, vtype=GRB.BINARY, name='delta')
+        pairs = set(pairs)
+        ij = [(i, j) for i in self.instance.ships for j in self.instance.ships if (min(i, j), max(i, j)) in pairs and i != j]
 
-        self.m.addConstrs((
-            self.makespan >= self.c[i] for i in self.instance.ships
-        ), name='set_makespan')
-        self.m.addConstrs((
-            self.c[i] == self.u[i] + self.instance.processing_time[i] - 1 for i in self.instance.ships
-        ), name='set_c')
+        self.sigma = self.m.var_dict({**self.sigma, **self.m.add_vars(ij, vtype=BINARY, name='sigma')})
+        self.delta = self.m.var_dict({**self.delta, **self.m.add_vars(ij, vtype=BINARY, name='delta')})
+        self.ij += ij
 
-        self.m.addConstrs((
-            self.u[j] >= self.u[i] + self.instance.processing_time[i] + (self.sigma[i,j] - 1) * M
-            for i, j in self.ij
+        self.m.add_constrs((
+            self.u[j] >= self.u[i] + self.handling[i] + (self.sigma[i,j] - 1) * M
+            for i, j in ij
         ), name='u_sigma_no_overlap')
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             self.v[j] >= self.v[i] + self.instance.ship_length_in_n_berths(i) + (self.delta[i,j] - 1) * self.instance.n_berths
-            for i, j in self.ij
+            for i, j in ij
         ), name='v_delta_no_overlap')
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             self.sigma[i,j] + self.sigma[j,i] + self.delta[i,j] + self.delta[j,i] >= 1
-            for i, j in self.ij
+            for i, j in ij
         ), name='sigma_delta_at_least_one')
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             self.sigma[i,j] + self.sigma[j,i] <= 1
-            for i, j in self.ij
+            for i, j in ij
         ), name='sigma_at_most_one')
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             self.delta[i,j] + self.delta[j,i] <= 1
-            for i, j in self.ij
+            for i, j in ij
         ), name='delta_at_most_one')
 
-    def load_initial(self, initial_file: str, fix: bool = False) -> None:
-        with open(initial_file) as f:
-            init = json.load(f)
+    def add_ships(self, instance: Instance) -> None:
+        # Extends the model to an instance with more ships, e.g., a longer truncation of
+        # the same instance. Variables and constraints already in the model are kept.
+        if any(i not in instance.ships for i in self.instance.ships):
+            raise ValueError('The new instance must contain all ships of the current one')
+
+        new = [i for i in instance.ships if i not in self.instance.ships]
+
+        self.instance = instance
+        self.start_ti = datetime.now()
+        self.__compute_bounds()
+        self.__add_ships(new)
+        self.combinatorial_bounds = lower_bounds(self.instance)
+
+        if self.use_lower_bound:
+            self.m.set_bounds(self.makespan, self.combinatorial_bounds['best'], INFINITY)
 
-        for data in init['ships']:
+    def start_values(self, ships: List[dict]) -> List[Tuple[Var, float]]:
+        values = list()
+
+        for data in ships:
             i = data['data_ship_id']
-            j = self.instance.rightmost_berth_containing_position(data['mooring_position'])
-            t = data['mooring_time']
+            values.append((self.u[i], data['mooring_time']))
+            values.append((self.v[i], data['mooring_berth']))
 
-            if fix:
-                self.u[i].LB = self.u[i].UB = t
-                self.v[i].LB = self.v[i].UB = j
-            else:
-                self.u[i].Start = t
-                self.v[i].Start = j
+            if (i, data['mooring_berth']) in self.z:
+                values.append((self.z[i, data['mooring_berth']], 1))
+
+        return values
+
+    def load_schedule(self, ships: List[dict], fix: bool = False) -> None:
+        if fix:
+            for var, value in self.start_values(ships):
+                self.m.set_bounds(var, value, value)
+        else:
+            self.m.set_start(self.start_values(ships))
+
+            if self.lazy_pairs:
+                self.__update_incumbent(ships)
+
+    def unfix(self, ships: List[int]) -> None:
+        for i in ships:
+            self.m.set_bounds(self.u[i], self.u_lb[i], self.u_ub[i])
+            self.m.set_bounds(self.v[i], 0, self.v_ub[i])
+
+            for j in self.instance.handling_times(i):
+                if (i, j) in self.z:
+                    self.m.set_bounds(self.z[i,j], 0, 1)
+
+    def load_initial(self, initial_file: str, fix: bool = False) -> None:
+        self.load_schedule(read_ships(initial_file), fix=fix)
 
-    def solve(self, compute_iis: bool = False) -> None:
+    def schedule(self, values: Callable[[VarDict], Dict]) -> List[dict]:
+        u = values(self.u)
+        v = values(self.v)
+
+        return [
+            ship_record(self.instance, i, mooring_time=int(round(u[i])), mooring_berth=int(round(v[i])))
+            for i in self.instance.ships
+        ]
+
+    def __update_incumbent(self, ships: List[dict]) -> None:
+        if len(ships) == len(self.instance.ships) and (self.incumbent is None or makespan(ships) < makespan(self.incumbent)):
+            self.incumbent = ships
+
+    def __overlapping_pairs(self, ships: List[dict]) -> List[Tuple[int, int]]:
+        # Pairs not in the model whose rectangles overlap in the given schedule.
+        ships = {s['data_ship_id']: s for s in ships}
+
+        def overlap(i: int, j: int) -> bool:
+            si, sj = ships[i], ships[j]
+
+            return si['mooring_time'] <= sj['completion_time'] and sj['mooring_time'] <= si['completion_time'] and \
+                si['mooring_berth'] < sj['mooring_berth'] + sj['data_ship_length_in_berths'] and \
+                sj['mooring_berth'] < si['mooring_berth'] + si['data_ship_length_in_berths']
+
+        return [(i, j) for i, j in self.lazy_ij if overlap(i, j)]
+
+    def __optimize_lazy(self, callback: Optional[Callable] = None) -> Tuple[float, Optional[float]]:
+        # Solves the model with the pairs added so far. Incumbents overlapping a pair not in
+        # the model give the pairs to add; the others are feasible schedules. When the final
+        # solution overlaps some pair, the pairs found are added and the model is solved
+        # again, starting from the best feasible schedule, within the same time limit.
+        # Gurobi lazy constraints cannot do this, as the missing pairs also need variables.
+        # Returns the total solver time and the best bound: each round solves a relaxation.
+        start = perf_counter()
+        runtime, bound = 0.0, None
+
+        while True:
+            violated = set()
+
+            def on_incumbent(values: Callable[[VarDict], Dict]) -> None:
+                ships = self.schedule(values)
+                pairs = self.__overlapping_pairs(ships)
+
+                if len(pairs) > 0:
+                    violated.update(pairs)
+                else:
+                    self.__update_incumbent(ships)
+
+            if self.incumbent is not None:
+                self.m.set_start(self.start_values(self.incumbent))
+
+            self.m.set_time_limit(max(0.0, self.grb_timelimit - (perf_counter() - start)))
+            self.m.optimize(callback, on_incumbent=on_incumbent)
+            runtime += self.m.runtime
+            self.n_lazy_rounds += 1
+
+            if self.m.status == INFEASIBLE:
+                break
+
+            bound = self.m.obj_bound if bound is None else max(bound, self.m.obj_bound)
+
+            if self.m.sol_count == 0:
+                break
+
+            # The final solution decides whether another round is needed.
+            ships = self.schedule(self.m.values)
+            final = self.__overlapping_pairs(ships)
+
+            if len(final) == 0:
+                self.__update_incumbent(ships)
+                break
+
+            violated.update(final)
+
+            if perf_counter() - start >= self.grb_timelimit:
+                break
+
+            self.lazy_ij = [pair for pair in self.lazy_ij if pair not in violated]
+            self.__add_pairs(sorted(violated))
+
+        return runtime, bound
+
+    def solve(self, compute_iis: bool = False, callback: Optional[Callable] = None, write_results: bool = True) -> dict:
         basename = path.splitext(path.basename(self.instance.instance_file))[0]
-        self.m.setParam(GRB.Param.TimeLimit, self.grb_timelimit)
-        self.m.setParam(GRB.Param.Threads, 1)
-        self.m.optimize()
+        self.m.set_time_limit(self.grb_timelimit)
+        self.m.set_threads(self.n_threads)
+
+        if self.lazy_pairs:
+            runtime, bound = self.__optimize_lazy(callback)
+        else:
+            self.m.optimize(callback)
+            runtime = self.m.runtime
 
         end_ti = datetime.now()
         elapsed_time = (end_ti - self.start_ti).total_seconds()
 
-        if self.m.SolCount > 0:
+        if self.m.sol_count > 0:
             results = dict(
-                feasbile=True,
-                makespan=self.m.ObjVal,
-                dual_bound=self.m.ObjBound,
-                solve_time=self.m.Runtime,
+                feasible=True,
+                makespan=self.m.obj_val,
+                dual_bound=self.m.obj_bound,
+                solve_time=runtime,
                 total_time=elapsed_time,
-                ships=list()
+                ships=self.schedule(self.m.values)
             )
-
-            for i in self.instance.ships:
-                mooring_berth = int(self.v[i].X)
-                results['ships'].append(dict(
-                    data_ship_id=i,
-                    data_arrival_time=self.instance.arrival_time[i],
-                    data_handling_time=self.instance.processing_time[i],
-                    data_ship_length=self.instance.ship_length[i],
-                    data_ship_length_in_berths=self.instance.ship_length_in_n_berths(i),
-                    mooring_time=int(self.u[i].X),
-                    completion_time=int(self.u[i].X) + self.instance.processing_time[i] - 1,
-                    mooring_position=self.instance.berth_start(mooring_berth),
-                    mooring_berth=mooring_berth
-                ))
-        elif self.m.Status != GRB.INFEASIBLE:
+        elif self.m.status != INFEASIBLE:
             results = dict(
                 feasible=True,
                 makespan=None,
-                dual_bound=self.m.ObjBound,
-                solve_time=self.m.Runtime,
+                dual_bound=self.m.obj_bound,
+                solve_time=runtime,
                 total_time=elapsed_time,
                 ships=None
             )
@@ -168,12 +378,10 @@ class RPSolver:
             self.instance.print()
 
             if compute_iis:
-                self.m.computeIIS()
                 model_file = 'infeas-' + basename + '-rpmodel.lp'
                 ilp_file = 'infeas-' + basename + '-rpiis.ilp'
 
-                self.m.write(model_file)
-                self.m.write(ilp_file)
+                self.m.compute_iis(model_file, ilp_file)
 
                 print(f"Infeasible model. Model written to {model_file}. IIS written to {ilp_file}.")
 
@@ -181,42 +389,32 @@ class RPSolver:
                 feasible=False,
                 makespan=None,
                 dual_bound=None,
-                solve_time=self.m.Runtime,
+                solve_time=runtime,
                 total_time=elapsed_time,
                 ships=None
             )
 
-        results_file = self.output_folder + '/results-' + basename + '-rpsolver.json'
-
-        with open(results_file, 'w') as f:
-            json.dump(results, f, indent=2)
-
-    def print_variables(self) -> None:
-        fig, ax = plt.subplots(figsize=(10,10))
-
-        min_y, max_y = 9999, 0
+        if self.lazy_pairs and results['feasible']:
+            # The model without some pairs is a relaxation: its bound holds, but its
+            # solution may not be feasible.
+            results['makespan'] = None if self.incumbent is None else makespan(self.incumbent)
+            results['dual_bound'] = bound
+            results['ships'] = self.incumbent
 
-        for idx, i in enumerate(self.instance.ships):
-            j = self.v[i].X
-            t = self.u[i].X
+        if self.lazy_pairs:
+            results['lazy_pairs'] = dict(n_modelled=len(self.ij) // 2, n_lazy=len(self.lazy_ij), n_rounds=self.n_lazy_rounds)
 
-            ax.scatter([j], [t], label=f"Ship {i}. Variables (v,u).", color=f"C{idx}", s=100, edgecolor='red')
-            ax.add_patch(Rectangle(xy=(j,t), width=self.instance.ship_length_in_n_berths(i), height=self.instance.processing_time[i], facecolor='none', edgecolor=f"C{idx}"))
-            ax.axhline(y=self.instance.arrival_time[i], color=f"C{idx}", linestyle=':', alpha=0.75, label=f"Ship {i}. Arrival time.")
+        results['lower_bounds'] = self.combinatorial_bounds
 
-            end_t = t + self.instance.processing_time[i] - 1
+        if write_results:
+            self.sink.write(self.instance, 'rp', results)
 
-            if t < min_y:
-                min_y = int(t)
-            if end_t > max_y:
-                max_y = int(end_t)
-
-        ax.legend(loc='upper right', bbox_to_anchor=(1.3,1))
-        ax.set_xticks(range(self.instance.n_berths + 1))
-        ax.set_yticks(range(min_y, max_y + 2))
-        ax.xaxis.grid(which='major', color='black', linestyle='--', alpha=0.05)
-        ax.yaxis.grid(which='major', color='black', linestyle='--', alpha=0.05)
-        ax.set_axisbelow(True)
+        return results
 
+    def print_variables(self) -> None:
         basename = path.splitext(path.basename(self.instance.instance_file))[0]
-        fig.savefig(self.output_folder + '/variables-' + basename + '-rpsolver.png', bbox_inches='tight', dpi=96)
+        plot_schedule(
+            ships=self.schedule(self.m.values),
+            output_file=self.output_folder + '/variables-' + basename + '-rpsolver.png',
+            n_berths=self.instance.n_berths,
+            title=f"{basename}. Variables (v,u).")
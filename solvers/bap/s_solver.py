@@ -1,31 +1,48 @@
 from .instance import Instance
-from typing import Union, Dict, List
-from gurobipy import Model, tupledict, Var, GRB
+from .schedule import ship_record, read_ships, extend_schedule, makespan
+from .pairs import PairClassification
+from .bounds import lower_bounds
+from .results import ResultsSink, JsonFileSink
+from typing import Union, Dict, List, Set, Tuple, Callable, Optional
+from .backend import Backend, Var, Expr, VarDict, make_backend, BINARY, INTEGER, CONTINUOUS, INFEASIBLE
 from datetime import datetime
 from os import path
-import json
 
 
 class SSolver:
     instance: Instance
     output_folder: str
+    sink: ResultsSink
     grb_timelimit: float
+    n_threads: int
+    backend: str
+    filter_pairs: bool
+    valid_inequalities: bool
+    combinatorial_bounds: Dict[str, int]
 
     T: int
+    latest: int
     time: List[int]
 
-    m: Model
-    x: tupledict
-    I: tupledict
-    s: tupledict
-    c: tupledict
-    y: tupledict
+    m: Backend
+    x: VarDict
+    I: VarDict
+    s: VarDict
+    c: VarDict
+    y: VarDict
+    z: VarDict
     makespan: Var
 
     s_lb: Dict[int, int]
     s_ub: Dict[int, int]
     c_lb: Dict[int, int]
     y_ub: Dict[int, int]
+    z_ij: List[Tuple[int, int]]
+    x_ij: List[Tuple[int, int]]
+    I_ij: List[Tuple[int, int]]
+    x_forced: Set[Tuple[int, int]]
+    I_forced: Set[Tuple[int, int]]
+    handling: Dict[int, Union[int, Expr]]
 
     start_ti: datetime
 
@@ -38,12 +55,24 @@ class SSolver:
             raise TypeError(f"Type not supported for instance: {type(instance)}")
         
         self.output_folder = output_folder
+        self.sink = kwargs.get('sink', JsonFileSink(output_folder))
 
+        self.backend = kwargs.get('backend', 'gurobi')
+        self.filter_pairs = kwargs.get('filter_pairs', False)
+        self.valid_inequalities = kwargs.get('valid_inequalities', True)
         self.start_ti = datetime.now()
         self.__compute_bounds()
-        self.__build_model()
+        self.__build_model(env=kwargs.get('env'))
+
+        if kwargs.get('log_file') is not None:
+            self.m.set_log_file(kwargs['log_file'])
 
         self.grb_timelimit = kwargs.get('grb_timelimit', 3600.0)
+        self.n_threads = kwargs.get('n_threads', 1)
+        self.combinatorial_bounds = lower_bounds(self.instance)
+
+        if kwargs.get('use_lower_bound', False):
+            self.m.set_bounds(self.makespan, self.combinatorial_bounds['best'], self.latest)
 
     def __compute_bounds(self):
         if self.instance.n_periods is not None:
@@ -60,109 +89,191 @@ class SSolver:
         }
 
         self.s_ub = {
-            i: self.T - self.instance.processing_time[i] for i in self.instance.ships
+            i: self.T - self.instance.min_processing_time(i) for i in self.instance.ships
         }
 
         self.c_lb = {
-            i: self.instance.arrival_time[i] + self.instance.processing_time[i] - 1 for i in self.instance.ships
+            i: self.instance.arrival_time[i] + self.instance.min_processing_time(i) - 1 for i in self.instance.ships
         }
 
         self.y_ub = {
             i: self.instance.n_berths - self.instance.ship_length_in_n_berths(i) for i in self.instance.ships
         }
 
-    def __build_model(self):
+        # Ships whose handling time depends on the berth choose it via variables z. For all
+        # other ships, the handling time is a constant and y alone gives the berth.
+        self.z_ij = [
+            (i, j)
+            for i in self.instance.ships if self.instance.berth_dependent(i)
+            for j in self.instance.handling_times(i)
+        ]
+
+        diff_ships = [(i1, i2) for i1 in self.instance.ships for i2 in self.instance.ships if i1 != i2]
+
+        if self.filter_pairs:
+            # Only schedules no worse than the greedy one are searched, so that every ship
+            # completes by its makespan. Variables x and I are only created for free pairs.
+            self.latest = makespan(extend_schedule(self.instance, []))
+            self.s_ub = {
+                i: min(self.s_ub[i], self.latest - self.instance.min_processing_time(i) + 1) for i in self.instance.ships
+            }
+
+            pairs = PairClassification(self.instance, self.latest)
+            self.x_ij, self.I_ij = pairs.x_ij, pairs.I_ij
+            self.x_forced, self.I_forced = pairs.x_forced, pairs.I_forced
+        else:
+            self.latest = self.T
+            self.x_ij, self.I_ij = diff_ships, diff_ships
+            self.x_forced, self.I_forced = set(), set()
+
+    def __x(self, i1: int, i2: int) -> Union[Var, int]:
+        # Variable x, or its value for a pair without variables.
+        if (i1, i2) in self.x:
+            return self.x[i1, i2]
+
+        return int((i1, i2) in self.x_forced)
+
+    def __I(self, i1: int, i2: int) -> Union[Var, int]:
+        if (i1, i2) in self.I:
+            return self.I[i1, i2]
+
+        return int((i1, i2) in self.I_forced)
+
+    def __free(self, i1: int, i2: int) -> bool:
+        return (i1, i2) in self.x or (i2, i1) in self.x or (i1, i2) in self.I or (i2, i1) in self.I
+
+    def __same_handling(self, i1: int, i2: int) -> bool:
+        # True if the two ships have the same handling time at every berth.
+        if self.instance.berth_dependent(i1) or self.instance.berth_dependent(i2):
+            return self.instance.handling_times(i1) == self.instance.handling_times(i2)
+
+        return self.instance.processing_time[i1] == self.instance.processing_time[i2]
+
+    def __build_model(self, env=None):
         M = 1e4
         diff_ships = [(i1, i2) for i1 in self.instance.ships for i2 in self.instance.ships if i1 != i2]
 
-        self.m = Model()
-        self.x = self.m.addVars(diff_ships, vtype=GRB.BINARY, name='x')
-        self.I = self.m.addVars(diff_ships, vtype=GRB.BINARY, name='I')
-        self.s = self.m.addVars(self.instance.ships, vtype=GRB.INTEGER, lb=self.s_lb, ub=self.s_ub, name='s')
-        self.c = self.m.addVars(self.instance.ships, vtype=GRB.CONTINUOUS, lb=self.c_lb, ub=self.T, name='c')
-        self.y = self.m.addVars(self.instance.ships, vtype=GRB.INTEGER, lb=0, ub=self.y_ub, name='y')
-        self.makespan = self.m.addVar(vtype=GRB.CONTINUOUS, lb=0, ub=self.T, obj=1, name='makespan')
+        self.m = make_backend(self.backend, env=env)
+        self.x = self.m.add_vars(self.x_ij, vtype=BINARY, name='x')
+        self.I = self.m.add_vars(self.I_ij, vtype=BINARY, name='I')
+        self.s = self.m.add_vars(self.instance.ships, vtype=INTEGER, lb=self.s_lb, ub=self.s_ub, name='s')
+        self.c = self.m.add_vars(self.instance.ships, vtype=CONTINUOUS, lb=self.c_lb, ub=self.latest, name='c')
+        self.y = self.m.add_vars(self.instance.ships, vtype=INTEGER, lb=0, ub=self.y_ub, name='y')
+        self.z = self.m.add_vars(self.z_ij, vtype=BINARY, name='z')
+        self.makespan = self.m.add_var(vtype=CONTINUOUS, lb=0, ub=self.latest, obj=1, name='makespan')
+
+        self.handling = dict()
+
+        for i in self.instance.ships:
+            if self.instance.berth_dependent(i):
+                self.handling[i] = sum(p * self.z[i,j] for j, p in self.instance.handling_times(i).items())
+            else:
+                self.handling[i] = self.instance.processing_time[i]
+
+        self.m.add_constrs((
+            self.z.sum(i, '*') == 1
+            for i in self.instance.ships if self.instance.berth_dependent(i)
+        ), name='one_z')
+
+        self.m.add_constrs((
+            self.y[i] == sum(j * self.z[i,j] for j in self.instance.handling_times(i))
+            for i in self.instance.ships if self.instance.berth_dependent(i)
+        ), name='link_y_z')
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             self.makespan >= self.c[i] for i in self.instance.ships
         ), name='set_makespan')
 
-        self.m.addConstrs((
-            self.c[i] == self.s[i] + self.instance.processing_time[i] - 1
+        self.m.add_constrs((
+            self.c[i] == self.s[i] + self.handling[i] - 1
             for i in self.instance.ships
         ), name='set_c')
 
-        self.m.addConstrs((
-            self.x[i1, i2] + self.x[i2, i1] + self.I[i1, i2] + self.I[i2, i1] == 1
-            for i1, i2 in diff_ships
+        self.m.add_constrs((
+            self.__x(i1, i2) + self.__x(i2, i1) + self.__I(i1, i2) + self.__I(i2, i1) == 1
+            for i1, i2 in diff_ships if self.__free(i1, i2)
         ), name='max_one_x_I')
 
-        self.m.addConstrs((
-            self.s[i2] >= self.c[i1] + 1 - M * (1 - self.x[i1,i2])
-            for i1, i2 in diff_ships
+        self.m.add_constrs((
+            self.s[i2] >= self.c[i1] + 1 - M * (1 - self.__x(i1, i2))
+            for i1, i2 in diff_ships if (i1, i2) in self.x or (i1, i2) in self.x_forced
         ), name='link_sc_x')
 
-        self.m.addConstrs((
-            self.y[i2] >= self.instance.ship_length_in_n_berths(i1) * self.I[i1,i2] +\
+        self.m.add_constrs((
+            self.y[i2] >= self.instance.ship_length_in_n_berths(i1) * self.__I(i1, i2) +\
                 self.y[i1] -\
-                (self.instance.n_berths - self.instance.ship_length_in_n_berths(i1)) * (1 - self.I[i1, i2])
-            for i1, i2 in diff_ships
+                (self.instance.n_berths - self.instance.ship_length_in_n_berths(i1)) * (1 - self.__I(i1, i2))
+            for i1, i2 in diff_ships if (i1, i2) in self.I or (i1, i2) in self.I_forced
         ), name='link_y_I')
 
-        self.m.addConstrs((
+        if self.valid_inequalities:
+            self.__add_valid_inequalities()
+
+    def __add_valid_inequalities(self) -> None:
+        # Constraints which only strengthen the model: no stacking of ships too wide to fit
+        # side by side, symmetry breaking between ships which only differ by their arrival
+        # times, and bounds on the mooring time and berth of each ship from the ships before
+        # it or below it.
+        diff_ships = [(i1, i2) for i1 in self.instance.ships for i2 in self.instance.ships if i1 != i2]
+
+        self.m.add_constrs((
             sum(
                 self.I[i1,i2]
                 for i2 in self.instance.ships
                 if i2 != i1 and \
                     self.instance.ship_length_in_n_berths(i1) + self.instance.ship_length_in_n_berths(i2) > self.instance.n_berths
             ) == 0 for i1 in self.instance.ships
+            # With filtered pairs, incompatible ships have no variables I.
+            if not self.filter_pairs
         ), name='incompatible_I')
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             self.c[i1] <= self.c[i2]
             for i1, i2 in diff_ships
             if self.instance.arrival_time[i1] <= self.instance.arrival_time[i2] and \
-                self.instance.processing_time[i1] == self.instance.processing_time[i2] and \
+                self.__same_handling(i1, i2) and \
                 self.instance.ship_length_in_n_berths(i1) == self.instance.ship_length_in_n_berths(i2) and \
                 i1 <= i2
         ), name='incompatible_c')
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             self.x[i2,i1] == 0
             for i1, i2 in diff_ships
-            if self.instance.arrival_time[i1] <= self.instance.arrival_time[i2] and \
-                self.instance.processing_time[i1] == self.instance.processing_time[i2] and \
+            if (i2, i1) in self.x and \
+                self.instance.arrival_time[i1] <= self.instance.arrival_time[i2] and \
+                self.__same_handling(i1, i2) and \
                 self.instance.ship_length_in_n_berths(i1) == self.instance.ship_length_in_n_berths(i2) and \
                 i1 <= i2
         ), name='incompatible_x')
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             self.x[i2,i1] <= sum(
-                self.I[i3,i1] + self.I[i1,i3]
+                self.__I(i3, i1) + self.__I(i1, i3)
                 for i3 in self.instance.ships
                 if i3 != i1 and i3 != i2
             )
             for i1, i2 in diff_ships
-            if self.instance.arrival_time[i1] <= self.instance.arrival_time[i2] and \
-                self.instance.processing_time[i1] == self.instance.processing_time[i2] and \
+            if (i2, i1) in self.x and \
+                self.instance.arrival_time[i1] <= self.instance.arrival_time[i2] and \
+                self.__same_handling(i1, i2) and \
                 self.instance.ship_length_in_n_berths(i1) < self.instance.ship_length_in_n_berths(i2) and \
                 i1 <= i2
         ), name='vi_x_I')
 
         min_arrival = min(self.instance.arrival_time.values())
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             self.instance.n_berths * self.s[i1] >= self.instance.n_berths * min_arrival + sum(
-                self.instance.processing_time[i2] * self.instance.ship_length_in_n_berths(i2) * self.x[i2,i1]
+                self.instance.min_processing_time(i2) * self.instance.ship_length_in_n_berths(i2) * self.__x(i2, i1)
                 for i2 in self.instance.ships
                 if i2 != i1
             )
             for i1 in self.instance.ships
         ), name='vi_s_x_1')
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             self.s[i1] >= min_arrival + sum(
-                self.instance.processing_time[i2] / k * self.x[i2,i1]
+                self.instance.min_processing_time(i2) / k * self.__x(i2, i1)
                 for i2 in self.instance.ships
                 if i2 != i1 and \
                     (k + 1) * self.instance.ship_length_in_n_berths(i2) > self.instance.n_berths
@@ -171,77 +282,89 @@ class SSolver:
             for k in [1,2,3]
         ), name='vi_s_x_2')
 
-        self.m.addConstrs((
+        self.m.add_constrs((
             self.y[i1] <= sum(
-                self.instance.ship_length_in_n_berths(i2) * self.I[i2,i1]
+                self.instance.ship_length_in_n_berths(i2) * self.__I(i2, i1)
                 for i2 in self.instance.ships
                 if i2 != i1
             )
             for i1 in self.instance.ships
         ), name='vi_y_I')
 
-    def load_initial(self, initial_file: str, fix: bool = False) -> None:
-        with open(initial_file) as f:
-            init = json.load(f)
+    def start_values(self, ships: List[dict]) -> List[Tuple[Var, float]]:
+        values = list()
 
-        for data in init['ships']:
+        for data in ships:
             i = data['data_ship_id']
-            if fix:
-                self.s[i].LB = self.s[i].UB = data['mooring_time']
-                self.y[i].LB = self.y[i].UB = data['mooring_berth']
-            else:
-                self.s[i].Start = data['mooring_time']
-                self.y[i].Start = data['mooring_berth']
+            values.append((self.s[i], data['mooring_time']))
+            values.append((self.y[i], data['mooring_berth']))
+
+            if (i, data['mooring_berth']) in self.z:
+                values.append((self.z[i, data['mooring_berth']], 1))
 
-    def solve(self, compute_iis: bool = False) -> None:
+        return values
+
+    def load_schedule(self, ships: List[dict], fix: bool = False) -> None:
+        if fix:
+            for var, value in self.start_values(ships):
+                self.m.set_bounds(var, value, value)
+        else:
+            self.m.set_start(self.start_values(ships))
+
+    def unfix(self, ships: List[int]) -> None:
+        for i in ships:
+            self.m.set_bounds(self.s[i], self.s_lb[i], self.s_ub[i])
+            self.m.set_bounds(self.y[i], 0, self.y_ub[i])
+
+            for j in self.instance.handling_times(i):
+                if (i, j) in self.z:
+                    self.m.set_bounds(self.z[i,j], 0, 1)
+
+    def load_initial(self, initial_file: str, fix: bool = False) -> None:
+        self.load_schedule(read_ships(initial_file), fix=fix)
+
+    def schedule(self, values: Callable[[VarDict], Dict]) -> List[dict]:
+        s = values(self.s)
+        y = values(self.y)
+
+        return [
+            ship_record(self.instance, i, mooring_time=int(round(s[i])), mooring_berth=int(round(y[i])))
+            for i in self.instance.ships
+        ]
+
+    def solve(self, compute_iis: bool = False, callback: Optional[Callable] = None, write_results: bool = True) -> dict:
         basename = path.splitext(path.basename(self.instance.instance_file))[0]
-        self.m.setParam(GRB.Param.TimeLimit, self.grb_timelimit)
-        self.m.setParam(GRB.Param.Threads, 1)
-        self.m.optimize()
+        self.m.set_time_limit(self.grb_timelimit)
+        self.m.set_threads(self.n_threads)
+        self.m.optimize(callback)
 
         end_ti = datetime.now()
         elapsed_time = (end_ti - self.start_ti).total_seconds()
 
-        if self.m.SolCount > 0:
+        if self.m.sol_count > 0:
             results = dict(
                 feasible=True,
-                makespan=self.m.ObjVal,
-                dual_bound=self.m.ObjBound,
-                solve_time=self.m.Runtime,
+                makespan=self.m.obj_val,
+                dual_bound=self.m.obj_bound,
+                solve_time=self.m.runtime,
                 total_time=elapsed_time,
-                ships = list()
+                ships=self.schedule(self.m.values)
             )
-
-            for i in self.instance.ships:
-                mooring_berth = int(self.y[i].X)
-                results['ships'].append(dict(
-                    data_ship_id=i,
-                    data_arrival_time=self.instance.arrival_time[i],
-                    data_handling_time=self.instance.processing_time[i],
-                    data_ship_length=self.instance.ship_length[i],
-                    data_ship_length_in_berths=self.instance.ship_length_in_n_berths(i),
-                    mooring_time=int(self.s[i].X),
-                    completion_time=int(self.c[i].X),
-                    mooring_position=self.instance.berth_start(mooring_berth),
-                    mooring_berth=mooring_berth
-                ))
-        elif self.m.Status != GRB.INFEASIBLE:
+        elif self.m.status != INFEASIBLE:
             results = dict(
                 feasible=True,
                 makespan=None,
-                dual_bound=self.m.ObjBound,
-                solve_time=self.m.RunTime,
+                dual_bound=self.m.obj_bound,
+                solve_time=self.m.runtime,
                 total_time=elapsed_time,
                 ships=None
             )
         else:
             if compute_iis:
-                self.m.computeIIS()
                 model_file = 'infeas-' + basename + '-smodel.lp'
                 ilp_file = 'infeas-' + basename + '-smodel.ilp'
 
-                self.m.write(model_file)
-                self.m.write(ilp_file)
+                self.m.compute_iis(model_file, ilp_file)
 
                 print(f"Infeasible model. Model written to {model_file}. IIS written to {ilp_file}.")
 
@@ -249,12 +372,14 @@ class SSolver:
                 feasible=False,
                 makespan=None,
                 dual_bound=None,
-                solve_time=self.m.Runtime,
+                solve_time=self.m.runtime,
                 total_time=elapsed_time,
                 ships=None
             )
 
-        results_file = self.output_folder + '/results-' + basename + '-ssolver.json'
+        results['lower_bounds'] = self.combinatorial_bounds
+
+        if write_results:
+            self.sink.write(self.instance, 's', results)
 
-        with open(results_file, mode='w') as f:
-            json.dump(results, f, indent=2)
+        return results
@@ -0,0 +1,107 @@
+from .instance import Instance
+from .occupancy import OccupancyGrid
+from typing import List
+from os import path, replace, getpid
+import json
+
+
+def ship_record(instance: Instance, ship: int, mooring_time: int, mooring_berth: int) -> dict:
+    handling_time = instance.handling_time(ship, mooring_berth)
+
+    return dict(
+        data_ship_id=ship,
+        data_arrival_time=instance.arrival_time[ship],
+        data_handling_time=handling_time,
+        data_ship_length=instance.ship_length[ship],
+        data_ship_length_in_berths=instance.ship_length_in_n_berths(ship),
+        mooring_time=mooring_time,
+        completion_time=mooring_time + handling_time - 1,
+        mooring_position=instance.berth_start(mooring_berth),
+        mooring_berth=mooring_berth
+    )
+
+
+def extend_schedule(instance: Instance, ships: List[dict]) -> List[dict]:
+    # Keeps the given ship records and places every other ship of the instance, in
+    # order of arrival, where it completes earliest.
+    grid = OccupancyGrid.from_schedule(instance, ships)
+    scheduled = set(s['data_ship_id'] for s in ships)
+    extended = list(ships)
+
+    for i in sorted((i for i in instance.ships if i not in scheduled), key=lambda i: instance.arrival_time[i]):
+        w = instance.ship_length_in_n_berths(i)
+        t, j, p = grid.best_fit(instance.arrival_time[i], w, tuple(instance.handling_times(i).items()))
+        grid.insert(t, j, w, p)
+        extended.append(ship_record(instance, i, mooring_time=t, mooring_berth=j))
+
+    return sorted(extended, key=lambda s: s['data_ship_id'])
+
+
+def makespan(ships: List[dict]) -> int:
+    return max(s['completion_time'] for s in ships)
+
+
+def violations(instance: Instance, ships: List[dict]) -> List[str]:
+    # Checks the ship records against the instance, and returns a description of each
+    # violated requirement. The schedule might refer to a truncated instance, so ships of
+    # the instance missing from the schedule are not violations.
+    found = list()
+
+    for s1 in ships:
+        idx1 = s1['data_ship_id']
+        length1 = instance.ship_length[idx1]
+        proc1 = instance.handling_time(idx1, s1['mooring_berth'])
+        earliest1 = instance.arrival_time[idx1]
+        mooring1 = s1['mooring_time']
+        loc1 = s1['mooring_position']
+
+        if mooring1 < earliest1:
+            found.append(f"Ship {idx1}. Invalid berthing time {mooring1} < {earliest1} arrival time.")
+
+        if loc1 > instance.quay_length - length1:
+            found.append(f"Ship {idx1}. Invalid berthing position {loc1} > {instance.quay_length} (quay length) - {length1} (ship length).")
+
+        if mooring1 + proc1 > instance.n_periods:
+            found.append(f"Ship {idx1}. Handling at berth {s1['mooring_berth']} ends at {mooring1 + proc1} > {instance.n_periods} (time horizon).")
+
+        if s1['completion_time'] != mooring1 + proc1 - 1:
+            found.append(f"Ship {idx1}. Invalid completion time {s1['completion_time']} != {mooring1 + proc1 - 1}.")
+
+        for s2 in ships:
+            idx2 = s2['data_ship_id']
+
+            if idx2 <= idx1:
+                continue
+
+            length2 = instance.ship_length[idx2]
+            proc2 = instance.handling_time(idx2, s2['mooring_berth'])
+            mooring2 = s2['mooring_time']
+            loc2 = s2['mooring_position']
+
+            if (loc1 <= loc2 < loc1 + length1 and mooring1 <= mooring2 < mooring1 + proc1) or \
+               (loc2 <= loc1 < loc2 + length2 and mooring2 <= mooring1 < mooring2 + proc2):
+                found.append('\n'.join((
+                    f"Ships {idx1} and {idx2} overlap.",
+                    f"Ship {idx1}. Berthing time: {mooring1}, departure time: {mooring1 + proc1}.",
+                    f"Ship {idx1}. Berthing position: {loc1}, berthing end pos: {loc1 + length1}.",
+                    f"Ship {idx2}. Berthing time: {mooring2}, departure time: {mooring2 + proc2}.",
+                    f"Ship {idx2}. Berthing position: {loc2}, berthing end pos: {loc2 + length2}."
+                )))
+
+    return found
+
+
+def read_ships(file: str) -> List[dict]:
+    with open(file) as f:
+        return json.load(f)['ships']
+
+
+def write_json_atomic(file: str, data: dict, **kwargs) -> None:
+    # Write to a temporary file in the same folder and rename it, so that
+    # readers never see a partially written file.
+    tmp_file = path.join(path.dirname(file) or '.', f".{path.basename(file)}.{getpid()}.tmp")
+
+    with open(tmp_file, mode='w') as f:
+        json.dump(data, f, **kwargs)
+
+    replace(tmp_file, file)
@@ -0,0 +1,193 @@
+from .instance import Instance
+from .bounds import _arrays
+from .batch import read_instance, run_job
+from typing import List, Dict, Iterator, Tuple
+from multiprocessing import get_context
+from queue import Empty
+import traceback
+import numpy as np
+
+
+# Jobs of a sweep differ by orders of magnitude in memory and time: a PA model grows with
+# the horizon times the berths, the pairwise models with the square of the number of ships.
+# The size of each model is estimated from the dimensions of the instance, before building
+# it, and the scheduler starts jobs largest first while they fit both the free cores and the
+# free memory. Gurobi fixes the number of threads when the optimisation starts, so the cores
+# left idle because no other job is waiting, or none fits in memory, are given to the jobs
+# being started: the long tail of a sweep runs with the cores which the small jobs released.
+
+MODELS = ('pa', 'rp', 's', 'ti')
+
+# Peak resident memory of a worker solving a model, per nonzero and per row or column,
+# fitted on HiGHS solves of truncated Santini instances with a time limit of 15 seconds. The
+# Python objects of the variables and constraints, the presolved copy and the search tree
+# all count; the tree keeps growing with longer solves, so leave some headroom in the
+# budget. The size-limited Gurobi licence does not allow measuring large models, which use
+# the same constants. BASE_MEMORY is the interpreter with the solver libraries.
+BYTES_PER_NZ = 400
+BYTES_PER_ROW_COL = 1500
+BASE_MEMORY = 128 * 2**20
+
+
+def estimate_size(instance: Instance, model: str) -> Dict[str, int]:
+    # Number of variables, constraints and nonzeros of the model without the optional pair
+    # filtering or lazy pairs, which only make it smaller. Ships with berth-dependent
+    # handling times are counted with their shortest handling time.
+    if model not in MODELS:
+        raise ValueError(f"No size estimate for model {model}")
+
+    a, p, w = _arrays(instance)
+    n, B, T = instance.n_ships, instance.n_berths, instance.n_periods
+    pairs = n * (n - 1)
+
+    # Variables z, with one constraint choosing the berth and one giving its position.
+    dependent = np.array([instance.berth_dependent(i) for i in instance.ships], dtype=bool)
+    z_vars, z_constrs, z_nzs = dependent.sum() * B, 2 * dependent.sum(), 3 * dependent.sum() * B
+
+    if model == 'pa':
+        # x[i,j,t] from the arrival to the horizon, y[i,j,t] for each feasible position and
+        # mooring time. Each y covers p * w variables x.
+        x = B * np.sum(np.clip(T - a, 0, None))
+        positions = np.clip(B - w + 1, 0, None) * np.clip(T - p + 1 - a, 0, None)
+        y = np.sum(positions)
+        n_vars = x + y + n + 1
+        n_constrs = 3 * n + y + B * T
+        n_nzs = 2 * n + (y + n) + y + np.sum(positions * (p * w + 1)) + x
+    elif model == 'rp':
+        n_vars = 2 * pairs + 3 * n + 1 + z_vars
+        n_constrs = 5 * pairs + 2 * n + z_constrs
+        n_nzs = 14 * pairs + 4 * n + z_nzs
+    elif model == 's':
+        n_vars = 2 * pairs + 3 * n + 1 + z_vars
+        incompatible = int(np.sum(w[:, np.newaxis] + w[np.newaxis, :] > B) - np.sum(2 * w > B))
+        n_constrs = 3 * pairs + incompatible // 2 + 8 * n + z_constrs
+        n_nzs = 15 * pairs + z_nzs
+    else:
+        # Variables q[i,t] between the earliest completion and the horizon, r[i,t] between
+        # the arrival and the latest mooring time of ships with berth-dependent handling
+        # times, and the quay capacity in each period. Each variable q appears in the quay
+        # capacity of two periods, each variable r in one; all periods count as crowded.
+        q = np.sum(np.clip(T - a - p, 0, None))
+        r = np.sum(np.clip(T - p - a, 0, None)[dependent])
+        n_vars = 2 * pairs + 3 * n + 1 + q + r + z_vars
+        n_constrs = 3 * pairs + q + r + T + 3 * n + z_constrs
+        n_nzs = 10 * pairs + 5 * q + 4 * r + z_nzs
+
+    return dict(n_vars=int(n_vars), n_constrs=int(n_constrs), n_nzs=int(n_nzs))
+
+
+def estimate_memory(instance: Instance, model: str) -> int:
+    # Peak memory in bytes of a worker solving the model. Models without an estimate (local
+    # search, CP) only count the worker itself.
+    if model not in MODELS:
+        return BASE_MEMORY
+
+    size = estimate_size(instance, model)
+
+    return BASE_MEMORY + BYTES_PER_NZ * size['n_nzs'] + BYTES_PER_ROW_COL * (size['n_vars'] + size['n_constrs'])
+
+
+def estimate_job(job: dict) -> int:
+    instance = read_instance(job)
+
+    if job['truncate'] is not None:
+        instance.truncate(n_ships=min(job['truncate'], instance.n_ships))
+
+    return estimate_memory(instance, job['model'])
+
+
+def _run(job: dict, index: int, results) -> None:
+    # Runs one job in its own process, reporting its summary or its error.
+    try:
+        results.put((index, run_job(job), None))
+    except Exception:
+        results.put((index, None, traceback.format_exc()))
+
+
+class ResourceScheduler:
+    # Runs jobs in processes of their own, at most one per core at a time, such that the
+    # estimated memory of the running jobs stays within the budget. A job larger than the
+    # whole budget runs alone.
+    n_cores: int
+    memory_budget: int
+
+    def __init__(self, n_cores: int, memory_budget: int):
+        if n_cores < 1:
+            raise ValueError('At least one core is needed')
+
+        self.n_cores = n_cores
+        self.memory_budget = memory_budget
+
+    def plan(self, memory: List[int]) -> List[int]:
+        # Order in which the jobs are considered: largest estimated memory first.
+        return sorted(range(len(memory)), key=lambda k: -memory[k])
+
+    def dispatch(self, waiting: List[int], memory: List[int], free_cores: int, free_memory: int, n_running: int) -> List[Tuple[int, int]]:
+        # The jobs to start now, with their number of threads. Jobs are taken in the order of
+        # the waiting list, skipping those which do not fit in the free memory. Cores which
+        # no waiting job can use are then spread over the jobs being started.
+        started = list()
+
+        for k in waiting:
+            if len(started) == free_cores:
+                break
+
+            if memory[k] <= free_memory or (n_running == 0 and len(started) == 0):
+                started.append(k)
+                free_memory -= memory[k]
+
+        if len(started) == 0:
+            return list()
+
+        spare = free_cores - len(started)
+
+        return [
+            (k, 1 + spare // len(started) + (r < spare % len(started)))
+            for r, k in enumerate(started)
+        ]
+
+    def run(self, jobs: List[dict]) -> Iterator[dict]:
+        # Yields the summary of each job as it completes, with its index in the jobs, its
+        # estimated memory and its number of threads.
+        memory = [estimate_job(j) for j in jobs]
+        waiting = self.plan(memory)
+        running = dict()
+        context = get_context('spawn')
+        results = context.Queue()
+
+        try:
+            while len(waiting) > 0 or len(running) > 0:
+                free_cores = self.n_cores - sum(threads for _, threads in running.values())
+                free_memory = self.memory_budget - sum(memory[k] for k in running)
+
+                for k, threads in self.dispatch(waiting, memory, free_cores, free_memory, len(running)):
+                    job = dict(jobs[k], kwargs=dict(jobs[k]['kwargs'], n_threads=threads))
+
+                    if job['model'] == 'cp':
+                        job['kwargs']['n_workers'] = threads
+
+                    process = context.Process(target=_run, args=(job, k, results))
+                    process.start()
+                    running[k] = (process, threads)
+                    waiting.remove(k)
+
+                try:
+                    k, row, error = results.get(timeout=1.0)
+                except Empty:
+                    # A worker killed, e.g. by running out of memory, never reports.
+                    for k, (process, _) in list(running.items()):
+                        if not process.is_alive() and results.empty():
+                            raise RuntimeError(f"Job {k} ({jobs[k]['instance']}, {jobs[k]['model']}) exited with code {process.exitcode}")
+
+                    continue
+
+                process, threads = running.pop(k)
+                process.join()
+
+                if error is not None:
+                    raise RuntimeError(f"Job {k} ({jobs[k]['instance']}, {jobs[k]['model']}) failed:\n{error}")
+
+                yield dict(row, job=k, memory=memory[k], threads=threads)
+        finally:
+            for process, _ in running.values():
+                process.terminate()
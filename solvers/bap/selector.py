@@ -0,0 +1,203 @@
+from __future__ import annotations
+from .instance import Instance
+from .features import FEATURES, feature_vector
+from .results import load_runs
+from typing import List, Dict, Optional, Tuple
+from math import ceil
+from os import path
+import numpy as np
+import json
+
+
+MODELS = ('pa', 'rp', 's', 'ti')
+
+# Runs which do not prove optimality count as PENALTY times their solve time (PAR10), so
+# that a model timing out is never predicted to be fast.
+PENALTY = 10.0
+
+
+def solved(makespan: float, dual_bound: float) -> bool:
+    # The makespan is integral, so any bound strictly above makespan - 1 proves optimality.
+    if np.isnan(makespan) or np.isnan(dual_bound):
+        return False
+
+    return ceil(dual_bound - 1e-6) >= makespan - 1e-6
+
+
+def training_set(store: str, instance_folder: Optional[str] = None, models: Tuple[str, ...] = MODELS) -> Tuple[List[Tuple[str, int]], np.ndarray, Dict[str, np.ndarray]]:
+    # One row per instance and number of ships in the runs of a results store: the keys,
+    # the feature vectors, and the penalised total time of each model (nan if it was not
+    # run; the mean time if it was run more than once). Truncated runs are assumed to be on
+    # the first ships of the instance. With an instance folder, instances are looked up by
+    # name in it rather than by the path recorded with the run.
+    runs = load_runs(store)
+    times = dict()
+
+    for k in range(len(runs['run_id'])):
+        if runs['model'][k] not in models:
+            continue
+
+        time = runs['total_time'][k]
+
+        if not solved(runs['makespan'][k], runs['dual_bound'][k]):
+            time *= PENALTY
+
+        instance_file = runs['instance'][k] if instance_folder is None else path.join(instance_folder, f"{runs['name'][k]}.json")
+        times.setdefault((instance_file, int(runs['n_ships'][k])), dict()).setdefault(runs['model'][k], list()).append(time)
+
+    keys = sorted(times.keys())
+    X = np.empty((len(keys), len(FEATURES)))
+    y = {model: np.full(len(keys), np.nan) for model in models}
+
+    for row, (instance_file, n_ships) in enumerate(keys):
+        instance = Instance(instance_file=instance_file)
+
+        if n_ships < instance.n_ships:
+            instance.truncate(n_ships=n_ships)
+
+        X[row] = feature_vector(instance)
+
+        for model, model_times in times[(instance_file, n_ships)].items():
+            y[model][row] = np.mean(model_times)
+
+    return keys, X, y
+
+
+class FormulationSelector:
+    # One ridge regression per model, of the logarithm of the penalised total time on the
+    # standardised features. The selected model is the one with the shortest predicted time,
+    # among the models which were the fastest on some instance of the calibration (the
+    # winners). The regressions do not extrapolate: features are clipped to their range in
+    # the calibration, and an instance outside that range gets the single best model, the
+    # fastest in total over the calibration. So does every instance if the regressions did
+    # no better than the single best model when the selector was evaluated.
+    models: List[str]
+    mean: np.ndarray
+    scale: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+    coefficients: Dict[str, np.ndarray]
+    intercepts: Dict[str, float]
+    winners: List[str]
+    single_best: str
+    use_regressions: bool
+
+    def __init__(self, models: List[str], mean: np.ndarray, scale: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+                 coefficients: Dict[str, np.ndarray], intercepts: Dict[str, float], winners: List[str], single_best: str,
+                 use_regressions: bool = True):
+        self.models = models
+        self.mean = mean
+        self.scale = scale
+        self.lower = lower
+        self.upper = upper
+        self.coefficients = coefficients
+        self.intercepts = intercepts
+        self.winners = winners
+        self.single_best = single_best
+        self.use_regressions = use_regressions
+
+    @classmethod
+    def fit(cls, X: np.ndarray, y: Dict[str, np.ndarray], ridge: float = 1.0) -> FormulationSelector:
+        mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        # Features constant over the calibration, up to rounding, do not count.
+        scale[scale < 1e-9] = 1.0
+        Z = (X - mean) / scale
+        coefficients, intercepts = dict(), dict()
+
+        for model, times in y.items():
+            rows = ~np.isnan(times)
+
+            if not rows.any():
+                continue
+
+            target = np.log(times[rows] + 0.01)
+            Zm = Z[rows]
+            intercepts[model] = float(target.mean())
+            coefficients[model] = np.linalg.solve(
+                Zm.T @ Zm + ridge * np.eye(Z.shape[1]), Zm.T @ (target - intercepts[model]))
+
+        models = list(coefficients.keys())
+        winners, single_best = _winners(np.column_stack([y[model] for model in models]), models)
+
+        return cls(models=models, mean=mean, scale=scale, lower=X.min(axis=0), upper=X.max(axis=0),
+                   coefficients=coefficients, intercepts=intercepts, winners=winners, single_best=single_best)
+
+    def covers(self, x: np.ndarray) -> bool:
+        # Whether the features are within their range in the calibration.
+        return bool(np.all((x >= self.lower - 1e-9) & (x <= self.upper + 1e-9)))
+
+    def predict_vector(self, x: np.ndarray) -> Dict[str, float]:
+        z = (np.clip(x, self.lower, self.upper) - self.mean) / self.scale
+
+        return {model: float(np.exp(self.intercepts[model] + z @ self.coefficients[model]) - 0.01) for model in self.models}
+
+    def select_vector(self, x: np.ndarray, models: Optional[List[str]] = None) -> str:
+        candidates = [model for model in self.winners if models is None or model in models]
+
+        if len(candidates) == 0:
+            candidates = [model for model in self.models if models is None or model in models]
+
+        if self.single_best in candidates and (not self.use_regressions or not self.covers(x)):
+            return self.single_best
+
+        predicted = self.predict_vector(x)
+
+        return min(candidates, key=predicted.get)
+
+    def predict(self, instance: Instance) -> Dict[str, float]:
+        # Predicted total time of each model, in seconds.
+        return self.predict_vector(feature_vector(instance))
+
+    def select(self, instance: Instance, models: Optional[List[str]] = None) -> str:
+        return self.select_vector(feature_vector(instance), models=models)
+
+    def save(self, file: str) -> None:
+        with open(file, 'w') as f:
+            json.dump(dict(
+                features=list(FEATURES),
+                models=self.models,
+                mean=self.mean.tolist(),
+                scale=self.scale.tolist(),
+                lower=self.lower.tolist(),
+                upper=self.upper.tolist(),
+                coefficients={model: c.tolist() for model, c in self.coefficients.items()},
+                intercepts=self.intercepts,
+                winners=self.winners,
+                single_best=self.single_best,
+                use_regressions=self.use_regressions
+            ), f, indent=2)
+
+    @classmethod
+    def load(cls, file: str) -> FormulationSelector:
+        with open(file) as f:
+            data = json.load(f)
+
+        if data['features'] != list(FEATURES):
+            raise ValueError(f"Selector {file} was calibrated on different features")
+
+        return cls(
+            models=data['models'],
+            mean=np.array(data['mean']),
+            scale=np.array(data['scale']),
+            lower=np.array(data['lower']),
+            upper=np.array(data['upper']),
+            coefficients={model: np.array(c) for model, c in data['coefficients'].items()},
+            intercepts=data['intercepts'],
+            winners=data['winners'],
+            single_best=data['single_best'],
+            use_regressions=data['use_regressions']
+        )
+
+
+def _winners(times: np.ndarray, models: List[str]) -> Tuple[List[str], str]:
+    # Models fastest on some instance run with all models, and the model with the shortest
+    # total time over these instances.
+    complete = ~np.isnan(times).any(axis=1)
+
+    if not complete.any():
+        return list(models), models[int(np.nanargmin(np.nanmean(times, axis=0)))]
+
+    fastest = set(np.argmin(times[complete], axis=1).tolist())
+
+    return [model for k, model in enumerate(models) if k in fastest], models[int(np.argmin(times[complete].sum(axis=0)))]
@@ -0,0 +1,540 @@
+from __future__ import annotations
+from .instance import Instance
+from .batch import SOLVERS, MIP_MODELS, LOGGED_MODELS, make_env
+from .results import open_sink
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from collections import deque
+from multiprocessing import get_context, parent_process
+from queue import Empty
+from time import perf_counter
+from os import path, getpid
+from uuid import uuid4
+import signal
+import asyncio
+import socket
+import json
+
+
+# Local solve service. Clients send one JSON object per line and receive one JSON object
+# per line, over a Unix socket or a localhost TCP port.
+#
+# Requests:
+#   {"op": "solve", "id": ..., "model": "rp", "instance": {...} or "path/to/instance.json",
+#    "name": ..., "truncate": ..., "time_limit": ..., "options": {...}}
+#   {"op": "cancel", "id": ...}
+#   {"op": "status"}
+#
+# A solve request gets the events queued, started, progress (incumbent and bound, Gurobi
+# models only), and finally one of result, cancelled or error. A result carries the
+# dictionary returned by solve(). The id is optional: the service assigns one and sends it
+# with the queued event. Closing the connection cancels its requests.
+#
+# Requests wait in a FIFO queue for one of a fixed pool of worker processes. Workers import
+# the solvers and start a Gurobi environment once, when they start, so that a request only
+# pays for reading the instance and building and solving the model. Gurobi models stop at a
+# cancellation through their callback. Other models cannot be interrupted: their worker is
+# killed and replaced. A worker still running grace_period seconds after the time limit of
+# its request is also replaced.
+#
+# Each worker sends its events on a pipe of its own, which the event loop reads. A queue
+# shared by the workers would not do: a worker killed while sending an event would leave
+# the lock of the queue held, and block the others.
+#
+# OR-Tools and highspy ship conflicting builds of the same symbols and cannot be loaded in
+# the same process. A worker which has loaded one of them only gets requests which use the
+# same library or neither; if only workers with the other library are idle, one of them is
+# replaced.
+
+FINAL_EVENTS = ('result', 'cancelled', 'error')
+CALLBACK_MODELS = ('pa', 'rp', 's', 'ti')
+
+# Options which are set by the service rather than by the client.
+RESERVED_OPTIONS = ('env', 'sink', 'log_file')
+
+
+def _library(request: dict) -> Optional[str]:
+    # Native library loaded by the solver of a request, among those which conflict.
+    if request['model'] == 'cp':
+        return 'ortools'
+    elif request['model'] in MIP_MODELS and request.get('options', dict()).get('backend', 'gurobi') == 'highs':
+        return 'highs'
+    else:
+        return None
+
+
+def _warm_env():
+    try:
+        return make_env()
+    except Exception:
+        # No Gurobi, or no licence: the worker only runs the other backends.
+        return None
+
+
+def _read_instance(request: dict) -> Instance:
+    if isinstance(request['instance'], str):
+        instance = Instance(instance_file=request['instance'])
+    else:
+        name = request.get('name') or request['id']
+        instance = Instance.from_json_data(request['instance'], instance_file=f"{name}.json")
+
+    if request.get('truncate') is not None:
+        instance.truncate(n_ships=min(request['truncate'], instance.n_ships))
+
+    return instance
+
+
+def _solve(request: dict, output_folder: str, results_store: Optional[str], env, cancel, events,
+           progress_interval: float) -> Tuple[str, dict]:
+    instance = _read_instance(request)
+    model = request['model']
+    name = path.splitext(path.basename(instance.instance_file))[0]
+    kwargs = {key: value for key, value in request.get('options', dict()).items() if key not in RESERVED_OPTIONS}
+
+    if request.get('time_limit') is not None:
+        kwargs.update(grb_timelimit=request['time_limit'], timelimit=request['time_limit'])
+
+    gurobi = model in MIP_MODELS and kwargs.get('backend', 'gurobi') == 'gurobi'
+
+    if gurobi:
+        if env is None:
+            raise RuntimeError('Gurobi is not available in the solve service')
+
+        kwargs['env'] = env
+
+    if model in LOGGED_MODELS:
+        kwargs['log_file'] = path.join(output_folder, f"log-{name}-{instance.n_ships}-{model}solver-{request['id']}.log")
+
+    if results_store is not None:
+        kwargs['sink'] = open_sink(results_store)
+
+    build_ti = perf_counter()
+    solver = SOLVERS[model](instance=instance, output_folder=output_folder, **kwargs)
+    build_time = perf_counter() - build_ti
+
+    if gurobi and model in CALLBACK_MODELS:
+        from gurobipy import GRB
+
+        last = -progress_interval
+
+        def callback(m, where):
+            nonlocal last
+
+            if cancel.is_set():
+                m.terminate()
+                return
+
+            if where in (GRB.Callback.MIP, GRB.Callback.MIPSOL):
+                elapsed = m.cbGet(GRB.Callback.RUNTIME)
+
+                if where == GRB.Callback.MIPSOL or elapsed - last >= progress_interval:
+                    last = elapsed
+
+                    if where == GRB.Callback.MIP:
+                        best, bound = m.cbGet(GRB.Callback.MIP_OBJBST), m.cbGet(GRB.Callback.MIP_OBJBND)
+                    else:
+                        best, bound = m.cbGet(GRB.Callback.MIPSOL_OBJBST), m.cbGet(GRB.Callback.MIPSOL_OBJBND)
+
+                    events.put(dict(
+                        id=request['id'], event='progress',
+                        makespan=best if best < GRB.INFINITY else None, dual_bound=bound, elapsed=elapsed))
+
+        results = solver.solve(callback=callback, write_results=results_store is not None)
+    else:
+        results = solver.solve(write_results=results_store is not None)
+
+    if model in CALLBACK_MODELS:
+        solver.m.dispose()
+
+    results['build_time'] = build_time
+
+    return 'cancelled' if cancel.is_set() else 'result', results
+
+
+class _Events:
+    # Sending end of the pipe of a worker, with the interface of a queue.
+    def __init__(self, connection):
+        self.connection = connection
+
+    def put(self, event: dict) -> None:
+        self.connection.send(event)
+
+
+def _worker(tasks, connection, cancel, output_folder: str, results_store: Optional[str], progress_interval: float) -> None:
+    # Ctrl-C reaches the whole process group: the service stops its workers itself.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    events = _Events(connection)
+    env = _warm_env()
+    events.put(dict(event='ready', worker=getpid()))
+
+    while True:
+        try:
+            request = tasks.get(timeout=1.0)
+        except Empty:
+            if not parent_process().is_alive():
+                break
+
+            continue
+
+        if request is None:
+            break
+
+        events.put(dict(id=request['id'], event='started', worker=getpid()))
+
+        try:
+            event, results = _solve(request, output_folder, results_store, env, cancel, events, progress_interval)
+            events.put(dict(id=request['id'], event=event, worker=getpid(), results=results))
+        except Exception as e:
+            events.put(dict(id=request['id'], event='error', worker=getpid(), error=f"{type(e).__name__}: {e}"))
+
+    if env is not None:
+        env.dispose()
+
+    connection.close()
+
+
+class _Request:
+    id: str
+    data: dict
+    time_limit: Optional[float]
+    events: asyncio.Queue
+    worker: Optional[_Worker]
+    started: Optional[float]
+
+    def __init__(self, data: dict):
+        self.id = data['id']
+        self.data = data
+        self.time_limit = data.get('time_limit')
+        self.events = asyncio.Queue()
+        self.worker = None
+        self.started = None
+
+
+class _Worker:
+    slot: int
+    process: object
+    tasks: object
+    events: object
+    cancel: object
+    ready: bool
+    library: Optional[str]
+    request: Optional[_Request]
+
+    def __init__(self, slot: int, process, tasks, events, cancel):
+        self.slot = slot
+        self.process = process
+        self.tasks = tasks
+        self.events = events
+        self.cancel = cancel
+        self.ready = False
+        self.library = None
+        self.request = None
+
+    def idle(self) -> bool:
+        return self.ready and self.request is None and self.process.is_alive()
+
+    def can_run(self, library: Optional[str]) -> bool:
+        return library is None or self.library in (None, library)
+
+
+class SolveService:
+    n_workers: int
+    output_folder: str
+    results_store: Optional[str]
+    grace_period: float
+    progress_interval: float
+
+    workers: List[_Worker]
+    pending: deque
+    requests: Dict[str, _Request]
+
+    def __init__(self, n_workers: int = 1, output_folder: str = 'results', results_store: Optional[str] = None,
+                 grace_period: float = 30.0, progress_interval: float = 1.0):
+        self.n_workers = n_workers
+        self.output_folder = output_folder
+        self.results_store = results_store
+        self.grace_period = grace_period
+        self.progress_interval = progress_interval
+
+        self.ctx = get_context('spawn')
+        self.workers = list()
+        self.pending = deque()
+        self.requests = dict()
+        self.loop = None
+        self.watchdog = None
+
+    def __spawn(self, slot: int) -> _Worker:
+        tasks, cancel = self.ctx.Queue(), self.ctx.Event()
+        events, connection = self.ctx.Pipe(duplex=False)
+        # Not a daemon: the local search starts processes of its own.
+        process = self.ctx.Process(
+            target=_worker,
+            args=(tasks, connection, cancel, self.output_folder, self.results_store, self.progress_interval))
+        process.start()
+        # Only the worker writes to its pipe: the service reads an end of file when it exits.
+        connection.close()
+
+        worker = _Worker(slot, process, tasks, events, cancel)
+        self.loop.add_reader(events.fileno(), self.__read_events, worker)
+
+        return worker
+
+    def __close(self, worker: _Worker) -> None:
+        if not worker.events.closed:
+            self.loop.remove_reader(worker.events.fileno())
+            worker.events.close()
+
+    async def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.workers = [self.__spawn(slot) for slot in range(self.n_workers)]
+        self.watchdog = asyncio.create_task(self.__watch())
+
+    async def stop(self) -> None:
+        self.watchdog.cancel()
+
+        for request in list(self.requests.values()):
+            self.__finish(request, dict(id=request.id, event='cancelled', reason='Service stopped'))
+
+        for w in self.workers:
+            w.tasks.put(None)
+
+        for w in self.workers:
+            await asyncio.to_thread(w.process.join, self.grace_period)
+
+            if w.process.is_alive():
+                w.process.kill()
+
+            self.__close(w)
+
+    def __read_events(self, worker: _Worker) -> None:
+        try:
+            event = worker.events.recv()
+        except (EOFError, OSError):
+            # The worker exited: the watchdog replaces it.
+            self.__close(worker)
+            return
+
+        self.__on_event(worker, event)
+
+    def __on_event(self, worker: _Worker, event: dict) -> None:
+        if event['event'] == 'ready':
+            worker.ready = True
+            self.__dispatch()
+            return
+
+        request = self.requests.get(event['id'])
+
+        if request is None:
+            # The request was cancelled, or its worker was replaced.
+            return
+
+        if event['event'] in FINAL_EVENTS:
+            worker = request.worker
+            self.__finish(request, event)
+
+            if worker is not None:
+                worker.request = None
+                self.__dispatch()
+        else:
+            request.events.put_nowait(event)
+
+    def __finish(self, request: _Request, event: dict) -> None:
+        self.requests.pop(request.id, None)
+
+        if request in self.pending:
+            self.pending.remove(request)
+
+        request.events.put_nowait(event)
+
+    def __dispatch(self) -> None:
+        # Requests start in order of arrival.
+        while len(self.pending) > 0:
+            request = self.pending[0]
+            library = _library(request.data)
+            idle = [w for w in self.workers if w.idle()]
+            compatible = [w for w in idle if w.can_run(library)]
+
+            if len(compatible) == 0:
+                if len(idle) > 0:
+                    self.__replace(idle[0])
+
+                break
+
+            # Prefer the workers which have loaded the same library.
+            w = max(compatible, key=lambda w: w.library == library)
+            self.pending.popleft()
+            w.cancel.clear()
+            w.library = w.library or library
+            w.request, request.worker, request.started = request, w, perf_counter()
+            w.tasks.put(request.data)
+
+    def __replace(self, worker: _Worker) -> None:
+        worker.process.kill()
+        worker.process.join()
+        self.__close(worker)
+        self.workers[worker.slot] = self.__spawn(worker.slot)
+
+    async def __watch(self) -> None:
+        while True:
+            await asyncio.sleep(1.0)
+
+            for w in list(self.workers):
+                request = w.request
+
+                if not w.process.is_alive():
+                    self.__close(w)
+                    self.workers[w.slot] = self.__spawn(w.slot)
+
+                    if request is not None:
+                        self.__finish(request, dict(id=request.id, event='error', error='Worker process died'))
+                elif request is not None and request.time_limit is not None and \
+                        perf_counter() - request.started > request.time_limit + self.grace_period:
+                    self.__replace(w)
+                    self.__finish(request, dict(id=request.id, event='error', error='Time limit exceeded'))
+
+    def submit(self, data: dict) -> _Request:
+        data = dict(data)
+        data['id'] = str(data.get('id') or uuid4().hex)
+
+        if data.get('model') not in SOLVERS:
+            raise ValueError(f"Model not recognised: {data.get('model')}")
+        if data.get('instance') is None:
+            raise ValueError('Missing instance')
+        if data['id'] in self.requests:
+            raise ValueError(f"Request {data['id']} already exists")
+
+        request = _Request(data)
+        self.requests[request.id] = request
+        self.pending.append(request)
+        request.events.put_nowait(dict(id=request.id, event='queued', position=len(self.pending)))
+        self.__dispatch()
+
+        return request
+
+    def cancel(self, request_id: str) -> bool:
+        request = self.requests.get(request_id)
+
+        if request is None:
+            return False
+
+        if request.worker is None:
+            self.__finish(request, dict(id=request.id, event='cancelled'))
+        elif request.data['model'] in CALLBACK_MODELS and request.data.get('options', dict()).get('backend', 'gurobi') == 'gurobi':
+            # The worker reports the cancellation, with the best solution found so far.
+            request.worker.cancel.set()
+        else:
+            worker = request.worker
+            worker.request = None
+            self.__replace(worker)
+            self.__finish(request, dict(id=request.id, event='cancelled'))
+
+        return True
+
+    def status(self) -> dict:
+        return dict(
+            event='status',
+            workers=[
+                dict(pid=w.process.pid, ready=w.ready, request=None if w.request is None else w.request.id)
+                for w in self.workers
+            ],
+            queued=[request.id for request in self.pending]
+        )
+
+    async def __stream(self, request: _Request, writer: asyncio.StreamWriter, lock: asyncio.Lock) -> None:
+        while True:
+            event = await request.events.get()
+
+            async with lock:
+                writer.write((json.dumps(event) + '\n').encode())
+                await writer.drain()
+
+            if event['event'] in FINAL_EVENTS:
+                break
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        lock = asyncio.Lock()
+        streams = dict()
+
+        async def reply(message: dict) -> None:
+            async with lock:
+                writer.write((json.dumps(message) + '\n').encode())
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+
+                if not line:
+                    break
+
+                try:
+                    message = json.loads(line)
+                    op = message.get('op', 'solve')
+
+                    if op == 'solve':
+                        request = self.submit(message)
+                        streams[request.id] = asyncio.create_task(self.__stream(request, writer, lock))
+                    elif op == 'cancel':
+                        await reply(dict(event='cancel', id=message.get('id'), found=self.cancel(str(message.get('id')))))
+                    elif op == 'status':
+                        await reply(self.status())
+                    else:
+                        raise ValueError(f"Operation not recognised: {op}")
+                except (ValueError, KeyError, TypeError) as e:
+                    await reply(dict(event='error', id=None, error=str(e)))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for request_id, task in streams.items():
+                if not task.done():
+                    self.cancel(request_id)
+                    task.cancel()
+
+            writer.close()
+
+    async def serve(self, socket_path: Optional[str] = None, host: str = '127.0.0.1', port: int = 8765) -> None:
+        await self.start()
+
+        # Lines carry whole instances: allow lines longer than the default limit of 64 KiB.
+        if socket_path is not None:
+            server = await asyncio.start_unix_server(self.handle, path=socket_path, limit=2 ** 26)
+        else:
+            server = await asyncio.start_server(self.handle, host=host, port=port, limit=2 ** 26)
+
+        serving = asyncio.create_task(server.serve_forever())
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            self.loop.add_signal_handler(sig, serving.cancel)
+
+        try:
+            async with server:
+                await serving
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.stop()
+
+
+def connect(address: Union[str, Tuple[str, int]]) -> socket.socket:
+    # A string is the path of a Unix socket, a tuple the host and port of a TCP socket.
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+    sock.connect(address)
+
+    return sock
+
+
+def send_request(address: Union[str, Tuple[str, int]], message: dict) -> Iterator[dict]:
+    # Sends one request and yields the events it gets, until the last one.
+    with connect(address) as sock:
+        sock.sendall((json.dumps(message) + '\n').encode())
+
+        with sock.makefile('r') as f:
+            for line in f:
+                event = json.loads(line)
+                yield event
+
+                if event['event'] in FINAL_EVENTS + ('cancel', 'status'):
+                    break
@@ -0,0 +1,92 @@
+import argparse
+from glob import glob
+from fnmatch import fnmatch
+from pathlib import Path
+
+from bap.results import open_sink
+from bap.batch import job, run_batch
+from bap.scheduler import ResourceScheduler
+from bap.bundle import InstanceBundle
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='batch',
+        description='Solves many instances with many models, reusing one Gurobi environment per worker process'
+    )
+
+    parser.add_argument(
+        '-i', '--instances', action='store', type=str, nargs='+', required=True,
+        help='Instance files or glob patterns; with --bundle, instance names or patterns matched against the names in the bundle')
+    parser.add_argument(
+        '--bundle', action='store', type=str,
+        help='Read the instances from this bundle (see pack_instances.py)')
+    parser.add_argument(
+        '-m', '--models', action='store', type=str, default='rp',
+        help='Comma-separated list of models (pa, rp, s, ti, ls, lns)')
+    parser.add_argument(
+        '-t', '--truncate', action='store', type=str,
+        help='Comma-separated list of numbers of ships: each instance is solved once per prefix')
+    parser.add_argument(
+        '-l', '--time-limit', action='store', type=float,
+        help='Time limit in seconds for each job')
+    parser.add_argument(
+        '-b', '--lower-bound', action='store_true',
+        help='If the flag is given, the combinatorial lower bound is imposed on the makespan')
+    parser.add_argument(
+        '-k', '--backend', action='store', type=str, default='gurobi', choices=('gurobi', 'highs'),
+        help='MIP solver for the MIP models (pa, rp, s, ti, lns)')
+    parser.add_argument(
+        '-w', '--workers', action='store', type=int, default=1,
+        help='Number of worker processes; with --memory-budget, number of cores')
+    parser.add_argument(
+        '--memory-budget', action='store', type=float,
+        help='Memory budget in GB: jobs run largest first, as many at a time as fit in the budget, with the idle cores as extra threads')
+    parser.add_argument(
+        '-o', '--output-folder', action='store', type=str, default='results',
+        help='Output folder, for the Gurobi logs and the default results store')
+    parser.add_argument(
+        '--results-store', action='store', type=str,
+        help='Results store (.jsonl or .sqlite file, or folder); default: batch.jsonl in the output folder')
+
+    args = parser.parse_args()
+
+    Path(args.output_folder).mkdir(exist_ok=True)
+
+    # Truncated runs of the same instance would overwrite each other's results file, so
+    # the default store is a JSON Lines file which records the number of ships of each run.
+    sink = open_sink(args.results_store or str(Path(args.output_folder) / 'batch.jsonl'))
+
+    if args.bundle is None:
+        instances = sorted(set(f for pattern in args.instances for f in glob(pattern)))
+    else:
+        names = InstanceBundle(args.bundle).names()
+        instances = sorted(set(name for pattern in args.instances for name in names if fnmatch(name, pattern)))
+
+    truncations = [None] if args.truncate is None else [int(n) for n in args.truncate.split(',')]
+    kwargs = dict(use_lower_bound=args.lower_bound, sink=sink, backend=args.backend)
+
+    if args.time_limit is not None:
+        kwargs.update(grb_timelimit=args.time_limit, timelimit=args.time_limit)
+
+    jobs = [
+        job(instance=instance, model=model, output_folder=args.output_folder, truncate=n, bundle=args.bundle, **kwargs)
+        for instance in instances
+        for n in truncations
+        for model in args.models.split(',')
+    ]
+
+    if args.memory_budget is None:
+        rows = run_batch(jobs, n_workers=args.workers)
+    else:
+        rows = ResourceScheduler(n_cores=args.workers, memory_budget=int(args.memory_budget * 2**30)).run(jobs)
+
+    print(f"{'instance':>12} {'model':>5} {'ships':>5} {'makespan':>8} {'bound':>8} {'build':>7} {'solve':>8} {'total':>8} {'worker':>7}"
+          + ('' if args.memory_budget is None else f" {'est MB':>7} {'threads':>7}"))
+
+    for row in rows:
+        makespan = '-' if row['makespan'] is None else f"{row['makespan']:.0f}"
+        bound = '-' if row['dual_bound'] is None else f"{row['dual_bound']:.1f}"
+        resources = '' if args.memory_budget is None else f" {row['memory'] / 2**20:>7.0f} {row['threads']:>7}"
+
+        print(f"{row['instance']:>12} {row['model']:>5} {row['n_ships']:>5} {makespan:>8} {bound:>8} "
+              f"{row['build_time']:>7.2f} {row['solve_time']:>8.2f} {row['total_time']:>8.2f} {row['worker']:>7}{resources}")
@@ -0,0 +1,118 @@
+import argparse
+import csv
+import tempfile
+from glob import glob
+from os import path
+from time import perf_counter
+
+from bap.instance import Instance
+from bap.batch import SOLVERS, MIP_MODELS, make_env
+
+# Compares the CP-SAT model with the MIP models, solved with Gurobi or HiGHS, on the same
+# (truncated) instances, with the same time limit and one thread each. The size-limited Gurobi licence restricts
+# the MIP models to small truncations: RP and S to about 20 ships, PA and TI to short
+# horizons.
+# Run from the solvers folder: python -m benchmarks.formulations
+
+
+def solve(instance_file: str, model: str, truncate: int, time_limit: float, log_folder: str, backend: str, env) -> dict:
+    instance = Instance(instance_file=instance_file)
+
+    if truncate is not None:
+        instance.truncate(n_ships=min(truncate, instance.n_ships))
+
+    name = path.splitext(path.basename(instance_file))[0]
+    kwargs = dict(grb_timelimit=time_limit, timelimit=time_limit, log_file=path.join(log_folder, f"log-{name}-{model}.log"))
+
+    if model in MIP_MODELS:
+        kwargs.update(backend=backend, env=env)
+
+    start = perf_counter()
+    solver = SOLVERS[model](instance=instance, output_folder=log_folder, **kwargs)
+    build_time = perf_counter() - start
+    results = solver.solve(write_results=False)
+
+    makespan, bound = results['makespan'], results['dual_bound']
+    gap = None if makespan is None or bound is None or makespan == 0 else (makespan - bound) / makespan
+
+    return dict(
+        instance=name,
+        model=model,
+        n_ships=instance.n_ships,
+        makespan=makespan,
+        dual_bound=bound,
+        gap=gap,
+        optimal=gap is not None and gap < 1e-6,
+        build_time=build_time,
+        solve_time=results['solve_time']
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='formulations',
+        description='Compares the CP-SAT model with the MIP models on the same instances'
+    )
+
+    parser.add_argument(
+        '-f', '--folder', action='store', type=str, default='../instances/Santini',
+        help='Folder with the instances')
+    parser.add_argument(
+        '-p', '--pattern', action='store', type=str, default='f30x3-0*.json',
+        help='Pattern of the instance file names')
+    parser.add_argument(
+        '-m', '--models', action='store', type=str, default='rp,s,cp',
+        help='Comma-separated list of models')
+    parser.add_argument(
+        '-k', '--backend', action='store', type=str, default='gurobi', choices=('gurobi', 'highs'),
+        help='MIP solver for the MIP models')
+    parser.add_argument(
+        '-t', '--truncate', action='store', type=int, default=15,
+        help='Truncate instances to the first n ships')
+    parser.add_argument(
+        '-l', '--time-limit', action='store', type=float, default=30.0,
+        help='Time limit in seconds for each model and instance')
+    parser.add_argument(
+        '-o', '--output-file', action='store', type=str,
+        help='Also write one row per instance and model to this CSV file')
+
+    args = parser.parse_args()
+    models = args.models.split(',')
+    rows = list()
+    env = make_env() if args.backend == 'gurobi' else None
+
+    with tempfile.TemporaryDirectory() as log_folder:
+        for instance_file in sorted(glob(path.join(args.folder, args.pattern))):
+            for model in models:
+                row = solve(instance_file, model, args.truncate, args.time_limit, log_folder, args.backend, env)
+                rows.append(row)
+
+                makespan = '-' if row['makespan'] is None else f"{row['makespan']:.0f}"
+                bound = '-' if row['dual_bound'] is None else f"{row['dual_bound']:.1f}"
+                gap = '-' if row['gap'] is None else f"{100 * row['gap']:.2f}%"
+
+                print(f"{row['instance']:>12} {model:>3} {row['n_ships']:>4} ships: "
+                      f"makespan {makespan:>5}, bound {bound:>7}, gap {gap:>7}, "
+                      f"build {row['build_time']:.2f}s, solve {row['solve_time']:.2f}s")
+
+    if env is not None:
+        env.dispose()
+
+    for model in models:
+        model_rows = [row for row in rows if row['model'] == model]
+
+        if len(model_rows) == 0:
+            continue
+
+        n_optimal = sum(row['optimal'] for row in model_rows)
+        gaps = [row['gap'] for row in model_rows if row['gap'] is not None]
+        avg_gap = '-' if len(gaps) == 0 else f"{100 * sum(gaps) / len(gaps):.2f}%"
+        avg_time = sum(row['solve_time'] for row in model_rows) / len(model_rows)
+
+        print(f"Model {model}. Optimal on {n_optimal}/{len(model_rows)} instances, average gap {avg_gap}, average solve time {avg_time:.2f}s.")
+
+    if args.output_file is not None and len(rows) > 0:
+        with open(args.output_file, mode='w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
@@ -0,0 +1,84 @@
+import argparse
+import csv
+from glob import glob
+from os import path
+from time import perf_counter
+
+from bap.instance import Instance
+from bap.rp_solver import RPSolver
+
+# Size of the RP model with all pairs of ships and with lazy pairs, i.e., only with the
+# pairs whose time windows overlap. Models are only built, not solved: the pairs added
+# back during the solve depend on the solutions found.
+# Run from the solvers folder: python -m benchmarks.lazy_pairs
+
+
+def model_size(instance_file: str, lazy_pairs: bool, truncate: int) -> dict:
+    instance = Instance(instance_file=instance_file)
+
+    if truncate is not None:
+        instance.truncate(n_ships=min(truncate, instance.n_ships))
+
+    start = perf_counter()
+    solver = RPSolver(instance=instance, output_folder='.', lazy_pairs=lazy_pairs)
+    stats = solver.m.stats()
+    build_time = perf_counter() - start
+
+    return dict(
+        n_ships=instance.n_ships,
+        n_pairs=len(solver.ij) // 2,
+        **stats,
+        build_time=build_time
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='lazy_pairs',
+        description='Compares the size of the RP model with all pairs of ships and with lazy pairs'
+    )
+
+    parser.add_argument(
+        '-f', '--folder', action='store', type=str, default='../instances/Santini',
+        help='Folder with the instances')
+    parser.add_argument(
+        '-p', '--pattern', action='store', type=str, default='f[56][50]x*.json',
+        help='Pattern of the instance file names (by default, the f55 and f60 families)')
+    parser.add_argument(
+        '-t', '--truncate', action='store', type=int,
+        help='Truncate instances to the first n ships')
+    parser.add_argument(
+        '-o', '--output-file', action='store', type=str,
+        help='Also write one row per instance to this CSV file')
+
+    args = parser.parse_args()
+    rows = list()
+
+    for instance_file in sorted(glob(path.join(args.folder, args.pattern))):
+        full = model_size(instance_file, False, args.truncate)
+        lazy = model_size(instance_file, True, args.truncate)
+
+        row = dict(instance=path.splitext(path.basename(instance_file))[0], n_ships=full['n_ships'])
+        row.update({f"full_{key}": value for key, value in full.items() if key != 'n_ships'})
+        row.update({f"lazy_{key}": value for key, value in lazy.items() if key != 'n_ships'})
+        rows.append(row)
+
+        print(f"{row['instance']:>12}: "
+              f"pairs {full['n_pairs']:>5} -> {lazy['n_pairs']:>5} ({lazy['n_pairs'] / full['n_pairs']:.2f}x), "
+              f"vars {full['n_vars']:>6} -> {lazy['n_vars']:>6}, "
+              f"constrs {full['n_constrs']:>6} -> {lazy['n_constrs']:>6} ({lazy['n_constrs'] / full['n_constrs']:.2f}x), "
+              f"nzs {full['n_nzs']:>7} -> {lazy['n_nzs']:>7}, "
+              f"build {full['build_time']:.2f}s -> {lazy['build_time']:.2f}s")
+
+    for family in sorted(set(row['instance'].split('-')[0] for row in rows)):
+        family_rows = [row for row in rows if row['instance'].split('-')[0] == family]
+
+        for key in ('n_pairs', 'n_constrs', 'n_nzs'):
+            ratio = sum(row[f"lazy_{key}"] / row[f"full_{key}"] for row in family_rows) / len(family_rows)
+            print(f"Family {family}. Average ratio lazy / full for {key}: {ratio:.2f}.")
+
+    if args.output_file is not None and len(rows) > 0:
+        with open(args.output_file, mode='w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
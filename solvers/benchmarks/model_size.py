@@ -0,0 +1,104 @@
+import argparse
+import csv
+from glob import glob
+from os import path
+from time import perf_counter
+
+from bap.instance import Instance
+from bap.pa_solver import PASolver
+from bap.rp_solver import RPSolver
+from bap.s_solver import SSolver
+from bap.ti_solver import TISolver
+
+# Size of the models with fixed handling times (as in the Santini instances) and with
+# berth-dependent handling times (as produced by instances/converter.py), on the same
+# ships. Models are only built, not solved.
+# Run from the solvers folder: python -m benchmarks.model_size
+
+SOLVERS = dict(pa=PASolver, rp=RPSolver, s=SSolver, ti=TISolver)
+
+
+def model_size(instance_file: str, model: str, truncate: int) -> dict:
+    instance = Instance(instance_file=instance_file)
+
+    if truncate is not None:
+        instance.truncate(n_ships=min(truncate, instance.n_ships))
+
+    start = perf_counter()
+    solver = SOLVERS[model](instance=instance, output_folder='.')
+    stats = solver.m.stats()
+    build_time = perf_counter() - start
+
+    return dict(
+        n_dependent=sum(instance.berth_dependent(i) for i in instance.ships),
+        **stats,
+        build_time=build_time
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='model_size',
+        description='Compares the size of the models with fixed and berth-dependent handling times'
+    )
+
+    parser.add_argument(
+        '-f', '--fixed-folder', action='store', type=str, default='../instances/Santini',
+        help='Folder with the fixed handling time instances')
+    parser.add_argument(
+        '-d', '--dependent-folder', action='store', type=str, default='../instances/Santini_Berth_Handling',
+        help='Folder with the berth-dependent handling time instances')
+    parser.add_argument(
+        '-p', '--pattern', action='store', type=str, default='f*.json',
+        help='Pattern of the instance file names')
+    parser.add_argument(
+        '-m', '--models', action='store', type=str, default='rp,s,ti',
+        help='Comma-separated list of models (pa is slow to build on the full instances)')
+    parser.add_argument(
+        '-t', '--truncate', action='store', type=int,
+        help='Truncate instances to the first n ships')
+    parser.add_argument(
+        '-o', '--output-file', action='store', type=str,
+        help='Also write one row per instance and model to this CSV file')
+
+    args = parser.parse_args()
+    rows = list()
+
+    for fixed_file in sorted(glob(path.join(args.fixed_folder, args.pattern))):
+        dependent_file = path.join(args.dependent_folder, path.basename(fixed_file))
+
+        if not path.exists(dependent_file):
+            print(f"Skipping {fixed_file}: {dependent_file} not found.")
+            continue
+
+        for model in args.models.split(','):
+            fixed = model_size(fixed_file, model, args.truncate)
+            dependent = model_size(dependent_file, model, args.truncate)
+
+            row = dict(instance=path.splitext(path.basename(fixed_file))[0], model=model, n_dependent=dependent['n_dependent'])
+            row.update({f"fixed_{key}": value for key, value in fixed.items() if key != 'n_dependent'})
+            row.update({f"dependent_{key}": value for key, value in dependent.items() if key != 'n_dependent'})
+            rows.append(row)
+
+            print(f"{row['instance']:>12} {model:>3}: "
+                  f"{row['n_dependent']:>3} berth-dependent ships, "
+                  f"vars {fixed['n_vars']:>7} -> {dependent['n_vars']:>7} ({dependent['n_vars'] / fixed['n_vars']:.2f}x), "
+                  f"constrs {fixed['n_constrs']:>7} -> {dependent['n_constrs']:>7} ({dependent['n_constrs'] / fixed['n_constrs']:.2f}x), "
+                  f"nzs {fixed['n_nzs']:>8} -> {dependent['n_nzs']:>8} ({dependent['n_nzs'] / fixed['n_nzs']:.2f}x), "
+                  f"build {fixed['build_time']:.2f}s -> {dependent['build_time']:.2f}s")
+
+    for model in args.models.split(','):
+        model_rows = [row for row in rows if row['model'] == model]
+
+        if len(model_rows) == 0:
+            continue
+
+        for key in ('n_vars', 'n_constrs', 'n_nzs', 'build_time'):
+            ratio = sum(row[f"dependent_{key}"] / row[f"fixed_{key}"] for row in model_rows) / len(model_rows)
+            print(f"Model {model}. Average ratio berth-dependent / fixed for {key}: {ratio:.2f}.")
+
+    if args.output_file is not None and len(rows) > 0:
+        with open(args.output_file, mode='w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
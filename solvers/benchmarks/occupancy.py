@@ -0,0 +1,136 @@
+import argparse
+import random
+from time import perf_counter
+from typing import List, Tuple
+
+from bap.occupancy import OccupancyGrid
+
+# Micro-benchmarks of OccupancyGrid on random instances, against a reference grid
+# which scans periods one by one. Both grids must return the same placements.
+# Run from the solvers folder: python -m benchmarks.occupancy
+
+
+class NaiveGrid:
+    occ: List[bytearray]
+
+    def __init__(self, n_berths: int, n_periods: int):
+        self.occ = [bytearray(n_periods) for _ in range(n_berths)]
+
+    def insert(self, t: int, j: int, w: int, p: int) -> None:
+        for k in range(j, j + w):
+            self.occ[k][t:t + p] = b'\x01' * p
+
+    def remove(self, t: int, j: int, w: int, p: int) -> None:
+        for k in range(j, j + w):
+            self.occ[k][t:t + p] = bytes(p)
+
+    def earliest_fit(self, a: int, w: int, p: int) -> Tuple[int, int]:
+        best_t, best_j = None, None
+
+        for j in range(len(self.occ) - w + 1):
+            t = a
+            while any(any(self.occ[k][t:t + p]) for k in range(j, j + w)):
+                t += 1
+
+            if best_t is None or t < best_t:
+                best_t, best_j = t, j
+
+        return best_t, best_j
+
+
+def random_ships(n_ships: int, n_berths: int, seed: int) -> List[Tuple[int, int, int]]:
+    # Arrivals are spread so that the quay is loaded at about 90%.
+    rnd = random.Random(seed)
+    w = [rnd.randint(1, max(1, n_berths // 5)) for _ in range(n_ships)]
+    p = [rnd.randint(5, 40) for _ in range(n_ships)]
+    horizon = int(sum(wi * pi for wi, pi in zip(w, p)) / (0.9 * n_berths))
+    a = sorted(rnd.randint(0, horizon) for _ in range(n_ships))
+
+    return list(zip(a, w, p))
+
+
+def place_all(grid, ships: List[Tuple[int, int, int]]) -> List[Tuple[int, int]]:
+    # First come, first served: each ship in the earliest available rectangle.
+    placement = list()
+
+    for a, w, p in ships:
+        t, j = grid.earliest_fit(a, w, p)
+        grid.insert(t, j, w, p)
+        placement.append((t, j))
+
+    return placement
+
+
+def churn(grid, ships: List[Tuple[int, int, int]], placement: List[Tuple[int, int]], n_moves: int, seed: int) -> None:
+    # Removes a random ship and places it again at its earliest fit, as a local search does.
+    rnd = random.Random(seed)
+
+    for _ in range(n_moves):
+        k = rnd.randrange(len(ships))
+        a, w, p = ships[k]
+        t, j = placement[k]
+        grid.remove(t, j, w, p)
+        placement[k] = grid.earliest_fit(a, w, p)
+        grid.insert(*placement[k], w, p)
+
+
+def benchmark(n_ships: int, n_berths: int, n_moves: int, seed: int, naive: bool) -> None:
+    ships = random_ships(n_ships, n_berths, seed)
+    grids = [('bitset', lambda: OccupancyGrid(n_berths))]
+
+    if naive:
+        n_periods = max(a for a, _, _ in ships) + sum(p for _, _, p in ships)
+        grids.append(('naive', lambda: NaiveGrid(n_berths, n_periods)))
+
+    placements = dict()
+
+    for name, make_grid in grids:
+        grid = make_grid()
+
+        start = perf_counter()
+        placement = place_all(grid, ships)
+        place_time = perf_counter() - start
+
+        start = perf_counter()
+        churn(grid, ships, placement, n_moves, seed)
+        churn_time = perf_counter() - start
+
+        placements[name] = placement
+        makespan = max(t + p - 1 for (t, _), (_, _, p) in zip(placement, ships))
+
+        print(f"{n_ships:>6} ships {n_berths:>3} berths {name:>6}: "
+              f"place all {place_time:.3f}s ({1e6 * place_time / n_ships:.1f} us/ship), "
+              f"{n_moves} remove/fit/insert {churn_time:.3f}s ({1e6 * churn_time / n_moves:.1f} us/move), "
+              f"makespan {makespan}")
+
+    if naive:
+        assert placements['bitset'] == placements['naive'], 'The bitset and naive grids return different placements'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='occupancy',
+        description='Micro-benchmarks of the berth x time occupancy grid'
+    )
+
+    parser.add_argument(
+        '-n', '--ships', action='store', type=str, default='1000,2000,5000',
+        help='Comma-separated list of numbers of ships')
+    parser.add_argument(
+        '-b', '--berths', action='store', type=str, default='20,40',
+        help='Comma-separated list of numbers of berths')
+    parser.add_argument(
+        '-m', '--moves', action='store', type=int, default=10000,
+        help='Number of remove/earliest-fit/insert moves')
+    parser.add_argument(
+        '-s', '--seed', action='store', type=int, default=0,
+        help='Seed for the random instances')
+    parser.add_argument(
+        '--naive', action='store_true',
+        help='If the flag is given, also run the reference grid and compare placements (slow)')
+
+    args = parser.parse_args()
+
+    for n_berths in [int(b) for b in args.berths.split(',')]:
+        for n_ships in [int(n) for n in args.ships.split(',')]:
+            benchmark(n_ships=n_ships, n_berths=n_berths, n_moves=args.moves, seed=args.seed, naive=args.naive)
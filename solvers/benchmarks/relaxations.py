@@ -0,0 +1,183 @@
+import argparse
+import csv
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+from multiprocessing import get_context
+from os import path
+from time import perf_counter
+
+from bap.instance import Instance
+from bap.batch import SOLVERS, make_env
+from bap.bounds import lower_bounds
+from bap.relaxation import lp_relaxation
+
+# Compares the LP relaxations of the MIP formulations: the bound on the makespan, the time
+# to solve the LP and the size of the model, with and without the optional strengthening.
+# Configurations:
+# - 'default': each model as main.py builds it;
+# - 'no-vi': the S model without its valid inequalities and symmetry breaking constraints,
+#   the only optional constraints of the formulations;
+# - 'filter': the S and TI models with the pair filtering with the bound of a greedy
+#   schedule.
+# The combinatorial lower bound on the makespan (bap/bounds.py) is reported alongside, as
+# a reference which does not depend on the formulation. Instances run in parallel, one
+# process each. The size-limited Gurobi licence also applies to LPs: use HiGHS for
+# full-size instances.
+# Run from the solvers folder: python -m benchmarks.relaxations
+
+MODELS = ('pa', 'rp', 's', 'ti')
+CONFIGURATIONS = ('default', 'no-vi', 'filter')
+CONFIGURATION_MODELS = {'default': MODELS, 'no-vi': ('s',), 'filter': ('s', 'ti')}
+
+# Gurobi environment of the current worker process, created with its first task.
+_env = None
+
+
+def strengthening(model: str, configuration: str) -> dict:
+    if configuration == 'no-vi':
+        return dict(valid_inequalities=False)
+    elif configuration == 'filter':
+        return dict(filter_pairs=True)
+    else:
+        return dict()
+
+
+def relax(instance_file: str, model: str, configuration: str, truncate: int, time_limit: float, backend: str) -> dict:
+    global _env
+
+    instance = Instance(instance_file=instance_file)
+
+    if truncate is not None:
+        instance.truncate(n_ships=min(truncate, instance.n_ships))
+
+    row = dict(instance=path.splitext(path.basename(instance_file))[0], model=model,
+               configuration=configuration, n_ships=instance.n_ships,
+               combinatorial_bound=lower_bounds(instance)['best'])
+    kwargs = dict(backend=backend, **strengthening(model, configuration))
+
+    if backend == 'gurobi':
+        if _env is None:
+            _env = make_env()
+
+        kwargs['env'] = _env
+
+    with tempfile.TemporaryDirectory() as log_folder:
+        kwargs['log_file'] = path.join(log_folder, 'log.txt')
+
+        try:
+            start = perf_counter()
+            solver = SOLVERS[model](instance=instance, output_folder=log_folder, **kwargs)
+            row['build_time'] = perf_counter() - start
+            row.update(lp_relaxation(solver, time_limit=time_limit))
+            solver.m.dispose()
+        except Exception as e:
+            row['status'] = f"error: {e}"
+
+    return row
+
+
+def relax_instance(task: tuple) -> list:
+    instance_file, models, truncate, time_limit, backend = task
+
+    return [
+        relax(instance_file, model, configuration, truncate, time_limit, backend)
+        for model in models
+        for configuration in CONFIGURATIONS
+        if model in CONFIGURATION_MODELS[configuration]
+    ]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='relaxations',
+        description='Compares the LP relaxations of the MIP formulations, without and with strengthening'
+    )
+
+    parser.add_argument(
+        '-f', '--folder', action='store', type=str, default='../instances/Santini',
+        help='Folder with the instances')
+    parser.add_argument(
+        '-p', '--pattern', action='store', type=str, default='*.json',
+        help='Pattern of the instance file names')
+    parser.add_argument(
+        '-m', '--models', action='store', type=str, default=','.join(MODELS),
+        help='Comma-separated list of MIP models')
+    parser.add_argument(
+        '-k', '--backend', action='store', type=str, default='highs', choices=('gurobi', 'highs'),
+        help='Solver for the LPs')
+    parser.add_argument(
+        '-t', '--truncate', action='store', type=int,
+        help='Truncate instances to the first n ships')
+    parser.add_argument(
+        '-l', '--time-limit', action='store', type=float, default=600.0,
+        help='Time limit in seconds for each LP')
+    parser.add_argument(
+        '-w', '--workers', action='store', type=int, default=1,
+        help='Number of worker processes')
+    parser.add_argument(
+        '-o', '--output-file', action='store', type=str,
+        help='Also write one row per instance, model and configuration to this CSV file')
+
+    args = parser.parse_args()
+    models = args.models.split(',')
+    tasks = [(f, models, args.truncate, args.time_limit, args.backend) for f in sorted(glob(path.join(args.folder, args.pattern)))]
+    rows = list()
+
+    print(f"{'instance':>12} {'model':>5} {'config':>7} {'ships':>5} {'vars':>8} {'constrs':>8} {'nzs':>9} {'build':>7} {'lp time':>8} {'lp bound':>9} {'comb':>5}")
+
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=get_context('spawn')) as pool:
+        for instance_rows in pool.map(relax_instance, tasks):
+            for row in instance_rows:
+                rows.append(row)
+
+                if 'n_vars' not in row:
+                    print(f"{row['instance']:>12} {row['model']:>5} {row['configuration']:>7} {row['n_ships']:>5} {row['status']}")
+                    continue
+
+                bound = '-' if row['lp_bound'] is None else f"{row['lp_bound']:.2f}"
+
+                print(f"{row['instance']:>12} {row['model']:>5} {row['configuration']:>7} {row['n_ships']:>5} "
+                      f"{row['n_vars']:>8} {row['n_constrs']:>8} {row['n_nzs']:>9} "
+                      f"{row['build_time']:>7.2f} {row['lp_time']:>8.2f} {bound:>9} {row['combinatorial_bound']:>5}")
+
+    # The best LP bound of each instance, over all models and configurations, is the
+    # reference for the strength of each relaxation.
+    best = dict()
+    combinatorial = dict()
+
+    for row in rows:
+        combinatorial[row['instance']] = row['combinatorial_bound']
+
+        if row.get('lp_bound') is not None:
+            best[row['instance']] = max(best.get(row['instance'], row['lp_bound']), row['lp_bound'])
+
+    for model in models:
+        for configuration in CONFIGURATIONS:
+            model_rows = [row for row in rows if row['model'] == model and row['configuration'] == configuration]
+            solved = [row for row in model_rows if row.get('lp_bound') is not None]
+
+            if len(model_rows) == 0:
+                continue
+            elif len(solved) == 0:
+                print(f"Model {model}, {configuration}. No LP solved.")
+                continue
+
+            ratio = sum(row['lp_bound'] / best[row['instance']] for row in solved) / len(solved)
+            lp_time = sum(row['lp_time'] for row in solved) / len(solved)
+            n_vars = sum(row['n_vars'] for row in solved) / len(solved)
+
+            print(f"Model {model}, {configuration}. LP solved on {len(solved)}/{len(model_rows)} instances, "
+                  f"average bound {ratio:.3f} of the best, average LP time {lp_time:.2f}s, average vars {n_vars:.0f}.")
+
+    if len(best) > 0:
+        ratio = sum(combinatorial[instance] / bound for instance, bound in best.items()) / len(best)
+        print(f"Combinatorial bound. Average {ratio:.3f} of the best LP bound.")
+
+    if args.output_file is not None and len(rows) > 0:
+        fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+
+        with open(args.output_file, mode='w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
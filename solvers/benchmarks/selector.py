@@ -0,0 +1,86 @@
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from bap.selector import FormulationSelector, training_set
+
+# Calibrates the formulation selector on the runs of a results store, and evaluates it
+# against the oracle, which always picks the fastest model, and against the single model
+# which is fastest overall. Each instance is predicted by a selector calibrated without any
+# run on that instance (leave-one-instance-out), so that truncations of the same instance
+# do not leak into the evaluation. Only instances on which all models were run count. The
+# selector written to the output file only uses its regressions if they beat the single
+# best model in this evaluation; otherwise it always picks the single best model.
+# Generate the runs with, e.g.:
+#   python batch.py -i '../instances/Santini/*.json' -m pa,rp,s,ti -t 8,12 -l 20 -k highs --results-store runs.jsonl
+# Run from the solvers folder: python -m benchmarks.selector -s runs.jsonl -o selector.json
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='selector',
+        description='Calibrates the formulation selector on past runs and compares it with the oracle choice'
+    )
+
+    parser.add_argument(
+        '-s', '--store', action='store', type=str, required=True,
+        help='Results store with the runs (.jsonl or .sqlite file, or folder)')
+    parser.add_argument(
+        '-f', '--instance-folder', action='store', type=str,
+        help='Look up instances by name in this folder rather than by the path recorded with each run')
+    parser.add_argument(
+        '-r', '--ridge', action='store', type=float, default=1.0,
+        help='Ridge regularisation of the regressions')
+    parser.add_argument(
+        '-o', '--output-file', action='store', type=str,
+        help='Write the selector calibrated on all runs to this file, for main.py -m auto')
+
+    args = parser.parse_args()
+
+    keys, X, y = training_set(args.store, instance_folder=args.instance_folder)
+    models = [model for model in y if not np.isnan(y[model]).all()]
+    complete = np.all([~np.isnan(y[model]) for model in models], axis=0)
+    times = np.column_stack([y[model] for model in models])
+    names = np.array([key[0] for key in keys])
+
+    chosen = np.full(len(keys), -1)
+
+    for name in set(names[complete]):
+        held_out = names == name
+        selector = FormulationSelector.fit(X[~held_out], {model: y[model][~held_out] for model in models}, ridge=args.ridge)
+
+        for row in np.nonzero(held_out & complete)[0]:
+            chosen[row] = models.index(selector.select_vector(X[row]))
+
+    rows = np.nonzero(complete)[0]
+    use_regressions = False
+
+    if len(rows) == 0:
+        print('No instance was run with all models.')
+    else:
+        oracle = np.argmin(times[rows], axis=1)
+        single_best = int(np.argmin(times[rows].sum(axis=0)))
+        oracle_time = times[rows, oracle].sum()
+        selector_time = times[rows, chosen[rows]].sum()
+
+        print(f"{len(rows)} instances, counting each truncation separately, models {', '.join(models)}.")
+        print(f"Oracle choices: {dict(Counter(models[k] for k in oracle))}.")
+        print(f"Selector choices: {dict(Counter(models[k] for k in chosen[rows]))}.")
+
+        for k, model in enumerate(models):
+            print(f"Model {model}. Fastest on {np.sum(oracle == k)} instances, total penalised time {times[rows, k].sum():.2f}s.")
+
+        print(f"Oracle: {oracle_time:.2f}s. "
+              f"Selector: {selector_time:.2f}s ({selector_time / oracle_time:.2f}x the oracle), "
+              f"same choice as the oracle on {np.mean(chosen[rows] == oracle):.0%} of the instances. "
+              f"Single best model ({models[single_best]}): {times[rows, single_best].sum():.2f}s.")
+
+        use_regressions = bool(selector_time < times[rows, single_best].sum())
+
+    if args.output_file is not None:
+        selector = FormulationSelector.fit(X, y, ridge=args.ridge)
+        selector.use_regressions = use_regressions
+        selector.save(args.output_file)
+        print(f"Selector calibrated on {len(keys)} instances written to {args.output_file}: "
+              f"{'regressions over ' + ', '.join(selector.winners) if use_regressions else 'always ' + selector.single_best}.")
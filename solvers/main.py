@@ -1,10 +1,19 @@
 import argparse
 
 from bap.instance import Instance
+from bap.results import open_sink
 from bap.pa_solver import PASolver
 from bap.rp_solver import RPSolver
 from bap.s_solver import SSolver
 from bap.ti_solver import TISolver
+from bap.local_search import LSSolver
+from bap.lns import LNSSolver
+from bap.cp_solver import CPSolver
+from bap.ladder import Ladder
+from bap.checkpoint import Checkpoint
+from bap.selector import FormulationSelector
+from bap.features import feature_vector
+from bap.relaxation import lp_relaxation
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
@@ -15,8 +24,9 @@ if __name__ == '__main__':
     parser.add_argument(
         '-i', '--instance', action='store', help='Path to the instance file')
     parser.add_argument(
-        '-m', '--model', action='store', help='Model to use',
-        choices=('pa', 'rp', 's', 'ti'))
+        '-m', '--model', action='store',
+        help='Model to use. With auto, the selector of --selector picks the MIP model: the shipped selector.json always picks rp, the single best model of its calibration',
+        choices=('pa', 'rp', 's', 'ti', 'ls', 'lns', 'cp', 'auto'))
     parser.add_argument(
         '-t', '--truncate', action='store', type=int,
         help='Truncate instance to the first n ships')
@@ -32,15 +42,79 @@ if __name__ == '__main__':
     parser.add_argument(
         '-z', '--compute-iis', action='store_true',
         help='If the flag is given and the model is unfeasible, compute the IIS')
+    parser.add_argument(
+        '-b', '--lower-bound', action='store_true',
+        help='If the flag is given, the combinatorial lower bound is imposed on the makespan')
+    parser.add_argument(
+        '-l', '--time-limit', action='store', type=float,
+        help='Time limit in seconds (default: 3600 for MIP and CP models, 60 for the local search, 300 for the LNS)')
+    parser.add_argument(
+        '-r', '--restarts', action='store', type=int, default=1,
+        help='Number of independent restarts of the local search')
+    parser.add_argument(
+        '-w', '--workers', action='store', type=int, default=1,
+        help='Number of processes running the local search restarts, or of CP-SAT search workers')
+    parser.add_argument(
+        '--lns-model', action='store', default='rp', choices=('rp', 's'),
+        help='Model re-optimising the LNS neighbourhoods')
+    parser.add_argument(
+        '--lns-subtime', action='store', type=float, default=5.0,
+        help='Time limit in seconds for each LNS neighbourhood')
+    parser.add_argument(
+        '--backend', action='store', default='gurobi', choices=('gurobi', 'highs'),
+        help='MIP solver for the pa, rp, s, ti and lns models')
+    parser.add_argument(
+        '--filter-pairs', action='store_true',
+        help='With the s and ti models, search schedules no worse than a greedy one and only create pair variables for pairs whose relative position is not forced')
+    parser.add_argument(
+        '--lazy-pairs', action='store_true',
+        help='With the rp model, only model pairs of ships whose time windows overlap, and add the others when a solution overlaps them')
+    parser.add_argument(
+        '-k', '--ladder', action='store', type=int,
+        help='Solve the truncations to the first k, 2k, 3k, ... ships in turn, each starting from the previous schedule')
+    parser.add_argument(
+        '--checkpoint', action='store', type=float,
+        help='With the pa, rp, s and ti models on Gurobi, save the incumbent and the bound to a checkpoint file at most every this many seconds')
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='Resume the run of the same instance and model from its checkpoint file, if there is one, within what is left of its time limit')
+    parser.add_argument(
+        '--lp-relaxation', action='store_true',
+        help='With the pa, rp, s and ti models, only solve the LP relaxation and print its bound, time and model size')
+    parser.add_argument(
+        '--selector', action='store', type=str, default='selector.json',
+        help='With -m auto, the calibrated selector which picks the MIP model predicted to solve fastest, or the single best one if its predictions do no better (see benchmarks/selector.py)')
     parser.add_argument(
         '-p', '--print', action='store_true',
         help='If the flag is given, print instance data')
     parser.add_argument(
         '-o', '--output-folder', action='store', type=str,
         help='Output folder', default='results')
+    parser.add_argument(
+        '--results-store', action='store', type=str,
+        help='Append results to this store (.jsonl or .sqlite file) rather than writing a file to the output folder')
     
     args = parser.parse_args()
-    
+
+    # Options which only apply to some models are rejected with the others, before anything
+    # is built. With -m auto, the model is one of pa, rp, s and ti, chosen later.
+    mip_models = ('pa', 'rp', 's', 'ti', 'auto')
+
+    if args.lazy_pairs and args.model != 'rp':
+        parser.error('--lazy-pairs needs the rp model')
+
+    if args.filter_pairs and args.model not in ('s', 'ti'):
+        parser.error('--filter-pairs needs the s or ti model')
+
+    if args.lp_relaxation and (args.model not in mip_models or args.ladder is not None):
+        parser.error('--lp-relaxation needs the pa, rp, s, ti or auto model, without --ladder')
+
+    if args.checkpoint is not None or args.resume:
+        if args.model not in mip_models or args.backend != 'gurobi' or args.ladder is not None:
+            parser.error('--checkpoint and --resume need the pa, rp, s, ti or auto model on the Gurobi backend, without --ladder')
+        if args.lazy_pairs:
+            parser.error('--checkpoint and --resume are not supported with --lazy-pairs')
+
     i = Instance(instance_file=args.instance)
 
     if args.truncate is not None:
@@ -53,20 +127,92 @@ if __name__ == '__main__':
     if args.print is not None and args.print:
         i.print()
 
+    if args.model == 'auto':
+        selector = FormulationSelector.load(args.selector)
+        features = feature_vector(i)
+        args.model = selector.select_vector(features)
+
+        if selector.use_regressions and selector.covers(features):
+            predicted = selector.predict_vector(features)
+            print(f"Selected model {args.model}. Predicted times: {', '.join(f'{m} {t:.2f}s' for m, t in predicted.items())}.")
+        else:
+            print(f"Selected model {args.model}, the single best model of the calibration.")
+
+    kwargs = dict(use_lower_bound=args.lower_bound)
+
+    if args.model in ('pa', 'rp', 's', 'ti', 'lns'):
+        kwargs['backend'] = args.backend
+
+    if args.results_store is not None:
+        kwargs['sink'] = open_sink(args.results_store)
+
+    if args.time_limit is not None:
+        kwargs['grb_timelimit'] = args.time_limit
+
+    checkpoint = None
+
+    if args.checkpoint is not None or args.resume:
+        checkpoint = Checkpoint(
+            instance=i, model=args.model, output_folder=args.output_folder,
+            time_limit=3600 if args.time_limit is None else args.time_limit,
+            interval=60.0 if args.checkpoint is None else args.checkpoint)
+
+        if args.resume and checkpoint.load():
+            kwargs['grb_timelimit'] = checkpoint.remaining_time()
+            print(f"Resuming after {checkpoint.elapsed:.2f} seconds, with {checkpoint.remaining_time():.2f} seconds left.")
+
+    if args.model in ('ls', 'lns', 'cp') and args.time_limit is not None:
+        kwargs['timelimit'] = args.time_limit
+
+    if args.model == 'ls':
+        kwargs.update(n_restarts=args.restarts, n_workers=args.workers)
+    elif args.model == 'cp':
+        kwargs.update(n_workers=args.workers)
+    elif args.model == 'rp':
+        kwargs.update(lazy_pairs=args.lazy_pairs)
+    elif args.model in ('s', 'ti'):
+        kwargs.update(filter_pairs=args.filter_pairs)
+    elif args.model == 'lns':
+        kwargs.update(model=args.lns_model, sub_timelimit=args.lns_subtime)
+
+    if args.ladder is not None:
+        Ladder(instance=i, output_folder=args.output_folder, base_model=args.model, step=args.ladder, **kwargs).solve()
+        exit(0)
+
     if args.model == 'pa':
-        m = PASolver(instance=i, output_folder=args.output_folder)
+        m = PASolver(instance=i, output_folder=args.output_folder, **kwargs)
     elif args.model == 'rp':
-        m = RPSolver(instance=i, output_folder=args.output_folder)
+        m = RPSolver(instance=i, output_folder=args.output_folder, **kwargs)
     elif args.model == 's':
-        m = SSolver(instance=i, output_folder=args.output_folder)
+        m = SSolver(instance=i, output_folder=args.output_folder, **kwargs)
     elif args.model == 'ti':
-        m = TISolver(instance=i, output_folder=args.output_folder)
+        m = TISolver(instance=i, output_folder=args.output_folder, **kwargs)
+    elif args.model == 'ls':
+        m = LSSolver(instance=i, output_folder=args.output_folder, **kwargs)
+    elif args.model == 'lns':
+        m = LNSSolver(instance=i, output_folder=args.output_folder, **kwargs)
+    elif args.model == 'cp':
+        m = CPSolver(instance=i, output_folder=args.output_folder, **kwargs)
     else:
         raise NotImplementedError(f"Model {args.model} not recognised")
     
+    if args.lp_relaxation:
+        relaxation = lp_relaxation(m, time_limit=kwargs.get('grb_timelimit', 3600.0))
+        print(', '.join(f"{key}: {value}" for key, value in relaxation.items()))
+        exit(0)
+
     if args.starting_solution is not None:
         fix = (args.fix_starting is not None) and args.fix_starting
         print(f"Using a starting solution. Fix = {fix}.")
         m.load_initial(initial_file=args.starting_solution, fix=fix)
+
+    if checkpoint is not None and checkpoint.ships is not None:
+        m.load_initial(initial_file=checkpoint.checkpoint_file)
     
-    m.solve(compute_iis=args.compute_iis)
\ No newline at end of file
+    if args.model in ('ls', 'lns', 'cp'):
+        m.solve()
+    elif checkpoint is not None:
+        results = m.solve(compute_iis=args.compute_iis, callback=checkpoint.callback(m), write_results=False)
+        m.sink.write(i, args.model, checkpoint.finish(results))
+    else:
+        m.solve(compute_iis=args.compute_iis)
\ No newline at end of file
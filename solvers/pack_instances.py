@@ -0,0 +1,30 @@
+import argparse
+from glob import glob
+from os import path
+
+from bap.bundle import pack, InstanceBundle
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='pack_instances',
+        description='Packs the instances of a folder into one bundle file, which the solvers map into memory'
+    )
+
+    parser.add_argument(
+        '-f', '--folder', action='store', type=str, default='../instances/Santini',
+        help='Folder with the instances, in the JSON format')
+    parser.add_argument(
+        '-p', '--pattern', action='store', type=str, default='*.json',
+        help='Pattern of the instance file names')
+    parser.add_argument(
+        '-o', '--output-file', action='store', type=str, required=True,
+        help='Bundle file to write')
+
+    args = parser.parse_args()
+
+    instance_files = sorted(glob(path.join(args.folder, args.pattern)))
+    n_instances = pack(instance_files, args.output_file)
+    bundle = InstanceBundle(args.output_file)
+
+    print(f"Packed {n_instances} instances into {args.output_file} ({path.getsize(args.output_file)} bytes, "
+          f"{bundle.data.nbytes} bytes of data).")
@@ -0,0 +1,47 @@
+import argparse
+from os import path
+
+from bap.instance import Instance
+from bap.plotting import plot_results, plot_folder
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='plot',
+        description='Plots the schedules in a results file, or in all results files of a folder'
+    )
+
+    parser.add_argument(
+        '-r', '--results', action='store', type=str, required=True,
+        help='Results file, or folder containing results files')
+    parser.add_argument(
+        '-i', '--instance', action='store', type=str,
+        help='Path to the instance file, to draw the whole quay (single results file only)')
+    parser.add_argument(
+        '-o', '--output-folder', action='store', type=str,
+        help='Output folder (default: the folder of the results files)')
+    parser.add_argument(
+        '-w', '--workers', action='store', type=int,
+        help='Number of worker processes when plotting a folder (default: number of CPUs)')
+    parser.add_argument(
+        '-d', '--dpi', action='store', type=int, default=96,
+        help='Resolution of the images')
+
+    args = parser.parse_args()
+
+    if path.isdir(args.results):
+        for output_file in plot_folder(folder=args.results, output_folder=args.output_folder, n_workers=args.workers, dpi=args.dpi):
+            print(output_file)
+    else:
+        instance = None if args.instance is None else Instance(instance_file=args.instance)
+        output_file = None
+
+        if args.output_folder is not None:
+            name = path.splitext(path.basename(args.results))[0].replace('results-', 'schedule-', 1)
+            output_file = path.join(args.output_folder, name + '.png')
+
+        output_file = plot_results(results_file=args.results, output_file=output_file, instance=instance, dpi=args.dpi)
+
+        if output_file is None:
+            print(f"No schedule in {args.results}.")
+        else:
+            print(output_file)
@@ -0,0 +1,63 @@
+import argparse
+
+from bap.instance import Instance
+from bap.results import open_sink
+from bap.portfolio import Portfolio
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='portfolio',
+        description='Races multiple BAP models on the same instance, sharing incumbents'
+    )
+
+    parser.add_argument(
+        '-i', '--instance', action='store', help='Path to the instance file')
+    parser.add_argument(
+        '-m', '--models', action='store', type=str, default='pa,rp,s,ti',
+        help='Comma-separated list of models to race')
+    parser.add_argument(
+        '-t', '--truncate', action='store', type=int,
+        help='Truncate instance to the first n ships')
+    parser.add_argument(
+        '-x', '--cut', action='store', type=str,
+        help='Comma-separated list of ship indices to retain')
+    parser.add_argument(
+        '-s', '--starting-solution', action='store', type=str,
+        help='File containing a starting solution, shared with all models')
+    parser.add_argument(
+        '-l', '--time-limit', action='store', type=float, default=3600.0,
+        help='Time limit for each model, in seconds')
+    parser.add_argument(
+        '-b', '--lower-bound', action='store_true',
+        help='If the flag is given, the combinatorial lower bound is imposed on the makespan')
+    parser.add_argument(
+        '-o', '--output-folder', action='store', type=str,
+        help='Output folder', default='results')
+    parser.add_argument(
+        '--results-store', action='store', type=str,
+        help='Append results to this store (.jsonl or .sqlite file) rather than writing a file to the output folder')
+
+    args = parser.parse_args()
+
+    i = Instance(instance_file=args.instance)
+
+    if args.truncate is not None:
+        i.truncate(n_ships=args.truncate)
+
+    if args.cut is not None:
+        ships = [int(i) for i in args.cut.split(',')]
+        i.reduce(ships=ships)
+
+    kwargs = dict(grb_timelimit=args.time_limit, use_lower_bound=args.lower_bound)
+
+    if args.results_store is not None:
+        kwargs['sink'] = open_sink(args.results_store)
+
+    p = Portfolio(instance=i, output_folder=args.output_folder, models=args.models.split(','), **kwargs)
+
+    if args.starting_solution is not None:
+        p.load_initial(initial_file=args.starting_solution)
+
+    results = p.solve()
+
+    print(f"Winner: {results['winner']}. Makespan: {results['makespan']}. Dual bound: {results['dual_bound']}.")
@@ -0,0 +1,88 @@
+import argparse
+import csv
+import tempfile
+
+from bap.instance import Instance
+from bap.batch import make_env
+from bap.bounds import lower_bounds
+from bap.schedule import violations
+from bap.replay import ReplaySimulator, STRATEGIES, MIP_STRATEGIES, events
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='replay',
+        description='Replays an instance as a stream of announcements, ETA changes and arrivals, re-planning after each event'
+    )
+
+    parser.add_argument(
+        '-i', '--instance', action='store', type=str, required=True,
+        help='Path to the instance file')
+    parser.add_argument(
+        '-t', '--truncate', action='store', type=int,
+        help='Truncate instance to the first n ships')
+    parser.add_argument(
+        '-s', '--strategy', action='store', type=str, default='greedy', choices=STRATEGIES,
+        help='Re-planning strategy: the greedy heuristic, or a model solved with the time limit')
+    parser.add_argument(
+        '-l', '--time-limit', action='store', type=float, default=1.0,
+        help='Time limit in seconds of each re-planning')
+    parser.add_argument(
+        '-k', '--backend', action='store', type=str, default='gurobi', choices=('gurobi', 'highs'),
+        help='MIP solver for the MIP models (pa, rp, s, ti)')
+    parser.add_argument(
+        '--lead', action='store', type=int, default=48,
+        help='Number of periods between the announcement of a ship and its arrival')
+    parser.add_argument(
+        '--eta-error', action='store', type=int, default=6,
+        help='Largest error in periods of the ETA given with the announcement')
+    parser.add_argument(
+        '--updates', action='store', type=int, default=1,
+        help='Number of ETA changes of each ship between its announcement and its arrival')
+    parser.add_argument(
+        '--seed', action='store', type=int, default=0,
+        help='Seed of the ETA errors')
+    parser.add_argument(
+        '-o', '--output-file', action='store', type=str,
+        help='Also write one row per event to this CSV file')
+
+    args = parser.parse_args()
+    instance = Instance(instance_file=args.instance)
+
+    if args.truncate is not None:
+        instance.truncate(n_ships=min(args.truncate, instance.n_ships))
+
+    env = make_env() if args.strategy in MIP_STRATEGIES and args.backend == 'gurobi' else None
+    stream = events(instance, lead=args.lead, eta_error=args.eta_error, n_updates=args.updates, seed=args.seed)
+    rows = list()
+
+    print(f"{'event':>5} {'time':>5} {'kind':>8} {'ship':>4} {'eta':>5} {'known':>5} {'started':>7} {'latency':>8} {'makespan':>8} {'churn':>5} {'shift':>5}")
+
+    with tempfile.TemporaryDirectory() as output_folder:
+        simulator = ReplaySimulator(instance, output_folder=output_folder, strategy=args.strategy,
+                                    time_limit=args.time_limit, backend=args.backend, env=env)
+
+        for row in simulator.run(stream):
+            rows.append(row)
+            fallback = ' (greedy fallback)' if row['fallback'] else ''
+
+            print(f"{row['event']:>5} {row['time']:>5} {row['kind']:>8} {row['ship']:>4} {row['eta']:>5} {row['n_known']:>5} "
+                  f"{row['n_started']:>7} {row['latency']:>8.3f} {row['makespan']:>8} {row['churn']:>5} {row['shift']:>5}{fallback}")
+
+    schedule = simulator.schedule()
+    errors = violations(instance, schedule)
+    latencies = sorted(row['latency'] for row in rows)
+
+    print(f"Replayed {len(rows)} events of {instance.n_ships} ships with strategy {args.strategy} in {sum(latencies):.2f}s: "
+          f"latency mean {sum(latencies) / len(latencies):.3f}s, max {latencies[-1]:.3f}s.")
+    print(f"Makespan {max(s['completion_time'] for s in schedule)} (lower bound with known arrivals {lower_bounds(instance)['best']}). "
+          f"Churn: {sum(row['churn'] for row in rows)} ships moved, by {sum(row['shift'] for row in rows)} periods in total; "
+          f"{sum(row['fallback'] for row in rows)} greedy fallbacks.")
+
+    for error in errors:
+        print(f"Violation: {error}")
+
+    if args.output_file is not None:
+        with open(args.output_file, mode='w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
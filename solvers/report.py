@@ -0,0 +1,96 @@
+import argparse
+from os import path
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+from bap.analysis import Comparison, load, profile, profile_figure, means_figure
+
+# Values of tau at which the performance profiles are printed.
+TAUS = (1.0, 2.0, 4.0, 10.0, 100.0)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='report',
+        description='Compares formulations over the runs of results stores: performance profiles, shifted geometric means per family, wins and losses'
+    )
+
+    parser.add_argument(
+        '-s', '--stores', action='store', type=str, nargs='+', required=True,
+        help='Results stores (.jsonl or .sqlite files, or folders of results files)')
+    parser.add_argument(
+        '-m', '--models', action='store', type=str,
+        help='Comma-separated list of models to compare (default: all models with runs)')
+    parser.add_argument(
+        '--shift', action='store', type=float, default=10.0,
+        help='Shift in seconds of the geometric means of the solve time')
+    parser.add_argument(
+        '--tie', action='store', type=float, default=0.1,
+        help='Relative difference in solve time below which two models tie')
+    parser.add_argument(
+        '-o', '--output-folder', action='store', type=str,
+        help='Also plot the performance profiles and the means to this folder')
+    parser.add_argument(
+        '-d', '--dpi', action='store', type=int, default=96,
+        help='Resolution of the images')
+
+    args = parser.parse_args()
+
+    start = perf_counter()
+    runs = load(args.stores)
+    comparison = Comparison(runs, models=None if args.models is None else args.models.split(','))
+    models = comparison.models
+    load_time = perf_counter() - start
+
+    print(f"{len(runs['run_id'])} runs loaded in {load_time:.2f}s. "
+          f"{len(comparison)} instances run with all of {', '.join(models)}.")
+
+    if len(comparison) == 0:
+        exit(0)
+
+    print()
+    print('Solved: ' + ', '.join(f"{model} {n}" for model, n in zip(models, comparison.solved.sum(axis=0))) + '.')
+
+    for title, ratios in (('solve time', comparison.time_ratios()), ('gap', comparison.gap_ratios())):
+        rho = profile(ratios, np.array(TAUS))
+
+        print()
+        print(f"Performance profile on {title}: fraction of instances within tau of the best.")
+        print(f"{'tau':>6} " + ' '.join(f"{model:>7}" for model in models))
+
+        for tau, row in zip(TAUS, rho):
+            print(f"{tau:>6g} " + ' '.join(f"{value:>7.3f}" for value in row))
+
+    families, means = comparison.shifted_geometric_means(shift=args.shift)
+
+    print()
+    print(f"Shifted geometric mean of the solve time in seconds (shift {args.shift:g}).")
+    print(f"{'family':>8} {'count':>5} " + ' '.join(f"{model:>9}" for model in models))
+
+    for f, row in zip(families, means):
+        print(f"{f:>8} {np.sum(comparison.families == f):>5} " + ' '.join(f"{value:>9.2f}" for value in row))
+
+    wins = comparison.wins(tie=args.tie)
+
+    print()
+    print('Wins/losses of the row model against the column model.')
+    print(f"{'':>5} " + ' '.join(f"{model:>9}" for model in models))
+
+    for a, model in enumerate(models):
+        print(f"{model:>5} " + ' '.join(f"{'-':>9}" if a == b else f"{f'{wins[a, b]}/{wins[b, a]}':>9}" for b in range(len(models))))
+
+    if args.output_folder is not None:
+        Path(args.output_folder).mkdir(exist_ok=True)
+        figures = dict(
+            profile_time=profile_figure(comparison.time_ratios(), models, xlabel='Ratio to the best solve time', dpi=args.dpi),
+            profile_gap=profile_figure(comparison.gap_ratios(), models, xlabel='Ratio to the best gap (shifted by 1%)', dpi=args.dpi),
+            means=means_figure(families, means, models, shift=args.shift, dpi=args.dpi)
+        )
+
+        print()
+
+        for name, fig in figures.items():
+            output_file = path.join(args.output_folder, f"{name.replace('_', '-')}.png")
+            fig.savefig(output_file)
+            print(output_file)
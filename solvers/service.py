@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import json
+from pathlib import Path
+
+from bap.service import SolveService, send_request
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='service',
+        description='Local solve service with a pool of warm worker processes, and its client'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help='Start the service')
+    solve = commands.add_parser('solve', help='Send an instance to the service and wait for the results')
+    cancel = commands.add_parser('cancel', help='Cancel a request')
+    status = commands.add_parser('status', help='Print the workers and the queued requests')
+
+    for command in (serve, solve, cancel, status):
+        command.add_argument(
+            '-u', '--socket', action='store', type=str,
+            help='Path of the Unix socket; if not given, use a TCP port on localhost')
+        command.add_argument(
+            '--port', action='store', type=int, default=8765,
+            help='TCP port on localhost')
+
+    serve.add_argument(
+        '-w', '--workers', action='store', type=int, default=1,
+        help='Number of worker processes')
+    serve.add_argument(
+        '-o', '--output-folder', action='store', type=str, default='results',
+        help='Output folder, for the solver logs')
+    serve.add_argument(
+        '--results-store', action='store', type=str,
+        help='Also append the results of every request to this store (.jsonl or .sqlite file, or folder)')
+    serve.add_argument(
+        '--grace-period', action='store', type=float, default=30.0,
+        help='Seconds after the time limit of a request before its worker is replaced')
+
+    solve.add_argument(
+        '-i', '--instance', action='store', type=str, required=True,
+        help='Path to the instance file, sent as JSON')
+    solve.add_argument(
+        '-m', '--model', action='store', type=str, default='rp',
+        help='Model to use')
+    solve.add_argument(
+        '-t', '--truncate', action='store', type=int,
+        help='Truncate the instance to the first n ships')
+    solve.add_argument(
+        '-l', '--time-limit', action='store', type=float,
+        help='Time limit in seconds')
+    solve.add_argument(
+        '-k', '--backend', action='store', type=str, choices=('gurobi', 'highs'),
+        help='MIP solver for the MIP models')
+    solve.add_argument(
+        '--id', action='store', type=str,
+        help='Request id, e.g., to cancel the request from another client')
+    solve.add_argument(
+        '-r', '--results-file', action='store', type=str,
+        help='Write the results to this JSON file')
+
+    cancel.add_argument(
+        '--id', action='store', type=str, required=True,
+        help='Request id')
+
+    args = parser.parse_args()
+    address = args.socket if args.socket is not None else ('127.0.0.1', args.port)
+
+    if args.command == 'serve':
+        Path(args.output_folder).mkdir(exist_ok=True)
+        service = SolveService(
+            n_workers=args.workers, output_folder=args.output_folder,
+            results_store=args.results_store, grace_period=args.grace_period)
+
+        asyncio.run(service.serve(socket_path=args.socket, port=args.port))
+    elif args.command == 'solve':
+        with open(args.instance) as f:
+            message = dict(
+                op='solve', id=args.id, model=args.model, instance=json.load(f),
+                name=Path(args.instance).stem, truncate=args.truncate, time_limit=args.time_limit,
+                options=dict() if args.backend is None else dict(backend=args.backend))
+
+        for event in send_request(address, message):
+            if event['event'] == 'progress':
+                makespan = '-' if event['makespan'] is None else f"{event['makespan']:.0f}"
+                print(f"{event['elapsed']:8.2f}s: makespan {makespan:>5}, bound {event['dual_bound']:.1f}")
+            elif event['event'] in ('result', 'cancelled') and 'results' in event:
+                results = event['results']
+                print(f"{event['event'].capitalize()}: makespan {results['makespan']}, bound {results['dual_bound']}, "
+                      f"build {results['build_time']:.2f}s, solve {results['solve_time']:.2f}s")
+
+                if args.results_file is not None:
+                    with open(args.results_file, 'w') as f:
+                        json.dump(results, f, indent=2)
+            else:
+                print(json.dumps(event))
+    elif args.command == 'cancel':
+        for event in send_request(address, dict(op='cancel', id=args.id)):
+            print(json.dumps(event))
+    else:
+        for event in send_request(address, dict(op='status')):
+            print(json.dumps(event, indent=2))
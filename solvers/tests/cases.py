@@ -0,0 +1,69 @@
+from os import path
+
+from bap.instance import Instance
+from bap.schedule import extend_schedule, makespan
+
+# Small cases, so that every model fits in Gurobi's size-limited licence (2000 variables
+# and constraints): the PA model only on a handful of ships, the RP, S and TI models on a
+# few more. Each case is the truncation of an instance to its first ships, or its
+# reduction to a subset of them. Instances come from the Santini folder, unless the case
+# names another one: Santini_Berth_Handling has the handling times of the original
+# Lalla-Ruiz instances, which depend on the berth (instances/converter.py).
+
+INSTANCES = path.join(path.dirname(__file__), '..', '..', 'instances', 'Santini')
+BERTH_HANDLING_INSTANCES = path.join(path.dirname(__file__), '..', '..', 'instances', 'Santini_Berth_Handling')
+
+ALL_MODELS = ('pa', 'rp', 'rp-lazy', 's', 's-filter', 'ti', 'ti-filter', 'cp', 'ls')
+PAIR_MODELS = ('rp', 'rp-lazy', 's', 's-filter', 'ti', 'ti-filter', 'cp', 'ls')
+
+CASES = {
+    'f30x3-01-6': dict(instance='f30x3-01', truncate=6, models=ALL_MODELS),
+    'f30x5-01-4': dict(instance='f30x5-01', truncate=4, models=ALL_MODELS),
+    'f30x3-01-odd': dict(instance='f30x3-01', ships=[1, 3, 5, 7, 9], models=ALL_MODELS),
+    'f30x3-01-10': dict(instance='f30x3-01', truncate=10, models=PAIR_MODELS),
+    'f40x5-01-12': dict(instance='f40x5-01', truncate=12, models=PAIR_MODELS),
+    'f55x10-01-12': dict(instance='f55x10-01', truncate=12, models=PAIR_MODELS),
+    'f30x3-01-bh': dict(instance='f30x3-01', folder=BERTH_HANDLING_INSTANCES, ships=[1, 2, 3, 5, 7], models=ALL_MODELS),
+}
+
+# Model variants: the solver and its keyword arguments.
+VARIANTS = {
+    'pa': ('pa', dict()),
+    'rp': ('rp', dict()),
+    'rp-lazy': ('rp', dict(lazy_pairs=True)),
+    's': ('s', dict()),
+    's-filter': ('s', dict(filter_pairs=True)),
+    'ti': ('ti', dict()),
+    'ti-filter': ('ti', dict(filter_pairs=True)),
+    'cp': ('cp', dict(n_workers=1)),
+    'ls': ('ls', dict(timelimit=1.0))
+}
+
+MIP_VARIANTS = ('pa', 'rp', 'rp-lazy', 's', 's-filter', 'ti', 'ti-filter')
+
+# Exact models, expected to prove the optimum within the time limit.
+EXACT = ('pa', 'rp', 'rp-lazy', 's', 's-filter', 'ti', 'ti-filter', 'cp')
+
+TIME_LIMIT = 60.0
+
+
+def case_instance(case: str) -> Instance:
+    spec = CASES[case]
+    instance = Instance(instance_file=path.join(spec.get('folder', INSTANCES), f"{spec['instance']}.json"))
+
+    if 'truncate' in spec:
+        instance.truncate(n_ships=spec['truncate'])
+    else:
+        instance.reduce(ships=spec['ships'])
+
+    # The horizon ends two periods after a greedy schedule, which leaves the optimum
+    # unchanged and keeps the time-indexed models small.
+    horizon = makespan(extend_schedule(instance, [])) + 2
+    instance.n_periods = horizon
+    instance.time_horizon = list(range(horizon))
+
+    return instance
+
+
+def runs():
+    return [(case, variant) for case, spec in CASES.items() for variant in spec['models']]
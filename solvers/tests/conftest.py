@@ -0,0 +1,71 @@
+import json
+from os import path
+from time import perf_counter
+
+import pytest
+
+from bap.batch import SOLVERS, make_env
+from cases import VARIANTS, TIME_LIMIT, case_instance
+
+BASELINES_FILE = path.join(path.dirname(__file__), 'baselines.json')
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--update-baselines', action='store_true',
+        help='Record the optima, model sizes and times of this run as the new baselines')
+    parser.addoption(
+        '--time-tolerance', action='store', type=float, default=3.0,
+        help='Fail when a build or solve time exceeds this many times its baseline (plus half a second)')
+
+
+@pytest.fixture(scope='session')
+def env():
+    env = make_env()
+    yield env
+    env.dispose()
+
+
+@pytest.fixture(scope='session')
+def baselines(request):
+    if path.exists(BASELINES_FILE):
+        with open(BASELINES_FILE) as f:
+            data = json.load(f)
+    else:
+        data = dict(optima=dict(), sizes=dict(), times=dict())
+
+    yield data
+
+    if request.config.getoption('--update-baselines'):
+        with open(BASELINES_FILE, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+@pytest.fixture(scope='session')
+def solved(env, tmp_path_factory):
+    # Each case and variant is solved once per session, and shared by all the tests.
+    cache = dict()
+    output_folder = str(tmp_path_factory.mktemp('results'))
+
+    def solve(case: str, variant: str) -> dict:
+        if (case, variant) not in cache:
+            model, kwargs = VARIANTS[variant]
+            instance = case_instance(case)
+            kwargs = dict(kwargs, grb_timelimit=TIME_LIMIT, timelimit=kwargs.get('timelimit', TIME_LIMIT),
+                          log_file=path.join(output_folder, f"log-{case}-{variant}.log"))
+
+            if model in ('pa', 'rp', 's', 'ti'):
+                kwargs['env'] = env
+
+            start = perf_counter()
+            solver = SOLVERS[model](instance=instance, output_folder=output_folder, **kwargs)
+            build_time = perf_counter() - start
+            sizes = solver.m.stats() if model in ('pa', 'rp', 's', 'ti') else None
+            results = solver.solve(write_results=False)
+
+            cache[(case, variant)] = dict(instance=instance, results=results, sizes=sizes, build_time=build_time)
+
+        return cache[(case, variant)]
+
+    return solve
@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+import pytest
+
+from bap.analysis import Comparison, load, profile
+from bap.results import load_runs
+
+# Solve time and whether the run proves optimality, by instance and model.
+RUNS = {
+    'f30x3-01': dict(rp=(1.0, True), ti=(4.0, True)),
+    'f30x3-02': dict(rp=(10.0, False), ti=(2.0, True)),
+    'f60x7-01': dict(rp=(3.0, True), ti=(3.1, True)),
+    'f60x7-02': dict(rp=(60.0, False), ti=(60.0, False)),
+    'f60x7-03': dict(rp=(1.0, True)),
+}
+
+
+def write_results(folder, name, model, time, optimal):
+    ships = [
+        dict(data_ship_id=i, data_arrival_time=i, data_handling_time=2, data_ship_length=1, data_ship_length_in_berths=1,
+             mooring_time=2 * i, completion_time=2 * i + 1, mooring_position=0, mooring_berth=0)
+        for i in range(5)
+    ] if optimal or model == 'rp' else None
+    results = dict(feasible=True, makespan=None if ships is None else 20.0, dual_bound=20.0 if optimal else 15.0,
+                   solve_time=time, total_time=time + 0.1, ships=ships, lower_bounds=dict(best=10))
+
+    with open(folder / f"results-{name}-{model}solver.json", 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+@pytest.fixture
+def results_folder(tmp_path):
+    for name, models in RUNS.items():
+        for model, (time, optimal) in models.items():
+            write_results(tmp_path, name, model, time, optimal)
+
+    return tmp_path
+
+
+def test_load_runs_without_ships(results_folder):
+    runs = load_runs(str(results_folder))
+    ships = load_runs(str(results_folder), ships=True)
+
+    assert len(runs['run_id']) == 9
+    assert sorted(set(runs['n_ships'].tolist())) == [-1, 5]
+    assert len(ships['run_id']) == 5 * np.sum(runs['n_ships'] == 5)
+
+
+def test_comparison(results_folder):
+    comparison = Comparison(load([str(results_folder)]), models=['rp', 'ti'])
+
+    # f60x7-03 was not run with TI, and the run of TI on f60x7-02 without a solution
+    # counts for the instance with 5 ships.
+    assert sorted(comparison.names.tolist()) == ['f30x3-01', 'f30x3-02', 'f60x7-01', 'f60x7-02']
+    assert comparison.n_ships.tolist() == [5, 5, 5, 5]
+    assert comparison.solved.sum(axis=0).tolist() == [2, 3]
+
+    rho = profile(comparison.time_ratios(), np.array([1.0, 4.0]))
+    assert rho.tolist() == [[0.5, 0.25], [0.5, 0.75]]
+
+    families, means = comparison.shifted_geometric_means(shift=0.0)
+    assert families == ['f30x3', 'f60x7']
+    assert means[0] == pytest.approx([np.sqrt(10.0), np.sqrt(8.0)])
+
+    # RP wins on f30x3-01 and on f60x7-02 (a gap against no solution), TI on f30x3-02; they
+    # tie on f60x7-01.
+    assert comparison.wins(tie=0.1).tolist() == [[0, 2], [1, 0]]
@@ -0,0 +1,116 @@
+from math import ceil
+
+import pytest
+
+from cases import runs, case_instance, EXACT, MIP_VARIANTS, VARIANTS, TIME_LIMIT
+from bap.batch import SOLVERS
+from bap.schedule import violations, makespan
+
+RUNS = runs()
+IDS = [f"{case}-{variant}" for case, variant in RUNS]
+
+
+def runs_of(variants) -> dict:
+    # Parametrisation over the runs of the given variants.
+    selected = [(run, i) for run, i in zip(RUNS, IDS) if run[1] in variants]
+
+    return dict(argvalues=[run for run, _ in selected], ids=[i for _, i in selected])
+
+
+@pytest.mark.parametrize('case, variant', RUNS, ids=IDS)
+def test_schedule_is_feasible(solved, case, variant):
+    run = solved(case, variant)
+    ships = run['results']['ships']
+
+    assert ships is not None
+    assert sorted(s['data_ship_id'] for s in ships) == sorted(run['instance'].ships)
+    assert violations(run['instance'], ships) == []
+    assert makespan(ships) == run['results']['makespan']
+
+
+@pytest.mark.parametrize('case, variant', **runs_of(EXACT))
+def test_optimal_makespan(solved, baselines, request, case, variant):
+    results = solved(case, variant)['results']
+
+    # The makespan is integral, so a bound above makespan - 1 proves optimality.
+    assert ceil(results['dual_bound'] - 1e-6) >= results['makespan'] - 1e-6
+
+    if request.config.getoption('--update-baselines') and case not in baselines['optima']:
+        baselines['optima'][case] = results['makespan']
+
+    assert results['makespan'] == baselines['optima'][case]
+
+
+def test_berth_dependent_case():
+    # Ships 1 and 3 take twice as long at the last berth, and ship 5 cannot finish there:
+    # every exact model finds a longer optimum than with the handling time of the first berth.
+    instance = case_instance('f30x3-01-bh')
+
+    assert [i for i in instance.ships if instance.berth_dependent(i)] == [1, 3, 5]
+
+
+@pytest.mark.parametrize('variant', EXACT)
+@pytest.mark.parametrize('slack', (0, 1))
+def test_completion_in_last_period(env, baselines, tmp_path, variant, slack):
+    # The horizon has periods 0, ..., n_periods - 1. With one period for the optimal
+    # schedule to end in, every exact model finds it; with none, no model has a schedule.
+    case = 'f30x3-01-6'
+    optimum = int(baselines['optima'][case])
+    instance = case_instance(case)
+    instance.n_periods = optimum + slack
+    instance.time_horizon = list(range(instance.n_periods))
+
+    model, kwargs = VARIANTS[variant]
+    kwargs = dict(kwargs, grb_timelimit=TIME_LIMIT, timelimit=TIME_LIMIT, log_file=str(tmp_path / 'log.txt'))
+
+    if model in ('pa', 'rp', 's', 'ti'):
+        kwargs['env'] = env
+
+    results = SOLVERS[model](instance=instance, output_folder=str(tmp_path), **kwargs).solve(write_results=False)
+
+    if slack == 0:
+        assert not results['feasible']
+    else:
+        assert results['makespan'] == optimum == instance.n_periods - 1
+        assert violations(instance, results['ships']) == []
+
+
+def test_cp_search_log_stays_off_stdout(tmp_path, capfd):
+    solver = SOLVERS['cp'](instance=case_instance('f30x3-01-6'), output_folder=str(tmp_path), timelimit=TIME_LIMIT)
+    solver.solve(write_results=False)
+
+    assert 'CP-SAT' not in capfd.readouterr().out
+
+
+@pytest.mark.parametrize('case, variant', **runs_of(('ls',)))
+def test_local_search_not_below_optimum(solved, baselines, case, variant):
+    assert solved(case, variant)['results']['makespan'] >= baselines['optima'][case]
+
+
+@pytest.mark.parametrize('case, variant', **runs_of(MIP_VARIANTS))
+def test_model_size(solved, baselines, request, case, variant):
+    # A change to a model's constraints shows up as a change in its size.
+    sizes = solved(case, variant)['sizes']
+    key = f"{case}/{variant}"
+
+    if request.config.getoption('--update-baselines'):
+        baselines['sizes'][key] = sizes
+
+    assert sizes == baselines['sizes'][key]
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize('case, variant', RUNS, ids=IDS)
+def test_performance(solved, baselines, request, case, variant):
+    run = solved(case, variant)
+    key = f"{case}/{variant}"
+    times = dict(build_time=run['build_time'], solve_time=run['results']['solve_time'])
+
+    if request.config.getoption('--update-baselines'):
+        baselines['times'][key] = times
+
+    tolerance = request.config.getoption('--time-tolerance')
+
+    for name, time in times.items():
+        baseline = baselines['times'][key][name]
+        assert time <= tolerance * baseline + 0.5, f"{name} {time:.2f}s, baseline {baseline:.2f}s"
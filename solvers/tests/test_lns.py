@@ -0,0 +1,50 @@
+from bap.backend import INFEASIBLE
+from bap.lns import LNSSolver
+from bap.schedule import extend_schedule, makespan, violations
+from cases import case_instance
+
+
+def test_start_past_horizon_is_infeasible(env, tmp_path):
+    instance = case_instance('f30x3-01-6')
+    start = extend_schedule(instance, [])
+    instance.n_periods = makespan(start)
+    instance.time_horizon = list(range(instance.n_periods))
+
+    log_file = tmp_path / 'lns.log'
+    solver = LNSSolver(instance=instance, output_folder=str(tmp_path), timelimit=5.0, env=env, log_file=str(log_file))
+    solver.load_schedule(start)
+    results = solver.solve(write_results=False)
+
+    assert not results['feasible']
+    assert results['iterations'] == 0
+    assert results['makespan'] == makespan(start)
+
+
+def test_improvements_go_to_log_file(env, tmp_path, capsys):
+    instance = case_instance('f30x3-01-10')
+    start = extend_schedule(instance, [])
+    log_file = tmp_path / 'lns.log'
+    solver = LNSSolver(instance=instance, output_folder=str(tmp_path), timelimit=3.0, sub_timelimit=1.0, env=env, log_file=str(log_file))
+    solver.load_schedule(start)
+    results = solver.solve(write_results=False)
+
+    assert results['feasible']
+    assert results['makespan'] <= makespan(start)
+    assert 'LNS iteration' not in capsys.readouterr().out
+
+
+def test_s_neighbourhoods_are_feasible(env, tmp_path):
+    # Moving ship 1 up two berths keeps the greedy schedule feasible, but breaks the
+    # valid inequalities of the S model: the neighbourhoods which fix it must still solve.
+    instance = case_instance('f30x3-01-10')
+    start = extend_schedule(instance, [])
+    start[1] = dict(start[1], mooring_berth=2, mooring_position=2)
+    assert violations(instance, start) == []
+
+    solver = LNSSolver(instance=instance, output_folder=str(tmp_path), model='s', timelimit=3.0, sub_timelimit=1.0, neighbourhood_size=2, env=env)
+    solver.load_schedule(start)
+    results = solver.solve(write_results=False)
+
+    assert results['iterations'] > 0
+    assert all(h['status'] != INFEASIBLE for h in results['history'])
+    assert results['makespan'] < makespan(start)
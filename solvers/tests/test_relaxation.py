@@ -0,0 +1,49 @@
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from cases import CASES, VARIANTS, case_instance
+from bap.batch import SOLVERS
+from bap.backend import OPTIMAL
+from bap.relaxation import lp_relaxation
+
+RUNS = [(case, variant) for case, spec in CASES.items() for variant in spec['models'] if variant in ('pa', 'rp', 's', 'ti', 's-filter', 'ti-filter')]
+
+
+@pytest.mark.parametrize('case, variant', RUNS, ids=[f"{case}-{variant}" for case, variant in RUNS])
+def test_lp_bound_is_valid(env, baselines, case, variant):
+    model, kwargs = VARIANTS[variant]
+
+    with TemporaryDirectory() as output_folder:
+        solver = SOLVERS[model](instance=case_instance(case), output_folder=output_folder, env=env, **kwargs)
+        relaxation = lp_relaxation(solver, time_limit=60.0)
+        relaxed = solver.m.stats()
+
+    assert relaxation['status'] == OPTIMAL
+    assert relaxation['lp_bound'] <= baselines['optima'][case] + 1e-6
+    assert relaxed['n_bin_vars'] == 0
+    assert relaxed['n_vars'] == relaxation['n_vars']
+
+
+def test_valid_inequalities_strengthen_s(env, baselines):
+    # The S model without its valid inequalities is smaller, has a weaker LP relaxation, and
+    # still solves to the optimum.
+    case = 'f30x3-01-6'
+    bounds = dict()
+    sizes = dict()
+
+    for valid_inequalities in (True, False):
+        with TemporaryDirectory() as output_folder:
+            solver = SOLVERS['s'](instance=case_instance(case), output_folder=output_folder, env=env, valid_inequalities=valid_inequalities)
+            sizes[valid_inequalities] = solver.m.stats()['n_constrs']
+            bounds[valid_inequalities] = lp_relaxation(solver, time_limit=60.0)['lp_bound']
+
+    assert sizes[False] < sizes[True]
+    assert bounds[False] <= bounds[True] + 1e-6
+    assert bounds[True] <= baselines['optima'][case] + 1e-6
+
+    with TemporaryDirectory() as output_folder:
+        solver = SOLVERS['s'](instance=case_instance(case), output_folder=output_folder, env=env, valid_inequalities=False)
+        results = solver.solve(write_results=False)
+
+    assert results['makespan'] == baselines['optima'][case]
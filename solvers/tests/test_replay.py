@@ -0,0 +1,52 @@
+from os import path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from cases import INSTANCES
+from bap.instance import Instance
+from bap.replay import ReplaySimulator, events
+from bap.schedule import violations
+
+
+def replay_instance() -> Instance:
+    instance = Instance(instance_file=path.join(INSTANCES, 'f30x3-01.json'))
+    instance.truncate(n_ships=8)
+
+    return instance
+
+
+def test_events():
+    instance = replay_instance()
+    stream = events(instance, lead=24, eta_error=6, n_updates=2, seed=1)
+
+    assert len(stream) == 4 * instance.n_ships
+    assert [e['time'] for e in stream] == sorted(e['time'] for e in stream)
+
+    for i in instance.ships:
+        kinds = [e['kind'] for e in stream if e['ship'] == i]
+        assert kinds == ['announce', 'eta', 'eta', 'arrival']
+        assert all(e['eta'] >= e['time'] for e in stream if e['ship'] == i)
+
+
+@pytest.mark.parametrize('strategy', ('greedy', 'rp', 'ti'))
+def test_replay(env, strategy):
+    instance = replay_instance()
+    stream = events(instance, seed=1)
+    fixed = dict()
+
+    with TemporaryDirectory() as output_folder:
+        simulator = ReplaySimulator(instance, output_folder=output_folder, strategy=strategy, time_limit=5.0, env=env)
+
+        for row in simulator.run(stream):
+            assert not row['fallback']
+
+            # Once moored, a ship keeps its berth and mooring time.
+            for i in simulator.started(row['time']):
+                fixed.setdefault(i, simulator.plan[i])
+                assert simulator.plan[i] == fixed[i]
+
+    schedule = simulator.schedule()
+
+    assert len(schedule) == instance.n_ships
+    assert violations(instance, schedule) == []
@@ -0,0 +1,61 @@
+from os import path
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from cases import CASES, INSTANCES, case_instance
+from bap.batch import SOLVERS, job
+from bap.results import open_sink
+from bap.scheduler import MODELS, ResourceScheduler, estimate_size
+
+RUNS = [(case, model) for case, spec in CASES.items() for model in spec['models'] if model in MODELS]
+
+
+@pytest.mark.parametrize('case, model', RUNS, ids=[f"{case}-{model}" for case, model in RUNS])
+def test_size_estimate(env, case, model):
+    instance = case_instance(case)
+    estimate = estimate_size(instance, model)
+
+    with TemporaryDirectory() as output_folder:
+        solver = SOLVERS[model](instance=instance, output_folder=output_folder, env=env)
+        size = solver.m.stats()
+
+    # The TI estimate counts the quay capacity in every period, which on a handful of ships
+    # is a large part of the model.
+    for key in ('n_vars', 'n_constrs', 'n_nzs'):
+        assert estimate[key] == pytest.approx(size[key], rel=0.2), key
+
+
+def test_dispatch_largest_first_within_budget():
+    scheduler = ResourceScheduler(n_cores=4, memory_budget=100)
+    memory = [10, 60, 50, 30]
+    waiting = scheduler.plan(memory)
+
+    assert waiting == [1, 2, 3, 0]
+    # The job of 50 does not fit next to the one of 60: the smaller ones do.
+    assert scheduler.dispatch(waiting, memory, free_cores=4, free_memory=100, n_running=0) == [(1, 2), (3, 1), (0, 1)]
+
+
+def test_dispatch_spare_cores():
+    scheduler = ResourceScheduler(n_cores=4, memory_budget=100)
+
+    # Cores go to the waiting jobs first, the spare ones to the jobs started.
+    assert scheduler.dispatch([0, 1], [10, 10], free_cores=2, free_memory=100, n_running=0) == [(0, 1), (1, 1)]
+    assert scheduler.dispatch([0], [10], free_cores=3, free_memory=100, n_running=1) == [(0, 3)]
+    # A job larger than the budget runs alone.
+    assert scheduler.dispatch([0], [200], free_cores=4, free_memory=100, n_running=0) == [(0, 4)]
+    assert scheduler.dispatch([0], [200], free_cores=3, free_memory=90, n_running=1) == []
+
+
+def test_run_jobs():
+    with TemporaryDirectory() as output_folder:
+        sink = open_sink(path.join(output_folder, 'batch.jsonl'))
+        jobs = [
+            job(instance=path.join(INSTANCES, 'f30x3-01.json'), model=model, output_folder=output_folder, truncate=6, sink=sink, backend='highs', timelimit=1.0)
+            for model in ('rp', 's', 'ls')
+        ]
+        rows = list(ResourceScheduler(n_cores=2, memory_budget=2**30).run(jobs))
+
+    assert sorted(row['job'] for row in rows) == [0, 1, 2]
+    assert all(row['feasible'] for row in rows)
+    assert len(set(row['makespan'] for row in rows if row['model'] != 'ls')) == 1
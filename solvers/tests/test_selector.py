@@ -0,0 +1,80 @@
+import glob
+from os import path
+
+import numpy as np
+import pytest
+
+from cases import INSTANCES
+from bap.features import FEATURES
+from bap.instance import Instance
+from bap.selector import FormulationSelector
+
+SELECTOR_FILE = path.join(path.dirname(__file__), '..', 'selector.json')
+
+
+def synthetic_selector() -> FormulationSelector:
+    # RP is the fastest model on small instances, S on large ones; PA is never the fastest,
+    # but gets faster with the size of the instance much more quickly than the others.
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0.0, 1.0, size=(40, len(FEATURES)))
+    size = X[:, 0]
+    y = dict(
+        pa=np.exp(6.0 - 3.0 * size),
+        rp=np.exp(1.0 + 2.0 * size),
+        s=np.exp(2.0 + 0.5 * size),
+        ti=np.full(len(X), 100.0)
+    )
+
+    return FormulationSelector.fit(X, y, ridge=0.01)
+
+
+def test_selects_winners_within_range():
+    selector = synthetic_selector()
+
+    assert selector.winners == ['rp', 's']
+    assert selector.single_best == 'rp'
+
+    for size in np.linspace(0.1, 0.9, 9):
+        x = np.full(len(FEATURES), 0.5)
+        x[0] = size
+        assert selector.select_vector(x) == ('rp' if size < 0.65 else 's')
+
+
+def test_falls_back_outside_range():
+    selector = synthetic_selector()
+    x = np.full(len(FEATURES), 0.5)
+    x[0] = 3.0
+
+    # Clipped to the calibration range, the predictions do not explode.
+    assert not selector.covers(x)
+    assert max(selector.predict_vector(x).values()) < 1000.0
+    assert selector.select_vector(x) == 'rp'
+
+    selector.use_regressions = False
+    x[0] = 0.9
+    assert selector.select_vector(x) == 'rp'
+
+
+def test_save_and_load(tmp_path):
+    selector = synthetic_selector()
+    selector.save(str(tmp_path / 'selector.json'))
+    loaded = FormulationSelector.load(str(tmp_path / 'selector.json'))
+
+    x = np.full(len(FEATURES), 0.7)
+    assert loaded.predict_vector(x) == pytest.approx(selector.predict_vector(x))
+    assert (loaded.winners, loaded.single_best, loaded.use_regressions) == (selector.winners, selector.single_best, True)
+
+
+def test_shipped_selector_picks_winners():
+    # On every instance, truncated or not, -m auto runs a model which was the fastest on
+    # some instance of the calibration.
+    selector = FormulationSelector.load(SELECTOR_FILE)
+
+    for instance_file in sorted(glob.glob(path.join(INSTANCES, '*.json'))):
+        for n_ships in (8, 12, None):
+            instance = Instance(instance_file=instance_file)
+
+            if n_ships is not None:
+                instance.truncate(n_ships=n_ships)
+
+            assert selector.select(instance) in selector.winners
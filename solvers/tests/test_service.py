@@ -0,0 +1,64 @@
+import asyncio
+from os import path
+
+from cases import INSTANCES
+from bap.service import SolveService, send_request
+
+INSTANCE = path.join(INSTANCES, 'f30x3-01.json')
+
+
+def run_service(tmp_path, client):
+    # Runs the service on a Unix socket and the client, a blocking function of the socket
+    # path, in a thread; returns what the client returns.
+    socket_path = str(tmp_path / 'service.sock')
+
+    async def main():
+        service = SolveService(n_workers=1, output_folder=str(tmp_path), grace_period=5.0)
+        await service.start()
+        server = await asyncio.start_unix_server(service.handle, path=socket_path)
+
+        try:
+            async with server:
+                return await asyncio.wait_for(asyncio.to_thread(client, socket_path), timeout=120.0)
+        finally:
+            await service.stop()
+
+    return asyncio.run(main())
+
+
+def test_solve(tmp_path):
+    message = dict(op='solve', id='a', model='ls', instance=INSTANCE, truncate=10, time_limit=0.5)
+    events = run_service(tmp_path, lambda address: list(send_request(address, message)))
+
+    assert [e['event'] for e in events] == ['queued', 'started', 'result']
+    assert all(e['id'] == 'a' for e in events)
+
+    results = events[-1]['results']
+    assert results['feasible']
+    assert len(results['ships']) == 10
+
+
+def test_cancel(tmp_path):
+    message = dict(op='solve', id='b', model='ls', instance=INSTANCE, time_limit=600.0)
+
+    def client(address):
+        events = list()
+
+        for event in send_request(address, message):
+            events.append(event)
+
+            # The local search cannot be interrupted: its worker is replaced.
+            if event['event'] == 'started':
+                assert list(send_request(address, dict(op='cancel', id='b'))) == [dict(event='cancel', id='b', found=True)]
+
+        status = list(send_request(address, dict(op='status')))[0]
+
+        return events, status
+
+    events, status = run_service(tmp_path, client)
+
+    assert [e['event'] for e in events] == ['queued', 'started', 'cancelled']
+    assert status['queued'] == []
+    assert len(status['workers']) == 1
+    assert status['workers'][0]['request'] is None
+    assert status['workers'][0]['pid'] != events[1]['worker']